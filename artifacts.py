@@ -0,0 +1,62 @@
+import gzip
+import io
+import json
+import os
+
+
+def load_artifact(path):
+    """
+    Liest ein gzip-komprimiertes JSON-Artefakt; None, wenn es noch nicht existiert
+    """
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_artifact(data, path):
+    """
+    Schreibt ein Artefakt als gzip-komprimiertes JSON (atomar über eine temporäre Datei)
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    # mtime=0, damit gleiche Inhalte byte-identische Dateien ergeben. json.dump schreibt
+    # stückweise, der komplette JSON-Text liegt nie am Stück im Speicher.
+    with gzip.GzipFile(tmp_path, "wb", mtime=0) as raw, io.TextIOWrapper(raw, encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+class FileArtifact:
+    """
+    Artefakt, dessen Inhalt sich aus Beiträgen pro CSV-Datei zusammensetzt
+    ({"files": {Dateischlüssel: Beitrag}}). Inkrementelle Läufe ersetzen nur die
+    Beiträge der geänderten Dateien und entfernen die gelöschter Dateien.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = load_artifact(path) or {"files": {}}
+
+    def update(self, contributions, removed=(), keep=None):
+        """
+        contributions: (Dateischlüssel, Beitrag)-Paare, auch als Generator; ein Beitrag None
+        entfernt die Datei. Jeder alte Beitrag wird ersetzt, sobald der neue vorliegt.
+        Mit keep werden zusätzlich alle Beiträge entfernt, deren Schlüssel nicht in keep steht.
+        """
+        files = self.data["files"]
+        for key, contribution in contributions:
+            if contribution is None:
+                files.pop(key, None)
+            else:
+                files[key] = contribution
+        for key in removed:
+            files.pop(key, None)
+        if keep is not None:
+            for key in [key for key in files if key not in keep]:
+                del files[key]
+
+    def save(self):
+        self.data["files"] = dict(sorted(self.data["files"].items()))
+        save_artifact(self.data, self.path)
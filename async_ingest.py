@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, TimeoutError
+
+from opensearchpy.exceptions import TransportError
+
+from bulk_export import action_to_ndjson
+from bulk_sender import AdaptiveBulkSender, _Entry
+from metrics import FAST_BUCKETS
+
+logger = logging.getLogger("ingest")
+
+SENDERS = 4
+CHUNK_BYTES = 64 * 1024   # Größe der Pakete, die der Producer-Thread an die Sender übergibt
+QUEUE_CHUNKS = 64         # Maximale Anzahl fertiger Pakete in der Warteschlange
+
+
+class AsyncBulkSender(AdaptiveBulkSender):
+    """
+    Asynchrone Variante von AdaptiveBulkSender: Ein Producer-Thread serialisiert die
+    Aktionen in kleine Pakete, senders Tasks bilden daraus Batches in der adaptiven
+    Größe und halten bis zu senders _bulk-Requests gleichzeitig offen. Retry-Warteschlange,
+    Gegendruck und Dead-Letter-Datei sind dieselben wie beim synchronen Sender. Abgelehnte
+    Dokumente gehen zurück in die Retry-Warteschlange, der Sender schickt sofort den
+    nächsten Batch; Backoff pausiert alle Sender gemeinsam statt jeden einzeln.
+    """
+
+    def __init__(self, client, senders=SENDERS, **kwargs):
+        super().__init__(client, **kwargs)
+        self.senders = senders
+        self.leftover = deque()   # Rest eines Pakets, das nicht mehr in den Batch gepasst hat
+        self.resume_at = 0.0
+
+    def _produce(self, actions, queue, loop, stop):
+        """
+        Läuft in einem eigenen Thread: parst und serialisiert den (synchronen) Aktionsstrom
+        und übergibt die Pakete per run_coroutine_threadsafe an die Warteschlange der
+        Event-Loop. Die Loop bleibt so für Requests und Antworten frei. Ist die
+        Warteschlange voll, blockiert nur dieser Thread; stop beendet ihn vorzeitig.
+        """
+        def put(item):
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while True:
+                try:
+                    return future.result(timeout=0.5)
+                except TimeoutError:
+                    if stop.is_set():
+                        future.cancel()
+                        raise CancelledError()
+
+        chunk = []
+        size = 0
+        for action in actions:
+            if stop.is_set():
+                return
+            started = time.perf_counter()
+            entry = _Entry(action, action_to_ndjson(action))
+            if self.metrics is not None:
+                self.metrics.observe("serialize", time.perf_counter() - started, FAST_BUCKETS)
+            chunk.append(entry)
+            size += len(entry.payload)
+            if size >= CHUNK_BYTES:
+                put(chunk)
+                chunk = []
+                size = 0
+        if chunk:
+            put(chunk)
+        put(None)
+
+    async def _next_batch_async(self, queue):
+        """
+        Batch aus Retry-Warteschlange, Paketresten und neuen Paketen. Gewartet wird nur,
+        solange der Batch noch leer ist; None heißt, es kommt nichts mehr.
+        """
+        batch = []
+        size = 0
+        for source in (self.retry_queue, self.leftover):
+            while source and size < self.batch_bytes and len(batch) < self.max_docs:
+                entry = source.popleft()
+                batch.append(entry)
+                size += len(entry.payload)
+        # Gegendruck: neue Pakete nur, solange die Retry-Warteschlange nicht voll ist
+        while len(self.retry_queue) < self.retry_queue_size and size < self.batch_bytes and len(batch) < self.max_docs:
+            if batch:
+                if queue.empty():
+                    break
+                chunk = queue.get_nowait()
+            else:
+                chunk = await queue.get()
+            if chunk is None:
+                # Ende für die anderen Sender wieder einreihen
+                queue.put_nowait(None)
+                break
+            for number, entry in enumerate(chunk):
+                if size >= self.batch_bytes or len(batch) >= self.max_docs:
+                    self.leftover.extend(chunk[number:])
+                    break
+                batch.append(entry)
+                size += len(entry.payload)
+        return batch, size
+
+    async def _send(self, queue):
+        """
+        Sender: bildet Batches und schickt sie als _bulk-Request, bis keine Aktionen mehr kommen
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch, size = await self._next_batch_async(queue)
+            if not batch:
+                return
+            pause = self.resume_at - loop.time()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            started = time.perf_counter()
+            try:
+                response = await self.client.bulk(body=b"".join(entry.payload for entry in batch))
+            except TransportError as e:
+                delay = self._handle_error(batch, size, e)
+            else:
+                latency = time.perf_counter() - started
+                if self.metrics is not None:
+                    self.metrics.observe("bulk_roundtrip", latency)
+                    self.metrics.inc("bulk_requests")
+                delay = self._handle_response(batch, response, latency)
+            if delay:
+                self.resume_at = max(self.resume_at, loop.time() + delay)
+
+    async def send_async(self, actions):
+        """
+        Sendet alle Aktionen. Gibt (Anzahl erfolgreich, Menge der endgültig fehlgeschlagenen IDs) zurück.
+        """
+        queue = asyncio.Queue(maxsize=QUEUE_CHUNKS)
+        stop = threading.Event()
+        tasks = [asyncio.create_task(self._send(queue)) for _ in range(self.senders)]
+        producer = asyncio.create_task(asyncio.to_thread(
+            self._produce, iter(actions), queue, asyncio.get_running_loop(), stop))
+        try:
+            await asyncio.gather(producer, *tasks)
+        finally:
+            # Bei einem Fehler den Producer-Thread anhalten und auf ihn warten,
+            # damit der Aktionsstrom nicht nach dem Ende der Loop weiterläuft
+            stop.set()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+            await self.client.close()
+        self.write_dead_letters()
+        return self.success, {entry.action["_id"] for entry in self.dead_letters}
+
+
+def run_async_ingest(client_factory, actions, senders=SENDERS, **kwargs):
+    """
+    Synchroner Einstiegspunkt für das Upload-Skript. client_factory wird innerhalb
+    der Event-Loop aufgerufen, da der aiohttp-Client an die laufende Loop gebunden ist.
+    Weitere Argumente gehen an AsyncBulkSender (max_retries, dead_letter_path, metrics, ...).
+    """
+    async def main():
+        return await AsyncBulkSender(client_factory(), senders, **kwargs).send_async(actions)
+    return asyncio.run(main())
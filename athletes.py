@@ -0,0 +1,93 @@
+import os
+from collections import defaultdict
+
+from artifacts import load_artifact, save_artifact
+from ingest import normalize_name
+from ingest_version import ARTIFACTS_PATH
+from leaderboards import leaderboards_path
+
+ATHLETES_FILE = "athletes.json.gz"
+# Felder eines PB-Resultats im Athletendokument; Name, Geburtsdatum und Nation stehen einmal im Dokument
+PB_FIELDS = ("id", "mark", "display", "date", "venue", "wind", "world_rank")
+
+
+def athletes_path(artifacts_path=ARTIFACTS_PATH):
+    return os.path.join(artifacts_path, ATHLETES_FILE)
+
+
+def build_athletes(leaderboards):
+    """
+    Fasst die Athleteneinträge aller Bestenlisten-Dateien zu einem kompakten Dokument
+    pro athlete_id zusammen: Disziplinen mit PB und Anzahl, Resultate gesamt, erste und letzte Saison
+    """
+    athletes = {}
+    for contribution in (leaderboards or {"files": {}})["files"].values():
+        for athlete_id, entry in contribution["athletes"].items():
+            athlete = athletes.get(athlete_id)
+            if athlete is None:
+                athlete = athletes[athlete_id] = {
+                    "athlete_id": athlete_id, "competitor": entry["competitor"], "dob": entry["dob"],
+                    "nat": entry["nat"], "gender": contribution["gender"], "results": 0,
+                    "first_season": None, "last_season": None, "disciplines": {},
+                }
+            athlete["results"] += entry["results"]
+            seasons = sorted(entry["sb"])
+            if seasons:
+                if athlete["first_season"] is None or seasons[0] < athlete["first_season"]:
+                    athlete["first_season"] = seasons[0]
+                if athlete["last_season"] is None or seasons[-1] > athlete["last_season"]:
+                    athlete["last_season"] = seasons[-1]
+            athlete["disciplines"][contribution["discipline"]] = {
+                "results": entry["results"],
+                "pb": {field: entry["pb"][field] for field in PB_FIELDS},
+                "seasons": [seasons[0], seasons[-1]] if seasons else None,
+            }
+    return {athlete_id: {**athlete, "disciplines": dict(sorted(athlete["disciplines"].items()))}
+            for athlete_id, athlete in sorted(athletes.items())}
+
+
+def update_athletes(artifacts_path=ARTIFACTS_PATH, leaderboards=None):
+    """
+    Schreibt die Athletendokumente neu; muss nach update_leaderboards laufen.
+    leaderboards ist dessen Rückgabewert, ohne wird das Artefakt neu gelesen.
+    """
+    if leaderboards is None:
+        leaderboards = load_artifact(leaderboards_path(artifacts_path))
+    athletes = build_athletes(leaderboards)
+    save_artifact({"athletes": athletes}, athletes_path(artifacts_path))
+    return len(athletes)
+
+
+class Athletes:
+    """
+    Athletendokumente im Speicher: Lookup per athlete_id und per normalisiertem Namen
+    """
+
+    def __init__(self, artifact):
+        self.athletes = (artifact or {"athletes": {}})["athletes"]
+        self.by_name = defaultdict(list)
+        for athlete_id, athlete in self.athletes.items():
+            self.by_name[normalize_name(athlete["competitor"])].append(athlete_id)
+
+    def __len__(self):
+        return len(self.athletes)
+
+    def get(self, athlete_id):
+        return self.athletes.get(athlete_id)
+
+    def find(self, competitor, dob=None, nat=None):
+        """
+        Alle Athlet:innen mit diesem Namen (ohne Akzente, Groß-/Kleinschreibung egal),
+        optional eingeschränkt auf Geburtsdatum und Nation
+        """
+        result = []
+        for athlete_id in self.by_name.get(normalize_name(competitor), []):
+            athlete = self.athletes[athlete_id]
+            if (dob and athlete["dob"] != dob) or (nat and athlete["nat"] != nat):
+                continue
+            result.append(athlete)
+        return result
+
+
+def load_athletes(artifacts_path=ARTIFACTS_PATH):
+    return Athletes(load_artifact(athletes_path(artifacts_path)))
@@ -0,0 +1,299 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from queue import Empty
+
+from async_ingest import SENDERS, run_async_ingest
+from bulk_export import action_to_ndjson
+from bulk_sender import BULK_SIZE, AdaptiveBulkSender, bulk_index_documents
+from ingest import DATA_PATH, iter_actions, iter_csv_files, iter_documents, iter_documents_parallel
+from opensearch_client import create_async_client, create_client
+
+# e2e: feste Batches über streaming_bulk, e2e-adaptive: Standardpfad des Upload-Skripts,
+# e2e-async: --async-senders (Parsen in einem Thread, mehrere offene _bulk-Requests)
+MODES = ["parse", "serialize", "e2e", "e2e-adaptive", "e2e-async"]
+ROOT_PATH = os.path.dirname(os.path.abspath(__file__))
+# Ergebnisse liegen unabhängig vom Arbeitsverzeichnis neben dem Skript (in .gitignore)
+RESULTS_PATH = os.path.join(ROOT_PATH, "benchmarks")
+MOCK_STARTUP_TIMEOUT = 10.0
+
+
+class TimedIterator:
+    """
+    Misst die Zeit, die in next() eines Iterators verbracht wird (inklusive aller vorgelagerten Stufen)
+    """
+
+    def __init__(self, iterable):
+        self.iterator = iter(iterable)
+        self.seconds = 0.0
+        self.items = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            item = next(self.iterator)
+        finally:
+            self.seconds += time.perf_counter() - started
+        self.items += 1
+        return item
+
+
+def corpus_bytes(data_path):
+    return sum(os.path.getsize(file_path) for _, _, file_path in iter_csv_files(data_path))
+
+
+def build_synthetic_corpus(data_path, scale, out_dir):
+    """
+    Erzeugt einen um den Faktor scale vergrößerten Korpus: jede Datei enthält ihre Zeilen scale-mal
+    """
+    for folder_name, file_name, file_path in iter_csv_files(data_path):
+        os.makedirs(os.path.join(out_dir, folder_name), exist_ok=True)
+        with open(file_path, "r", encoding="utf-8") as f:
+            header = f.readline()
+            body = f.read()
+        if body and not body.endswith("\n"):
+            body += "\n"
+        with open(os.path.join(out_dir, folder_name, file_name), "w", encoding="utf-8") as f:
+            f.write(header)
+            for _ in range(scale):
+                f.write(body)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def mock_server():
+    """
+    Startet mock_bulk_server.py als eigenen Prozess, damit er dem Client keine CPU-Zeit wegnimmt
+    """
+    port = _free_port()
+    script = os.path.join(ROOT_PATH, "mock_bulk_server.py")
+    process = subprocess.Popen([sys.executable, script, "--port", str(port)], stdout=subprocess.DEVNULL)
+    try:
+        # Erst weitermachen, wenn der Server GET / beantwortet (direkt, ohne HTTP-Proxy aus der Umgebung)
+        opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+        deadline = time.time() + MOCK_STARTUP_TIMEOUT
+        while time.time() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"Mock-Server beim Start beendet (Exit-Code {process.returncode})")
+            with contextlib.suppress(OSError), opener.open(f"http://127.0.0.1:{port}/", timeout=0.5):
+                break
+            time.sleep(0.05)
+        else:
+            raise RuntimeError(f"Mock-Server nach {MOCK_STARTUP_TIMEOUT:g} s nicht erreichbar")
+        yield port
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def peak_rss_mb():
+    """
+    Spitzen-RSS des Prozesses in MB; ru_maxrss ist unter macOS in Bytes, unter Linux in KiB
+    """
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def run_mode(mode, data_path, workers, bulk_size, port, senders=SENDERS):
+    """
+    Führt einen Benchmark-Modus aus und gibt die Messwerte zurück.
+    Läuft in einem eigenen Prozess, damit der Spitzen-RSS pro Modus gemessen wird.
+    """
+    if workers > 1:
+        documents = TimedIterator(iter_documents_parallel(data_path, workers))
+    else:
+        documents = TimedIterator(iter_documents(data_path))
+    stages = {}
+    payload_bytes = 0
+    failed_ids = set()
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == "parse":
+            for _ in documents:
+                pass
+        elif mode == "serialize":
+            actions = TimedIterator(iter_actions(documents))
+            for action in actions:
+                serialize_started = time.perf_counter()
+                payload_bytes += len(action_to_ndjson(action))
+                stages["serialize"] = stages.get("serialize", 0.0) + time.perf_counter() - serialize_started
+            stages["actions"] = actions.seconds - documents.seconds
+        else:
+            actions = TimedIterator(iter_actions(documents))
+            if mode == "e2e":
+                _, failed_ids = bulk_index_documents(create_client("127.0.0.1", port), actions, bulk_size)
+            else:
+                dead_letter_path = os.path.join(tempfile.gettempdir(), "benchmark-dead-letter.ndjson")
+                if mode == "e2e-adaptive":
+                    sender = AdaptiveBulkSender(create_client("127.0.0.1", port), dead_letter_path=dead_letter_path)
+                    _, failed_ids = sender.send(actions)
+                else:
+                    _, failed_ids = run_async_ingest(
+                        lambda: create_async_client("127.0.0.1", port, maxsize=senders), actions, senders,
+                        dead_letter_path=dead_letter_path)
+            stages["actions"] = actions.seconds - documents.seconds
+    elapsed = time.perf_counter() - started
+
+    stages["documents"] = documents.seconds
+    if mode.startswith("e2e"):
+        # Die Sender serialisieren selbst, daher Serialisierung + Senden als eine Stufe. Bei
+        # e2e-async überlappen Parsen und Senden, die Stufen ergeben dann mehr als die Laufzeit.
+        stages["serialize+bulk"] = max(0.0, elapsed - sum(stages.values()))
+
+    input_bytes = corpus_bytes(data_path)
+    result = {
+        "rows": documents.items,
+        "seconds": round(elapsed, 3),
+        "rows_per_s": round(documents.items / elapsed, 1) if elapsed else 0.0,
+        "mb_per_s": round(input_bytes / 1e6 / elapsed, 2) if elapsed else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "stages": {name: round(seconds, 3) for name, seconds in sorted(stages.items())},
+    }
+    if payload_bytes:
+        result["payload_mb"] = round(payload_bytes / 1e6, 2)
+    if mode.startswith("e2e"):
+        result["failed"] = len(failed_ids)
+    return result
+
+
+def _child(queue, *args):
+    queue.put(run_mode(*args))
+
+
+def run_isolated(*args):
+    """
+    Führt run_mode in einem eigenen Prozess aus (eigenes Spitzen-RSS). Stürzt der Prozess
+    ab, ohne ein Ergebnis zu liefern, wird RuntimeError ausgelöst statt ewig zu warten.
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_child, args=(queue, *args))
+    process.start()
+    try:
+        while True:
+            try:
+                result = queue.get(timeout=1)
+                break
+            except Empty:
+                if process.exitcode is None:
+                    continue
+                # Das Ergebnis kann kurz nach dem Prozessende noch unterwegs sein
+                try:
+                    result = queue.get(timeout=1)
+                    break
+                except Empty:
+                    raise RuntimeError(f"Benchmark-Prozess ohne Ergebnis beendet (Exit-Code {process.exitcode})")
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+    return result
+
+
+def git_commit():
+    with contextlib.suppress(Exception):
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, cwd=ROOT_PATH,
+                                       stderr=subprocess.DEVNULL).strip()
+    return None
+
+
+def compare(current, baseline_path):
+    """
+    Gibt die relative Änderung von rows/s und Spitzen-RSS gegenüber einem gespeicherten Lauf aus
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    print(f"\nVergleich mit {baseline_path}:")
+    for name, result in current.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        speed = (result["rows_per_s"] / old["rows_per_s"] - 1) * 100 if old["rows_per_s"] else 0.0
+        rss = (result["peak_rss_mb"] / old["peak_rss_mb"] - 1) * 100 if old["peak_rss_mb"] else 0.0
+        print(f"  {name:<20} rows/s {old['rows_per_s']:>10} -> {result['rows_per_s']:>10} ({speed:+.1f}%)"
+              f"   RSS {old['peak_rss_mb']} -> {result['peak_rss_mb']} MB ({rss:+.1f}%)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Durchsatz-Benchmark der Ingest-Pipeline")
+    parser.add_argument("--data-path", default=DATA_PATH)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--scales", nargs="+", type=int, default=[1],
+                        help="Korpusgrößen als Vielfaches der echten Daten, z.B. 1 10 100 (100x braucht ~4 GB Platz)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--bulk-size", type=int, default=BULK_SIZE, help="Dokumente pro Batch im Modus e2e")
+    parser.add_argument("--async-senders", type=int, default=SENDERS, help="Gleichzeitige Sender im Modus e2e-async")
+    parser.add_argument("--label", default="latest", help="Name der Ergebnisdatei unter benchmarks/")
+    parser.add_argument("--compare", help="Ergebnisdatei eines früheren Laufs zum Vergleich")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = {}
+    with mock_server() as port:
+        for scale in args.scales:
+            tmp_dir = None
+            data_path = args.data_path
+            if scale > 1:
+                tmp_dir = tempfile.mkdtemp(prefix=f"corpus-x{scale}-")
+                print(f"Erzeuge synthetischen Korpus x{scale} in {tmp_dir} ...")
+                build_synthetic_corpus(args.data_path, scale, tmp_dir)
+                data_path = tmp_dir
+            try:
+                for mode in args.modes:
+                    name = f"x{scale}/{mode}"
+                    result = run_isolated(mode, data_path, args.workers, args.bulk_size, port, args.async_senders)
+                    results[name] = result
+                    print(f"{name:<16} {result['rows']:>9} Zeilen  {result['seconds']:>8.2f} s  "
+                          f"{result['rows_per_s']:>10.0f} Zeilen/s  {result['mb_per_s']:>6.2f} MB/s  "
+                          f"RSS {result['peak_rss_mb']:>7.1f} MB  {result['stages']}"
+                          + (f"  {result['failed']} fehlgeschlagen" if result.get("failed") else ""))
+            finally:
+                if tmp_dir:
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    os.makedirs(RESULTS_PATH, exist_ok=True)
+    output_path = os.path.join(RESULTS_PATH, f"{args.label}.json")
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "workers": args.workers,
+            "bulk_size": args.bulk_size,
+            "async_senders": args.async_senders,
+        },
+        "results": results,
+    }
+    if args.compare:
+        compare(results, args.compare)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"\nErgebnisse gespeichert in {output_path}")
+
+
+if __name__ == "__main__":
+    main()
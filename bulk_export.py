@@ -0,0 +1,72 @@
+import gzip
+import os
+
+from serializers import dumps_bytes
+
+EXPORT_BYTES = 10 * 1024 * 1024   # Unkomprimierte Payload-Größe pro Datei (= ein _bulk-Request)
+
+
+def action_to_ndjson(action):
+    """
+    Wandelt eine Bulk-Aktion (wie für helpers.streaming_bulk) direkt in die NDJSON-Bytes
+    des _bulk-Endpunkts um; die Bodies der Sender sind nur noch b"".join dieser Zeilen
+    """
+    op_type = action.get("_op_type", "index")
+    meta = {"_index": action["_index"], "_id": action["_id"]}
+    if op_type == "delete":
+        return dumps_bytes({op_type: meta}) + b"\n"
+    return b"".join((dumps_bytes({op_type: meta}), b"\n", dumps_bytes(action["_source"]), b"\n"))
+
+
+class ShardedBulkWriter:
+    """
+    Schreibt _bulk-Payloads als gzip-Dateien bulk-00001.ndjson.gz, bulk-00002.ndjson.gz, ...
+    Eine Datei wird geschlossen, sobald die nächste Aktion max_bytes (unkomprimiert)
+    überschreiten würde; eine Aktion wird nie auf zwei Dateien verteilt.
+    """
+
+    def __init__(self, out_dir, max_bytes=EXPORT_BYTES):
+        self.out_dir = out_dir
+        self.max_bytes = max_bytes
+        self.files = []
+        self.actions = 0
+        self._file = None
+        self._size = 0
+        os.makedirs(out_dir, exist_ok=True)
+
+    def _open_next(self):
+        self.close()
+        path = os.path.join(self.out_dir, f"bulk-{len(self.files) + 1:05d}.ndjson.gz")
+        # mtime=0, damit identische Eingaben byte-identische Artefakte ergeben
+        self._file = gzip.GzipFile(path, "wb", mtime=0)
+        self._size = 0
+        self.files.append(path)
+
+    def write(self, payload):
+        if self._file is None or (self._size and self._size + len(payload) > self.max_bytes):
+            self._open_next()
+        self._file.write(payload)
+        self._size += len(payload)
+        self.actions += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def export_bulk_files(actions, out_dir, max_bytes=EXPORT_BYTES):
+    """
+    Schreibt alle Aktionen als gzip-komprimierte _bulk-Dateien nach out_dir.
+    Gibt (Anzahl Aktionen, Liste der Dateien) zurück.
+    """
+    with ShardedBulkWriter(out_dir, max_bytes) as writer:
+        for action in actions:
+            writer.write(action_to_ndjson(action))
+    return writer.actions, writer.files
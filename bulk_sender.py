@@ -0,0 +1,237 @@
+import logging
+import random
+import time
+from collections import deque
+
+from opensearchpy import helpers
+from opensearchpy.exceptions import ConnectionError, TransportError
+
+from bulk_export import action_to_ndjson
+from metrics import FAST_BUCKETS
+from serializers import dumps_bytes
+
+logger = logging.getLogger("ingest")
+
+BULK_SIZE = 1000     # Anzahl Dokumente pro Bulk-Operation
+
+
+def bulk_index_documents(client, actions, chunk_size=BULK_SIZE):
+    """
+    Indexiert einen Strom von Bulk-Aktionen mit helpers.streaming_bulk.
+    Gibt (Anzahl erfolgreich, Menge der fehlgeschlagenen IDs) zurück. Löschaktionen
+    für bereits fehlende Dokumente (404) gelten als erfolgreich.
+    """
+    success = 0
+    failed_ids = set()
+    for ok, item in helpers.streaming_bulk(client, actions, chunk_size=chunk_size,
+                                           raise_on_error=False, raise_on_exception=False):
+        op_type, result = next(iter(item.items()))
+        if ok or (op_type == "delete" and result.get("status") == 404):
+            success += 1
+        else:
+            failed_ids.add(result.get("_id"))
+            logger.warning(f"Fehler: {item}")
+    return success, failed_ids
+
+
+# Grenzen und Startwert der Batchgröße in Bytes (unkomprimierte _bulk-Payload)
+MIN_BATCH_BYTES = 256 * 1024
+INITIAL_BATCH_BYTES = 2 * 1024 * 1024
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+TARGET_LATENCY = 1.0         # Angestrebte Dauer eines Bulk-Requests in Sekunden
+MAX_RETRIES = 5
+RETRY_QUEUE_SIZE = 20000     # Ab dieser Größe werden keine neuen Aktionen mehr gelesen
+DEAD_LETTER_PATH = "dead-letter.ndjson"
+MAX_BACKOFF = 30.0
+
+# Status, bei denen ein erneuter Versuch sinnvoll ist (Überlast, Knoten nicht erreichbar)
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+
+class _Entry:
+    __slots__ = ("action", "payload", "attempts", "error")
+
+    def __init__(self, action, payload):
+        self.action = action
+        self.payload = payload
+        self.attempts = 0
+        self.error = None
+
+
+class AdaptiveBulkSender:
+    """
+    Bulk-Sender mit adaptiver Batchgröße. Die Batches werden nach Payload-Bytes
+    zusammengestellt; ist ein Request deutlich schneller als target_latency, wächst
+    die Größe, ist er langsamer, schrumpft sie. Bei 429 bzw.
+    es_rejected_execution_exception halbiert sich die Größe und es wird mit
+    exponentiellem Backoff gewartet. Abgelehnte Dokumente kommen in eine begrenzte
+    Retry-Warteschlange; ist sie voll, werden keine neuen Aktionen mehr gelesen.
+    Dokumente, die endgültig scheitern, landen in einer Dead-Letter-Datei.
+    """
+
+    def __init__(self, client, max_docs=BULK_SIZE * 10, initial_bytes=INITIAL_BATCH_BYTES,
+                 min_bytes=MIN_BATCH_BYTES, max_bytes=MAX_BATCH_BYTES, target_latency=TARGET_LATENCY,
+                 max_retries=MAX_RETRIES, retry_queue_size=RETRY_QUEUE_SIZE,
+                 dead_letter_path=DEAD_LETTER_PATH, metrics=None, sleep=time.sleep):
+        self.client = client
+        self.max_docs = max_docs
+        self.batch_bytes = initial_bytes
+        self.min_bytes = min_bytes
+        self.max_bytes = max_bytes
+        self.target_latency = target_latency
+        self.max_retries = max_retries
+        self.retry_queue = deque()
+        self.retry_queue_size = retry_queue_size
+        self.dead_letter_path = dead_letter_path
+        self.dead_letters = []
+        self.metrics = metrics
+        self.sleep = sleep
+        self.success = 0
+        self.rejected_in_a_row = 0
+
+    def _inc(self, name, value=1):
+        if self.metrics is not None:
+            self.metrics.inc(name, value)
+
+    def _next_batch(self, actions):
+        batch = []
+        size = 0
+        while self.retry_queue and size < self.batch_bytes and len(batch) < self.max_docs:
+            entry = self.retry_queue.popleft()
+            batch.append(entry)
+            size += len(entry.payload)
+        # Gegendruck: neue Aktionen nur, solange die Retry-Warteschlange nicht voll ist
+        while len(self.retry_queue) < self.retry_queue_size and size < self.batch_bytes and len(batch) < self.max_docs:
+            action = next(actions, None)
+            if action is None:
+                break
+            started = time.perf_counter()
+            entry = _Entry(action, action_to_ndjson(action))
+            if self.metrics is not None:
+                self.metrics.observe("serialize", time.perf_counter() - started, FAST_BUCKETS)
+            batch.append(entry)
+            size += len(entry.payload)
+        return batch, size
+
+    def _retry_or_drop(self, entry, error):
+        entry.attempts += 1
+        entry.error = error
+        if entry.attempts > self.max_retries:
+            self.dead_letters.append(entry)
+            self._inc("actions_dead_lettered")
+        else:
+            self.retry_queue.append(entry)
+            self._inc("actions_retried")
+
+    def _backoff_delay(self, rejected_ratio=1.0):
+        """
+        Reaktion auf Überlast. Lehnt der Cluster den Großteil eines Batches ab, wird
+        exponentiell gewartet und die Batchgröße halbiert; bei vereinzelten Ablehnungen
+        wird die Batchgröße nur leicht reduziert. Gibt die Wartezeit in Sekunden zurück.
+        """
+        self._inc("backoffs")
+        if rejected_ratio < 0.5:
+            self.batch_bytes = max(self.min_bytes, int(self.batch_bytes * 0.8))
+            return 0.1
+        self.rejected_in_a_row += 1
+        self.batch_bytes = max(self.min_bytes, self.batch_bytes // 2)
+        delay = min(MAX_BACKOFF, 0.5 * 2 ** (self.rejected_in_a_row - 1)) * random.uniform(0.5, 1.0)
+        logger.warning(f"Cluster ausgelastet, warte {delay:.1f} s (Batchgröße jetzt {self.batch_bytes // 1024} KB, "
+                       f"{len(self.retry_queue)} Dokumente in der Retry-Warteschlange)")
+        return delay
+
+    def _adjust(self, latency):
+        self.rejected_in_a_row = 0
+        if latency < self.target_latency / 2:
+            self.batch_bytes = min(self.max_bytes, int(self.batch_bytes * 1.5))
+        elif latency > self.target_latency:
+            self.batch_bytes = max(self.min_bytes, int(self.batch_bytes * 0.7))
+
+    def _handle_error(self, batch, size, e):
+        """
+        Verarbeitet einen gescheiterten Bulk-Request. Gibt die Wartezeit vor dem nächsten Request zurück.
+        """
+        status = e.status_code
+        if status == 413 and len(batch) > 1:
+            # Payload zu groß: Batch verkleinern und komplett erneut versuchen
+            self.max_bytes = max(self.min_bytes, size // 2)
+            self.batch_bytes = min(self.batch_bytes, self.max_bytes)
+            self.retry_queue.extendleft(reversed(batch))
+            return 0
+        if isinstance(e, ConnectionError) or status in RETRYABLE_STATUS:
+            for entry in batch:
+                self._retry_or_drop(entry, f"{type(e).__name__}: {e}")
+            return self._backoff_delay()
+        for entry in batch:
+            entry.error = f"{type(e).__name__}: {e}"
+            self.dead_letters.append(entry)
+        self._inc("actions_dead_lettered", len(batch))
+        return 0
+
+    def _handle_response(self, batch, response, latency):
+        """
+        Wertet die Items einer _bulk-Antwort aus: Erfolge zählen, Überlast in die
+        Retry-Warteschlange, der Rest in die Dead-Letter-Liste. Gibt die Wartezeit
+        vor dem nächsten Request zurück.
+        """
+        self._inc("batches")
+        self._inc("batch_docs", len(batch))
+
+        rejected = 0
+        for entry, item in zip(batch, response["items"]):
+            op_type, result = next(iter(item.items()))
+            status = result.get("status", 500)
+            if 200 <= status < 300 or (op_type == "delete" and status == 404):
+                self.success += 1
+                continue
+            error = result.get("error")
+            error_type = error.get("type") if isinstance(error, dict) else None
+            if status in RETRYABLE_STATUS or status >= 500 or error_type == "es_rejected_execution_exception":
+                if status == 429 or error_type == "es_rejected_execution_exception":
+                    rejected += 1
+                self._retry_or_drop(entry, error)
+            else:
+                entry.error = error
+                self.dead_letters.append(entry)
+                self._inc("actions_dead_lettered")
+
+        if rejected:
+            return self._backoff_delay(rejected / len(batch))
+        self._adjust(latency)
+        return 0
+
+    def _send_batch(self, batch, size):
+        body = b"".join(entry.payload for entry in batch)
+        started = time.perf_counter()
+        try:
+            response = self.client.bulk(body=body)
+        except TransportError as e:
+            delay = self._handle_error(batch, size, e)
+        else:
+            delay = self._handle_response(batch, response, time.perf_counter() - started)
+        if delay:
+            self.sleep(delay)
+
+    def send(self, actions):
+        """
+        Sendet alle Aktionen. Gibt (Anzahl erfolgreich, Menge der endgültig fehlgeschlagenen IDs) zurück.
+        """
+        actions = iter(actions)
+        while True:
+            batch, size = self._next_batch(actions)
+            if not batch:
+                break
+            self._send_batch(batch, size)
+        self.write_dead_letters()
+        return self.success, {entry.action["_id"] for entry in self.dead_letters}
+
+    def write_dead_letters(self):
+        """
+        Schreibt endgültig fehlgeschlagene Aktionen als NDJSON (Aktion, Fehler, Versuche)
+        """
+        if not self.dead_letters:
+            return
+        with open(self.dead_letter_path, "wb") as f:
+            for entry in self.dead_letters:
+                f.write(dumps_bytes({"action": entry.action, "error": entry.error, "attempts": entry.attempts}) + b"\n")
+        logger.warning(f"{len(self.dead_letters)} Dokumente endgültig fehlgeschlagen, siehe {self.dead_letter_path}")
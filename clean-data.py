@@ -1,79 +1,85 @@
-import os
+import argparse
 import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from ingest import column_order
+
 
 def process_csv_file(file_path):
-    """Verarbeitet eine einzelne CSV-Datei und verschiebt Spalten mit 'WIND' im Header in die letzte Spalte."""
-    
-    # CSV-Datei einlesen
+    """
+    Verschiebt Spalten mit 'WIND' im Header in die letzten Spalten.
+    Bereits bereinigte Dateien werden nur anhand der Kopfzeile erkannt und übersprungen.
+    Die Zeilen werden in eine temporäre Datei gestreamt, die erst am Ende das
+    Original ersetzt; ein Abbruch hinterlässt daher nie eine halb geschriebene Datei.
+    Gibt True zurück, wenn die Datei umgeschrieben wurde.
+    """
     with open(file_path, 'r', newline='', encoding='utf-8') as file:
         reader = csv.reader(file)
-        rows = list(reader)
-    
-    if not rows:  # Leere Datei
-        return
-    
-    header = rows[0]
-    
-    # Prüfen, ob "WIND" im Header vorkommt
-    wind_indices = []
-    non_wind_indices = []
-    
-    for i, column in enumerate(header):
-        if 'WIND' in column.upper():
-            wind_indices.append(i)
-        else:
-            non_wind_indices.append(i)
-    
-    # Falls keine WIND-Spalte gefunden wurde, nichts ändern
-    if not wind_indices:
-        return
-    
-    # Neue Reihenfolge der Spalten erstellen
-    new_rows = []
-    
-    for row in rows:
-        # Neue Zeile erstellen: erstens alle Nicht-WIND-Spalten, dann alle WIND-Spalten
-        new_row = []
-        
-        # Nicht-WIND-Spalten hinzufügen
-        for i in non_wind_indices:
-            if i < len(row):
-                new_row.append(row[i])
-            else:
-                new_row.append('')
-        
-        # WIND-Spalten hinten anhängen
-        for i in wind_indices:
-            if i < len(row):
-                new_row.append(row[i])
-            else:
-                new_row.append('')
-        
-        new_rows.append(new_row)
-    
-    # Verarbeitete Datei zurück schreiben
-    with open(file_path, 'w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerows(new_rows)
+        header = next(reader, None)
+        if header is None:  # Leere Datei
+            return False
+
+        # Keine WIND-Spalte oder WIND bereits am Ende: nichts zu tun
+        order = column_order(header)
+        if order is None:
+            return False
+
+        tmp_path = file_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', newline='', encoding='utf-8') as tmp_file:
+                writer = csv.writer(tmp_file)
+                writer.writerow([header[i] for i in order])
+                for row in reader:
+                    writer.writerow([row[i] if i < len(row) else '' for i in order])
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
 
-def process_folder(root_folder):
-    """Durchläuft alle CSV-Dateien in den Unterordnern."""
-    
+    # Erst nach dem Schließen des Originals ersetzen; unter Windows schlägt das Ersetzen
+    # einer noch geöffneten Datei fehl
+    try:
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+def find_csv_files(root_folder):
+    """Liefert alle CSV-Dateien in den Unterordnern."""
     for foldername, subfolders, filenames in os.walk(root_folder):
-        for filename in filenames:
+        for filename in sorted(filenames):
             if filename.lower().endswith('.csv'):
-                file_path = os.path.join(foldername, filename)
-                print(f"Verarbeite: {file_path}")
-                process_csv_file(file_path)
+                yield os.path.join(foldername, filename)
+
+
+def process_folder(root_folder, workers=None):
+    """Bereinigt alle CSV-Dateien parallel in einem Prozess-Pool."""
+    file_paths = list(find_csv_files(root_folder))
+    changed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for file_path, rewritten in zip(file_paths, executor.map(process_csv_file, file_paths)):
+            if rewritten:
+                changed += 1
+                print(f"Umgeschrieben: {file_path}")
+    print(f"{changed} von {len(file_paths)} Dateien umgeschrieben, {len(file_paths) - changed} bereits bereinigt")
+
 
 # Hauptprogramm
 if __name__ == "__main__":
-    data_folder = "data"
-    
+    parser = argparse.ArgumentParser(description="Verschiebt WIND-Spalten in allen CSV-Dateien ans Ende")
+    parser.add_argument("--data-path", default="data")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse (Standard: Anzahl CPUs)")
+    args = parser.parse_args()
+    data_folder = args.data_path
+
     # Prüfen, ob der Ordner existiert
     if not os.path.exists(data_folder):
         print(f"Ordner '{data_folder}' existiert nicht!")
     else:
         print(f"Starte Verarbeitung von Ordner: {data_folder}")
-        process_folder(data_folder)
-        print("Verarbeitung abgeschlossen!")
\ No newline at end of file
+        process_folder(data_folder, args.workers)
+        print("Verarbeitung abgeschlossen!")
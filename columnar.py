@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import shutil
+from datetime import date
+
+import numpy as np
+
+from disciplines import get_discipline
+from ingest import DATA_PATH, convert_position, iter_csv_files, iter_rows, parse_date, split_venue
+from manifest import file_hash, file_key
+
+STORE_PATH = "store"
+META_FILE = "meta.json"
+
+# Platzhalter für fehlende Werte in Ganzzahl-Spalten
+MISSING_INT = -(2 ** 31)
+EPOCH_ORDINAL = 719163   # date(1970, 1, 1).toordinal()
+
+# Spalten mit festem Typ: Name -> numpy-Datentyp
+NUMERIC_COLUMNS = {
+    "mark": np.float64,            # Sekunden, Meter oder Punkte
+    "date": np.int32,              # Tage seit 1970-01-01
+    "dob": np.int32,
+    "age_at_competition": np.int32,
+    "wind": np.float32,
+    "world_rank": np.int32,
+    "pos": np.int32,
+}
+
+# Wörterbuch-kodierte Spalten: int32-Codes + Liste der Kategorien
+CATEGORICAL_COLUMNS = ["gender", "discipline", "nat", "competitor", "country", "city", "mark_raw"]
+
+
+def _days(date_str):
+    if date_str == "":
+        return MISSING_INT
+    parsed, _ = parse_date(date_str)
+    return parsed.toordinal() - EPOCH_ORDINAL
+
+
+def days_to_date(days):
+    """
+    Wandelt einen Tageswert der date/dob-Spalten in "YYYY-MM-DD" um (None bei fehlendem Wert)
+    """
+    if days == MISSING_INT:
+        return None
+    return str(date.fromordinal(int(days) + EPOCH_ORDINAL))
+
+
+def _age(comp_days, dob_days):
+    if comp_days == MISSING_INT or dob_days == MISSING_INT:
+        return MISSING_INT
+    comp_date = date.fromordinal(comp_days + EPOCH_ORDINAL)
+    dob_date = date.fromordinal(dob_days + EPOCH_ORDINAL)
+    alter = comp_date.year - dob_date.year
+    if (comp_date.month, comp_date.day) < (dob_date.month, dob_date.day):
+        alter -= 1
+    return alter
+
+
+def _position(pos_str):
+    numeric_pos = convert_position(pos_str)["numeric_pos"]
+    return MISSING_INT if numeric_pos is None else int(numeric_pos)
+
+
+class _Encoder:
+    """
+    Wörterbuch-Kodierung einer Textspalte; leere Werte bekommen den Code -1
+    """
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, value):
+        if not value:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+
+def source_hashes(data_path=DATA_PATH):
+    return {file_key(folder_name, file_name): file_hash(file_path)
+            for folder_name, file_name, file_path in iter_csv_files(data_path)}
+
+
+def is_up_to_date(data_path=DATA_PATH, store_path=STORE_PATH, sources=None):
+    """
+    True, wenn der Speicher existiert und aus genau den aktuellen CSV-Dateien erzeugt wurde
+    """
+    meta_path = os.path.join(store_path, META_FILE)
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if sources is None:
+        sources = source_hashes(data_path)
+    return meta.get("sources") == sources
+
+
+def compile_store(data_path=DATA_PATH, store_path=STORE_PATH, force=False):
+    """
+    Übersetzt data/**.csv einmalig in typisierte Spalten (.npy) plus meta.json.
+    Wird nur neu erzeugt, wenn sich eine Quelldatei geändert hat (oder force=True).
+    Gibt True zurück, wenn neu kompiliert wurde.
+    """
+    sources = source_hashes(data_path)
+    if not force and is_up_to_date(data_path, store_path, sources):
+        return False
+
+    columns = {name: [] for name in NUMERIC_COLUMNS}
+    encoders = {name: _Encoder() for name in CATEGORICAL_COLUMNS}
+    codes = {name: [] for name in CATEGORICAL_COLUMNS}
+
+    for folder_name, file_name, file_path in iter_csv_files(data_path):
+        discipline = get_discipline(file_name)
+        rows = [row for _, row in iter_rows(file_path)]
+        if not rows:
+            continue
+        gender_code = encoders["gender"].encode(folder_name.capitalize())
+        discipline_code = encoders["discipline"].encode(discipline.name)
+
+        # Schneller Pfad: ganze Leistungsspalte auf einmal umwandeln
+        marks = discipline.parse_column([row[0] for row in rows])
+        columns["mark"].extend(np.nan if mark is None else mark for mark in marks)
+
+        for row_num, row in enumerate(rows, 1):
+            comp_days = _days(row[6])
+            dob_days = _days(row[2])
+            venue = split_venue(row[5]) if row[5] else None
+            columns["date"].append(comp_days)
+            columns["dob"].append(dob_days)
+            columns["age_at_competition"].append(_age(comp_days, dob_days))
+            columns["wind"].append(float(row[7]) if len(row) > 7 and row[7] != "" else np.nan)
+            columns["world_rank"].append(row_num)
+            columns["pos"].append(_position(row[4]))
+            codes["gender"].append(gender_code)
+            codes["discipline"].append(discipline_code)
+            codes["nat"].append(encoders["nat"].encode(row[3]))
+            codes["competitor"].append(encoders["competitor"].encode(row[1]))
+            codes["country"].append(encoders["country"].encode(venue[1] if venue else ""))
+            codes["city"].append(encoders["city"].encode(venue[0] if venue else ""))
+            codes["mark_raw"].append(encoders["mark_raw"].encode(row[0]))
+
+    # In ein temporäres Verzeichnis schreiben und erst dann austauschen,
+    # damit Leser nie einen halb geschriebenen Speicher sehen
+    tmp_path = store_path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, dtype in NUMERIC_COLUMNS.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(columns[name], dtype=dtype))
+    for name in CATEGORICAL_COLUMNS:
+        np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(codes[name], dtype=np.int32))
+
+    meta = {
+        "rows": len(columns["mark"]),
+        "sources": sources,
+        "categories": {name: encoders[name].values for name in CATEGORICAL_COLUMNS},
+    }
+    with open(os.path.join(tmp_path, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    shutil.rmtree(store_path, ignore_errors=True)
+    os.replace(tmp_path, store_path)
+    return True
+
+
+class ColumnStore:
+    """
+    Lesezugriff auf den kompilierten Speicher. Die Spalten werden per mmap geöffnet,
+    das Laden kostet daher praktisch nichts; Seiten werden erst beim Zugriff gelesen.
+    """
+
+    def __init__(self, store_path=STORE_PATH):
+        with open(os.path.join(store_path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.rows = meta["rows"]
+        self.categories = meta["categories"]
+        self._code_maps = {}
+        self.columns = {
+            name: np.load(os.path.join(store_path, f"{name}.npy"), mmap_mode="r")
+            for name in list(NUMERIC_COLUMNS) + CATEGORICAL_COLUMNS
+        }
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def code(self, name, value):
+        """
+        Code eines Kategorienwerts (-2, wenn der Wert nicht vorkommt)
+        """
+        code_map = self._code_maps.get(name)
+        if code_map is None:
+            code_map = {value: code for code, value in enumerate(self.categories[name])}
+            self._code_maps[name] = code_map
+        return code_map.get(value, -2)
+
+    def decode(self, name, codes):
+        """
+        Wandelt Codes einer kategorischen Spalte zurück in Strings (None für -1)
+        """
+        values = self.categories[name]
+        return [values[code] if code >= 0 else None for code in codes]
+
+
+def load_store(data_path=DATA_PATH, store_path=STORE_PATH, compile_if_needed=True):
+    """
+    Öffnet den Spaltenspeicher und kompiliert ihn vorher bei Bedarf neu
+    """
+    if compile_if_needed:
+        compile_store(data_path, store_path)
+    return ColumnStore(store_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kompiliert die CSV-Dateien in einen spaltenorientierten Speicher")
+    parser.add_argument("--data-path", default=DATA_PATH)
+    parser.add_argument("--store", default=STORE_PATH)
+    parser.add_argument("--force", action="store_true", help="Auch ohne Änderungen neu kompilieren")
+    args = parser.parse_args()
+
+    if compile_store(args.data_path, args.store, args.force):
+        store = ColumnStore(args.store)
+        print(f"Speicher '{args.store}' erstellt: {len(store)} Zeilen")
+    else:
+        print(f"Speicher '{args.store}' ist aktuell, nichts zu tun")
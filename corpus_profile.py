@@ -0,0 +1,285 @@
+import argparse
+import base64
+import csv
+import hashlib
+import json
+import math
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from disciplines import get_discipline
+from ingest import DATA_PATH, convert_position, iter_csv_files, parse_date, split_venue
+from manifest import file_hash, file_key
+
+PROFILE_CACHE_PATH = ".profile-cache.json"
+HLL_PRECISION = 12        # 4096 Register, Standardfehler ~1.6 %
+TOP_K = 10
+STORED_TOP_K = 100        # Pro Datei gespeicherte häufigste Werte (für das Zusammenführen)
+FULL_COUNTS_LIMIT = 1000  # Bis zu so vielen verschiedenen Werten pro Datei werden alle Häufigkeiten gespeichert
+MAX_EXAMPLES = 5
+# Einstellungen, die den Inhalt eines Dateiprofils bestimmen; ändern sie sich, wird der Cache ungültig
+PROFILE_SETTINGS = {"hll_precision": HLL_PRECISION, "stored_top_k": STORED_TOP_K,
+                    "full_counts_limit": FULL_COUNTS_LIMIT}
+# Abgeleitete Spalten: Stadt und Land aus Venue, Disziplin und Geschlecht aus dem Dateipfad
+DERIVED_COLUMNS = ["City", "Country", "Discipline", "Gender"]
+FACET_COLUMNS = {"nationalities": "Nat", "countries": "Country"}
+
+
+class HyperLogLog:
+    """
+    Schätzt die Anzahl verschiedener Werte mit 2^precision Registern (je ein Byte).
+    Sketches mehrerer Dateien werden über das Register-Maximum zusammengeführt.
+    """
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.size)
+
+    def add(self, value):
+        hashed = int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self):
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        raw = alpha * self.size * self.size / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * self.size and zeros:
+            # Kleine Mengen: lineares Zählen ist genauer
+            return round(self.size * math.log(self.size / zeros))
+        return round(raw)
+
+    def to_json(self):
+        return base64.b64encode(bytes(self.registers)).decode("ascii")
+
+    @classmethod
+    def from_json(cls, data, precision=HLL_PRECISION):
+        return cls(precision, base64.b64decode(data))
+
+
+def _anomalies(column, value, discipline):
+    """
+    Art der Auffälligkeit eines Werts oder None
+    """
+    try:
+        if column == "Mark":
+            if discipline.parse(value)["numeric_value"] is None:
+                return "mark_format"
+        elif column in ("Date", "DOB"):
+            parse_date(value)
+        elif column == "WIND":
+            float(value)
+        elif column == "Pos":
+            if convert_position(value)["numeric_pos"] is None:
+                return "pos_format"
+        elif column == "Venue":
+            if split_venue(value) is None:
+                return "venue_format"
+    except Exception:
+        return {"Mark": "mark_format", "Date": "date_format", "DOB": "date_format",
+                "WIND": "wind_format"}.get(column, "format")
+    return None
+
+
+def profile_file(folder_name, file_name, file_path):
+    """
+    Liest eine CSV-Datei einmal und erstellt pro Spalte: Anzahl, leere Werte,
+    häufigste Werte, HyperLogLog-Sketch und Auffälligkeiten im Format
+    """
+    discipline = get_discipline(file_name)
+    with open(file_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        counters = {column: Counter() for column in header + DERIVED_COLUMNS}
+        nulls = Counter()
+        anomalies = {}
+        anomalous_values = {}
+        rows = 0
+        for row_num, row in enumerate(reader, 1):
+            rows += 1
+            values = dict(zip(header, row))
+            venue = split_venue(values["Venue"]) if values.get("Venue") else None
+            values["City"] = venue[0] if venue else ""
+            values["Country"] = venue[1] if venue else ""
+            values["Discipline"] = discipline.name
+            values["Gender"] = folder_name.capitalize()
+            for column, counter in counters.items():
+                value = values.get(column, "")
+                if value == "":
+                    nulls[column] += 1
+                    continue
+                counter[value] += 1
+                # Auffälligkeiten nur beim ersten Auftreten eines Werts prüfen, gezählt wird unten pro Zeile
+                if counter[value] == 1:
+                    kind = _anomalies(column, value, discipline)
+                    if kind:
+                        entry = anomalies.setdefault(column, {}).setdefault(kind, {"count": 0, "examples": []})
+                        anomalous_values.setdefault((column, kind), []).append(value)
+                        if len(entry["examples"]) < MAX_EXAMPLES:
+                            entry["examples"].append({"row": row_num, "value": value})
+
+    for (column, kind), values in anomalous_values.items():
+        anomalies[column][kind]["count"] = sum(counters[column][value] for value in values)
+
+    columns = {}
+    for column, counter in counters.items():
+        sketch = HyperLogLog()
+        for value in counter:
+            sketch.add(value)
+        columns[column] = {
+            "count": rows - nulls[column],
+            "nulls": nulls[column],
+            "distinct": len(counter),
+            "top": counter.most_common(STORED_TOP_K),
+            "counts": dict(counter) if len(counter) <= FULL_COUNTS_LIMIT else None,
+            "hll": sketch.to_json(),
+            "anomalies": anomalies.get(column, {}),
+        }
+    return file_key(folder_name, file_name), {"rows": rows, "header": header, "columns": columns}
+
+
+def load_cache(path=PROFILE_CACHE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_cache(cache, path=PROFILE_CACHE_PATH):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def profile_files(data_path=DATA_PATH, cache_path=PROFILE_CACHE_PATH, workers=None):
+    """
+    Profile aller CSV-Dateien. Nur Dateien, deren Hash oder PROFILE_SETTINGS sich seit
+    dem letzten Lauf geändert haben, werden (parallel über Prozesse) neu gelesen.
+    Gibt ({Dateischlüssel: Profil}, Anzahl neu gelesener Dateien) zurück.
+    """
+    cache = load_cache(cache_path) if cache_path else {}
+    files = list(iter_csv_files(data_path))
+    hashes = {file_key(folder_name, file_name): file_hash(file_path) for folder_name, file_name, file_path in files}
+    stale = []
+    for folder_name, file_name, file_path in files:
+        entry = cache.get(file_key(folder_name, file_name), {})
+        if entry.get("sha256") != hashes[file_key(folder_name, file_name)] or entry.get("settings") != PROFILE_SETTINGS:
+            stale.append((folder_name, file_name, file_path))
+
+    if stale:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for key, profile in executor.map(profile_file, *zip(*stale)):
+                cache[key] = {"sha256": hashes[key], "settings": PROFILE_SETTINGS, "profile": profile}
+    cache = {key: cache[key] for key in sorted(hashes)}
+    if cache_path:
+        save_cache(cache, cache_path)
+    return {key: entry["profile"] for key, entry in cache.items()}, len(stale)
+
+
+def merge_profiles(profiles, top_k=TOP_K):
+    """
+    Führt die Dateiprofile zu einem Korpusprofil zusammen. Die Anzahl verschiedener
+    Werte ist exakt, solange jede Datei alle Häufigkeiten gespeichert hat, sonst eine
+    HyperLogLog-Schätzung; die häufigsten Werte sind dann ebenfalls nur genähert.
+    """
+    columns = {}
+    for file_key_, profile in profiles.items():
+        for column, stats in profile["columns"].items():
+            merged = columns.setdefault(column, {"count": 0, "nulls": 0, "counts": Counter(), "exact": True,
+                                                 "hll": HyperLogLog(), "anomalies": {}})
+            merged["count"] += stats["count"]
+            merged["nulls"] += stats["nulls"]
+            if stats["counts"] is not None:
+                merged["counts"].update(stats["counts"])
+            else:
+                merged["exact"] = False
+                merged["counts"].update(dict(stats["top"]))
+            merged["hll"].merge(HyperLogLog.from_json(stats["hll"]))
+            for kind, entry in stats["anomalies"].items():
+                target = merged["anomalies"].setdefault(kind, {"count": 0, "examples": []})
+                target["count"] += entry["count"]
+                for example in entry["examples"]:
+                    if len(target["examples"]) < MAX_EXAMPLES:
+                        target["examples"].append({"file": file_key_, **example})
+
+    report = {}
+    for column, merged in sorted(columns.items()):
+        total = merged["count"] + merged["nulls"]
+        report[column] = {
+            "count": merged["count"],
+            "null_rate": round(merged["nulls"] / total, 4) if total else 0.0,
+            "distinct": len(merged["counts"]) if merged["exact"] else merged["hll"].estimate(),
+            "distinct_exact": merged["exact"],
+            "top": merged["counts"].most_common(top_k),
+            "anomalies": merged["anomalies"],
+        }
+    return report
+
+
+def facet_lists(profiles):
+    """
+    Wertelisten für den Filterdialog der App: Disziplinen pro Geschlecht,
+    Nationalitäten und Länder der Austragungsorte jeweils mit Anzahl Resultate
+    """
+    disciplines = {}
+    facets = {name: Counter() for name in FACET_COLUMNS}
+    for profile in profiles.values():
+        columns = profile["columns"]
+        if not profile["rows"]:
+            continue
+        gender = columns["Gender"]["top"][0][0]
+        discipline = columns["Discipline"]["top"][0][0]
+        disciplines.setdefault(gender, {})[discipline] = profile["rows"]
+        for name, column in FACET_COLUMNS.items():
+            stats = columns[column]
+            facets[name].update(stats["counts"] if stats["counts"] is not None else dict(stats["top"]))
+    result = {"disciplines": {gender: dict(sorted(values.items())) for gender, values in sorted(disciplines.items())}}
+    result.update({name: dict(sorted(counter.items())) for name, counter in facets.items()})
+    return result
+
+
+def print_report(report, rows, files, rescanned):
+    print(f"{rows} Zeilen in {files} Dateien ({rescanned} neu gelesen)\n")
+    print(f"{'Spalte':<12} {'Werte':>9} {'leer':>7} {'verschieden':>12}  häufigste Werte")
+    for column, stats in report.items():
+        distinct = f"{stats['distinct']}{'' if stats['distinct_exact'] else '~'}"
+        top = ", ".join(f"{value} ({count})" for value, count in stats["top"][:3])
+        print(f"{column:<12} {stats['count']:>9} {stats['null_rate'] * 100:>6.1f}% {distinct:>12}  {top}")
+    for column, stats in report.items():
+        for kind, entry in stats["anomalies"].items():
+            examples = ", ".join(f"{example['file']}:{example['row']} '{example['value']}'"
+                                 for example in entry["examples"])
+            print(f"Auffällig {column}/{kind}: {entry['count']} Zeilen, z.B. {examples}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Profil aller CSV-Spalten in einem parallelen Durchlauf")
+    parser.add_argument("--data-path", default=DATA_PATH)
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse (Standard: Anzahl CPUs)")
+    parser.add_argument("--cache", default=PROFILE_CACHE_PATH, help="Profil-Cache pro Datei ('' = ohne Cache)")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--output", help="Korpusprofil als JSON schreiben")
+    parser.add_argument("--facets", help="Wertelisten für den Filterdialog als JSON schreiben")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    profiles, rescanned = profile_files(args.data_path, args.cache, args.workers)
+    report = merge_profiles(profiles, args.top_k)
+    print_report(report, sum(profile["rows"] for profile in profiles.values()), len(profiles), rescanned)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.facets:
+        with open(args.facets, "w", encoding="utf-8") as f:
+            json.dump(facet_lists(profiles), f, indent=2, ensure_ascii=False)
@@ -1,6 +1,11 @@
 from opensearchpy import OpenSearch
+import argparse
 import json
 
+from index_lifecycle import (ALIAS, DEFAULT_PROFILE, MAX_NUM_SEGMENTS, PROFILES, aliased_indices,
+                             create_load_index, delete_old_versions, finalize_index, index_profile, list_versions,
+                             profile_body, reindex, swap_alias)
+
 # Client verbinden
 client = OpenSearch(
     hosts=[{'host': 'localhost', 'port': 9200}],
@@ -9,138 +14,79 @@ client = OpenSearch(
     verify_certs=False
 )
 
-index_name = "sport-results"
-
-# OpenSearch-kompatibles Mapping
-index_body = {
-    "settings": {
-        "index": {
-            "number_of_shards": 2,
-            "number_of_replicas": 1,
-            "refresh_interval": "1s"
-        },
-        "analysis": {
-            "analyzer": {
-                "default": {
-                    "type": "standard"
-                }
-            }
-        }
-    },
-    "mappings": {
-        "properties": {
-            "age_at_competition": {
-                "type": "integer"
-            },
-            "competitor": {
-                "type": "text",
-                "fields": {
-                    "keyword": {
-                        "type": "keyword",
-                        "ignore_above": 256
-                    }
-                }
-            },
-            "date": {
-                "type": "date",
-                "format": "strict_date_optional_time||epoch_millis||yyyy-MM-dd"
-            },
-            "discipline": {
-                "type": "text",
-                "fields": {
-                    "keyword": {
-                        "type": "keyword"
-                    }
-                }
-            },
-            "dob": {
-                "type": "date",
-                "format": "strict_date_optional_time||epoch_millis||yyyy-MM-dd"
-            },
-            "gender": {
-                "type": "keyword"
-            },
-            "mark": {
-                "type": "object",
-                "properties": {
-                    "raw_value": {
-                        "type": "text"
-                    },
-                    "display_value": {
-                        "type": "text"
-                    },
-                    "numeric_value": {
-                        "type": "float"
-                    },
-                    "unit": {
-                        "type": "keyword"
-                    },
-                    "format_type": {
-                        "type": "keyword"
-                    }
-                }
-            },
-            "nat": {
-                "type": "keyword"
-            },
-            "pos": {
-                "type": "object",
-                "properties": {
-                    "raw_pos": {
-                        "type": "text"
-                    },
-                    "numeric_pos": {
-                        "type": "integer"
-                    },
-                    "group": {
-                        "type": "keyword"
-                    }
-                }
-            },
-            "world_rank": {
-                "type": "integer"
-            },
-            "venue": {
-                "type": "object",
-                "properties": {
-                    "venue_raw": {
-                        "type": "text"
-                    },
-                    "city": {
-                        "type": "keyword",
-                        "fields": {
-                            "text": {
-                                "type": "text"
-                            }
-                        }
-                    },
-                    "country": {
-                        "type": "keyword",
-                        "fields": {
-                            "text": {
-                                "type": "text"
-                            }
-                        }
-                    },
-                    "stadium": {
-                        "type": "text"
-                    },
-                    "extra": {
-                        "type": "text"
-                    }
-                }
-            },
-            "wind": {
-                "type": "float"
-            }
-        }
+
+def cmd_create(args):
+    index_name = create_load_index(client, profile_body(args.profile))
+    print(f"Index '{index_name}' mit Profil '{args.profile}' für das Laden erstellt (refresh_interval -1, 0 Replikate)")
+    print(f"Nach dem Laden: python create-index.py finalize {index_name}")
+
+
+def cmd_finalize(args):
+    finalize_index(client, args.index, args.max_num_segments)
+    previous, removed = swap_alias(client, args.index)
+    if removed:
+        print(f"Alter Index '{removed}' zugunsten des Alias entfernt")
+    print(f"Alias '{ALIAS}' zeigt jetzt auf '{args.index}' (vorher: {', '.join(previous) or '-'})")
+    if args.keep is not None:
+        for index in delete_old_versions(client, args.keep):
+            print(f"Alter Index '{index}' gelöscht")
+
+
+def cmd_reindex(args):
+    index_name, total = reindex(client, args.source, args.profile)
+    print(f"{total} Dokumente von '{args.source}' nach '{index_name}' (Profil '{args.profile}') kopiert")
+    finalize_index(client, index_name, args.max_num_segments)
+    if args.swap:
+        previous, removed = swap_alias(client, index_name)
+        if removed:
+            print(f"Alter Index '{removed}' zugunsten des Alias entfernt")
+        print(f"Alias '{ALIAS}' zeigt jetzt auf '{index_name}' (vorher: {', '.join(previous) or '-'})")
+    else:
+        print(f"Vergleich: python search-benchmark.py --index {args.source} {index_name}")
+
+
+def cmd_status(args):
+    versions = list_versions(client)
+    status = {
+        "alias": ALIAS,
+        "current": aliased_indices(client),
+        "versions": [versions[version] for version in sorted(versions)],
+        "profiles": {versions[version]: index_profile(client, versions[version]) for version in sorted(versions)},
     }
-}
+    print(json.dumps(status, indent=2, ensure_ascii=False))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=f"Verwaltet die versionierten Indizes hinter dem Alias '{ALIAS}'")
+    subparsers = parser.add_subparsers(dest="command")
+    # Ohne Unterbefehl wird create mit dem Standardprofil ausgeführt
+    parser.set_defaults(profile=DEFAULT_PROFILE)
+
+    create = subparsers.add_parser("create", help="Neuen Index sport-results-v<N> mit Ladeeinstellungen anlegen")
+    create.add_argument("--profile", choices=PROFILES, default=DEFAULT_PROFILE, help="Mapping-Profil")
+
+    finalize = subparsers.add_parser("finalize", help="Betriebseinstellungen setzen, mergen und Alias umsetzen")
+    finalize.add_argument("index", help="Name des geladenen Index, z.B. sport-results-v2")
+    finalize.add_argument("--max-num-segments", type=int, default=MAX_NUM_SEGMENTS)
+    finalize.add_argument("--keep", type=int, help="Nur die neuesten N Versionen behalten")
+
+    reindex_parser = subparsers.add_parser(
+        "reindex", help="Dokumente in einen neuen Index mit anderem Mapping-Profil kopieren und finalisieren")
+    reindex_parser.add_argument("--profile", choices=PROFILES, required=True, help="Mapping-Profil des neuen Index")
+    reindex_parser.add_argument("--source", default=ALIAS, help="Quellindex oder Alias")
+    reindex_parser.add_argument("--max-num-segments", type=int, default=MAX_NUM_SEGMENTS)
+    reindex_parser.add_argument("--swap", action="store_true", help="Alias danach auf den neuen Index setzen")
+
+    subparsers.add_parser("status", help="Alias, vorhandene Versionen und ihre Profile anzeigen")
+    return parser.parse_args()
+
 
 # Index erstellen
-try:
-    response = client.indices.create(index=index_name, body=index_body)
-    print(f"Index '{index_name}' erfolgreich erstellt:")
-    print(json.dumps(response, indent=2, ensure_ascii=False))
-except Exception as e:
-    print(f"Fehler beim Erstellen des Index: {e}")
\ No newline at end of file
+if __name__ == "__main__":
+    args = parse_args()
+    commands = {"create": cmd_create, "finalize": cmd_finalize, "reindex": cmd_reindex, "status": cmd_status}
+    try:
+        commands[args.command or "create"](args)
+    except Exception as e:
+        print(f"Fehler bei der Index-Verwaltung: {e}")
@@ -0,0 +1,171 @@
+import re
+
+# Art der Leistung je Disziplin. Laufdisziplinen (inkl. Staffeln, Gehen, Hürden,
+# Hindernis, Straße) werden als Zeit gemessen, Sprünge und Würfe als Weite,
+# Mehrkämpfe in Punkten.
+TIME = "Zeit"
+DISTANCE = "Weite"
+POINTS = "Punkte"
+
+DISCIPLINE_KINDS = {
+    "Diskuswurf": DISTANCE,
+    "Dreisprung": DISTANCE,
+    "Hammerwurf": DISTANCE,
+    "Hochsprung": DISTANCE,
+    "Kugelstossen": DISTANCE,
+    "Speerwurf": DISTANCE,
+    "Stabhochsprung": DISTANCE,
+    "Weitsprung": DISTANCE,
+    "Zehnkampf": POINTS,
+    "Siebenkampf": POINTS,
+    "Marathon 42km": TIME,
+    "Halbmarathon 21km": TIME,
+}
+
+# Alle übrigen Disziplinen mit Streckenangabe ("100m", "4x400m", "20km Gehen") sind Laufdisziplinen
+RACE_PATTERN = re.compile(r'^(\d+x)?\d+(m|km)\b')
+
+
+def _empty_mark():
+    return {"raw_value": None, "display_value": None, "numeric_value": None, "unit": None, "format_type": None}
+
+
+def _time_to_seconds(whole, fraction):
+    # Über den String, damit z.B. "1:41.11" exakt denselben float wie "101.11" ergibt
+    if fraction is None:
+        return float(whole)
+    return float(f"{whole}.{fraction}")
+
+
+def parse_time_value(mark_str):
+    """
+    Wandelt "9.58", "1:41.11", "2:01:09" oder "3:32:33.5" in Sekunden um.
+    Gibt (Sekunden, Anzahl Doppelpunkte) zurück.
+    """
+    parts = mark_str.split(":")
+    if len(parts) > 3:
+        raise ValueError(f"Unbekanntes Zeitformat: {mark_str}")
+    seconds, _, fraction = parts[-1].partition(".")
+    total = int(seconds)
+    for factor, part in zip((60, 3600), reversed(parts[:-1])):
+        total += int(part) * factor
+    return _time_to_seconds(total, fraction or None), len(parts) - 1
+
+
+TIME_FORMATS = {
+    0: ("Sekunden", "s"),
+    1: ("Minuten", "min"),
+    2: ("Stunden", "h"),
+}
+
+
+def parse_time(mark_str):
+    if mark_str.count(":") not in TIME_FORMATS:
+        return _empty_mark()
+    numeric_value, number_of_colons = parse_time_value(mark_str)
+    format_type, unit = TIME_FORMATS[number_of_colons]
+    return {
+        "raw_value": mark_str,
+        "display_value": mark_str,
+        "numeric_value": numeric_value,
+        "unit": unit,
+        "format_type": format_type,
+    }
+
+
+def parse_distance(mark_str):
+    return {
+        "raw_value": mark_str,
+        "display_value": mark_str,
+        "numeric_value": float(mark_str),
+        "unit": "m",
+        "format_type": "Meter",
+    }
+
+
+def parse_points(mark_str):
+    return {
+        "raw_value": mark_str,
+        "display_value": mark_str,
+        "numeric_value": float(mark_str),
+        "unit": "",
+        "format_type": "Punkte",
+    }
+
+
+class Discipline:
+    """
+    Metadaten einer Disziplin: Name, Art der Leistung, Einheit und der passende Parser.
+    Wird einmal pro Datei ermittelt, pro Zeile bleibt nur noch der Aufruf von parse().
+    """
+
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        if kind == TIME:
+            self.unit = "s"
+            self._parse = parse_time
+        elif kind == DISTANCE:
+            self.unit = "m"
+            self._parse = parse_distance
+        else:
+            self.unit = ""
+            self._parse = parse_points
+
+    def parse(self, mark_str):
+        """
+        Wandelt eine Leistung in das mark-Objekt um. Handgestoppte Zeiten ("10.3h")
+        werden wie bisher mit 0 aufgefüllt.
+        """
+        if "h" in mark_str:
+            mark_str = mark_str.replace("h", "0")
+        if mark_str == "":
+            return _empty_mark()
+        return self._parse(mark_str)
+
+    def parse_column(self, marks):
+        """
+        Schneller Pfad für eine ganze Spalte: liefert nur die numerischen Werte
+        (Sekunden, Meter oder Punkte), leere oder ungültige Leistungen als None.
+        """
+        if self.kind == TIME:
+            convert = lambda mark: parse_time_value(mark)[0]
+        else:
+            convert = float
+        values = []
+        for mark in marks:
+            if "h" in mark:
+                mark = mark.replace("h", "0")
+            try:
+                values.append(convert(mark) if mark else None)
+            except ValueError:
+                values.append(None)
+        return values
+
+    def __repr__(self):
+        return f"Discipline({self.name!r}, {self.kind!r})"
+
+
+def discipline_kind(name):
+    if name in DISCIPLINE_KINDS:
+        return DISCIPLINE_KINDS[name]
+    if name.endswith("kampf"):
+        return POINTS
+    if RACE_PATTERN.match(name):
+        return TIME
+    return DISTANCE
+
+
+_registry = {}
+
+
+def get_discipline(file_name):
+    """
+    Liefert die Disziplin zu einem Dateinamen ("100m.csv") oder Disziplinnamen ("100m")
+    """
+    discipline = _registry.get(file_name)
+    if discipline is None:
+        name = file_name.replace(".csv", "")
+        discipline = Discipline(name, discipline_kind(name))
+        _registry[file_name] = discipline
+    return discipline
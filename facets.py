@@ -0,0 +1,104 @@
+import os
+from collections import Counter
+
+from artifacts import FileArtifact, load_artifact
+from ingest_version import ARTIFACTS_PATH
+
+FACETS_FILE = "facets.json.gz"
+
+
+def facets_path(artifacts_path=ARTIFACTS_PATH):
+    return os.path.join(artifacts_path, FACETS_FILE)
+
+
+class FacetBuilder:
+    """
+    Zählt während des Ingest pro CSV-Datei (= Geschlecht und Disziplin) die
+    Resultate nach Nationalität und Land des Austragungsorts
+    """
+
+    def __init__(self):
+        self.files = {}
+
+    def observe(self, key, record):
+        contribution = self.files.get(key)
+        if contribution is None:
+            contribution = self.files[key] = {"gender": record.gender, "discipline": record.discipline,
+                                              "results": 0, "nat": Counter(), "country": Counter()}
+        contribution["results"] += 1
+        if record.nat:
+            contribution["nat"][record.nat] += 1
+        if record.venue.country:
+            contribution["country"][record.venue.country] += 1
+
+    def contributions(self, keys):
+        """
+        (Dateischlüssel, Beitrag)-Paare, None für Dateien ohne Zeilen; gibt die Zähler dabei frei
+        """
+        for key in keys:
+            contribution = self.files.pop(key, None)
+            if contribution is None:
+                yield key, None
+                continue
+            yield key, {**contribution, "nat": dict(sorted(contribution["nat"].items())),
+                        "country": dict(sorted(contribution["country"].items()))}
+
+
+def update_facets(builder, keys, removed, index_name, artifacts_path=ARTIFACTS_PATH, keep=None):
+    artifact = FileArtifact(facets_path(artifacts_path))
+    artifact.update(builder.contributions(keys), removed, keep)
+    artifact.data["index"] = index_name
+    artifact.save()
+
+
+class Facets:
+    """
+    Facettenwerte und -anzahlen aus dem Artefakt. Antworten werden pro Filterkombination
+    (Geschlecht, Disziplin) einmal berechnet und danach aus dem Speicher geliefert.
+    """
+
+    def __init__(self, artifact):
+        artifact = artifact or {"files": {}}
+        self.index = artifact.get("index")
+        self.files = list(artifact["files"].values())
+        self._known = ({None} | {contribution["gender"] for contribution in self.files},
+                       {None} | {contribution["discipline"] for contribution in self.files})
+        self._answers = {}
+
+    def get(self, gender=None, discipline=None):
+        key = (gender, discipline)
+        answer = self._answers.get(key)
+        if answer is not None:
+            return answer
+
+        disciplines = {}
+        genders = Counter()
+        nationalities = Counter()
+        countries = Counter()
+        for contribution in self.files:
+            # Disziplinen werden nur nach Geschlecht gefiltert, Geschlechter nur nach Disziplin,
+            # damit der Filterdialog die Alternativen zur aktuellen Auswahl anzeigen kann
+            if gender is None or contribution["gender"] == gender:
+                disciplines.setdefault(contribution["gender"], Counter())[contribution["discipline"]] += \
+                    contribution["results"]
+            if discipline is None or contribution["discipline"] == discipline:
+                genders[contribution["gender"]] += contribution["results"]
+            if (gender is None or contribution["gender"] == gender) and \
+                    (discipline is None or contribution["discipline"] == discipline):
+                nationalities.update(contribution["nat"])
+                countries.update(contribution["country"])
+
+        answer = {
+            "disciplines": {name: dict(sorted(counter.items())) for name, counter in sorted(disciplines.items())},
+            "genders": dict(sorted(genders.items())),
+            "nationalities": dict(sorted(nationalities.items())),
+            "countries": dict(sorted(countries.items())),
+        }
+        # Nur bekannte Werte zwischenspeichern, beliebige Eingaben sollen den Speicher nicht füllen
+        if gender in self._known[0] and discipline in self._known[1]:
+            self._answers[key] = answer
+        return answer
+
+
+def load_facets(artifacts_path=ARTIFACTS_PATH):
+    return Facets(load_artifact(facets_path(artifacts_path)))
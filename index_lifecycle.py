@@ -0,0 +1,323 @@
+import copy
+import re
+
+ALIAS = "sport-results"
+VERSION_PATTERN = re.compile(r'^' + re.escape(ALIAS) + r'-v(\d+)$')
+
+# Einstellungen während des Ladens: kein Refresh, keine Replikate
+LOAD_SETTINGS = {
+    "refresh_interval": "-1",
+    "number_of_replicas": 0,
+}
+SERVING_REFRESH_INTERVAL = "1s"
+MAX_NUM_SEGMENTS = 2
+
+# OpenSearch-kompatibles Mapping
+INDEX_BODY = {
+    "settings": {
+        "index": {
+            "number_of_shards": 2,
+            "number_of_replicas": 1,
+            "refresh_interval": "1s"
+        },
+        "analysis": {
+            "analyzer": {
+                "default": {
+                    "type": "standard"
+                }
+            }
+        }
+    },
+    "mappings": {
+        "properties": {
+            "age_at_competition": {
+                "type": "integer"
+            },
+            "athlete_id": {
+                "type": "keyword"
+            },
+            "competitor": {
+                "type": "text",
+                "fields": {
+                    "keyword": {
+                        "type": "keyword",
+                        "ignore_above": 256
+                    }
+                }
+            },
+            "date": {
+                "type": "date",
+                "format": "strict_date_optional_time||epoch_millis||yyyy-MM-dd"
+            },
+            "discipline": {
+                "type": "text",
+                "fields": {
+                    "keyword": {
+                        "type": "keyword"
+                    }
+                }
+            },
+            "dob": {
+                "type": "date",
+                "format": "strict_date_optional_time||epoch_millis||yyyy-MM-dd"
+            },
+            "gender": {
+                "type": "keyword"
+            },
+            "mark": {
+                "type": "object",
+                "properties": {
+                    "raw_value": {
+                        "type": "text"
+                    },
+                    "display_value": {
+                        "type": "text"
+                    },
+                    "numeric_value": {
+                        "type": "float"
+                    },
+                    "unit": {
+                        "type": "keyword"
+                    },
+                    "format_type": {
+                        "type": "keyword"
+                    }
+                }
+            },
+            "nat": {
+                "type": "keyword"
+            },
+            "pos": {
+                "type": "object",
+                "properties": {
+                    "raw_pos": {
+                        "type": "text"
+                    },
+                    "numeric_pos": {
+                        "type": "integer"
+                    },
+                    "group": {
+                        "type": "keyword"
+                    }
+                }
+            },
+            "world_rank": {
+                "type": "integer"
+            },
+            "venue": {
+                "type": "object",
+                "properties": {
+                    "venue_raw": {
+                        "type": "text"
+                    },
+                    "city": {
+                        "type": "keyword",
+                        "fields": {
+                            "text": {
+                                "type": "text"
+                            }
+                        }
+                    },
+                    "country": {
+                        "type": "keyword",
+                        "fields": {
+                            "text": {
+                                "type": "text"
+                            }
+                        }
+                    },
+                    "stadium": {
+                        "type": "text"
+                    },
+                    "extra": {
+                        "type": "text"
+                    }
+                }
+            },
+            "wind": {
+                "type": "float"
+            }
+        }
+    }
+}
+
+# Mapping-Profile: "default" ist INDEX_BODY, "lean" spart Indexstrukturen, die keine Abfrage
+# nutzt, "leaderboard" sortiert den Index zusätzlich für Bestenlisten
+PROFILES = ("default", "lean", "leaderboard")
+DEFAULT_PROFILE = "default"
+# Nur zur Anzeige: bleiben im _source, werden aber weder indexiert noch als doc_values gespeichert
+DISPLAY_ONLY_FIELDS = ("mark.raw_value", "mark.display_value", "pos.raw_pos", "venue.stadium", "venue.extra")
+# term-Filter der App (gender, nat) treffen unabhängig von Groß-/Kleinschreibung
+NORMALIZED_FIELDS = ("gender", "nat")
+# Facetten des Filterdialogs: globale Ordinals beim Refresh statt bei der ersten Aggregation aufbauen
+FACET_FIELDS = ("gender", "nat", "discipline.keyword", "venue.country")
+# Indexsortierung des leaderboard-Profils; Top-N-Abfragen mit demselben Sortierpräfix können
+# pro Segment nach N Treffern abbrechen (bei absteigender Leistung, also Weiten und Punkten, nicht)
+LEADERBOARD_SORT = (("discipline.keyword", "asc"), ("gender", "asc"), ("mark.numeric_value", "asc"))
+
+
+def _field(properties, path):
+    """
+    Mapping eines Felds per Punktpfad, z.B. mark.raw_value oder discipline.keyword (Unterfeld)
+    """
+    parent, _, name = path.rpartition(".")
+    if not parent:
+        return properties[name]
+    mapping = _field(properties, parent)
+    return (mapping.get("properties") or mapping["fields"])[name]
+
+
+def profile_body(profile=DEFAULT_PROFILE):
+    """
+    Index-Body eines Mapping-Profils. Der Profilname steht in mappings._meta, damit
+    status und reindex ihn anzeigen können. Die Normalizer verkleinern auch die Werte
+    in Aggregationen (z.B. "men", "jam"); _source bleibt unverändert.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unbekanntes Profil: {profile}")
+    body = copy.deepcopy(INDEX_BODY)
+    body["mappings"]["_meta"] = {"profile": profile}
+    if profile == DEFAULT_PROFILE:
+        return body
+
+    properties = body["mappings"]["properties"]
+    for path in DISPLAY_ONLY_FIELDS:
+        mapping = _field(properties, path)
+        mapping.clear()
+        mapping.update({"type": "keyword", "index": False, "doc_values": False})
+    body["settings"]["analysis"]["normalizer"] = {
+        "lowercase": {"type": "custom", "filter": ["lowercase"]},
+    }
+    for path in NORMALIZED_FIELDS:
+        _field(properties, path)["normalizer"] = "lowercase"
+    for path in FACET_FIELDS:
+        _field(properties, path)["eager_global_ordinals"] = True
+
+    if profile == "leaderboard":
+        body["settings"]["index"].update({
+            "sort.field": [field for field, _ in LEADERBOARD_SORT],
+            "sort.order": [order for _, order in LEADERBOARD_SORT],
+            "sort.missing": ["_last"] * len(LEADERBOARD_SORT),
+        })
+    return body
+
+
+def index_profile(client, index_name):
+    """
+    Profilname aus mappings._meta; Indizes ohne Eintrag haben das Standardprofil
+    """
+    mapping = client.indices.get_mapping(index=index_name)
+    meta = next(iter(mapping.values()), {}).get("mappings", {}).get("_meta") or {}
+    return meta.get("profile", DEFAULT_PROFILE)
+
+
+def list_versions(client):
+    """
+    Liefert {Version: Indexname} aller versionierten Indizes sport-results-v<N>
+    """
+    versions = {}
+    for index in client.indices.get(index=f"{ALIAS}-v*", ignore_unavailable=True, allow_no_indices=True):
+        match = VERSION_PATTERN.match(index)
+        if match:
+            versions[int(match.group(1))] = index
+    return versions
+
+
+def aliased_indices(client):
+    """
+    Indizes, auf die der Alias sport-results aktuell zeigt
+    """
+    if not client.indices.exists_alias(name=ALIAS):
+        return []
+    return list(client.indices.get_alias(name=ALIAS))
+
+
+def serving_replicas(client, wanted=INDEX_BODY["settings"]["index"]["number_of_replicas"]):
+    """
+    Anzahl Replikate für den Betrieb. Auf einem Single-Node-Cluster kann ein
+    Replikat nie zugewiesen werden (Status gelb), daher höchstens Datenknoten - 1.
+    """
+    data_nodes = client.cluster.health()["number_of_data_nodes"]
+    return max(0, min(wanted, data_nodes - 1))
+
+
+def create_load_index(client, index_body=None):
+    """
+    Legt den nächsten versionierten Index sport-results-v<N> mit Ladeeinstellungen
+    (refresh_interval -1, 0 Replikate) an und gibt seinen Namen zurück.
+    Ohne index_body wird das Standardprofil verwendet.
+    """
+    if index_body is None:
+        index_body = profile_body(DEFAULT_PROFILE)
+    versions = list_versions(client)
+    index_name = f"{ALIAS}-v{max(versions, default=0) + 1}"
+    body = {**index_body, "settings": {**index_body["settings"],
+                                       "index": {**index_body["settings"]["index"], **LOAD_SETTINGS}}}
+    client.indices.create(index=index_name, body=body)
+    return index_name
+
+
+def reindex(client, source, profile, slices="auto"):
+    """
+    Kopiert alle Dokumente von source (Index oder Alias) in einen neuen versionierten Index
+    mit dem Mapping-Profil profile. Gibt (Name des neuen Index, Anzahl Dokumente) zurück.
+    """
+    index_name = create_load_index(client, profile_body(profile))
+    response = client.reindex(body={"source": {"index": source}, "dest": {"index": index_name}},
+                              slices=slices, request_timeout=3600)
+    if response.get("failures"):
+        raise RuntimeError(f"Reindex nach '{index_name}' mit {len(response['failures'])} Fehlern abgebrochen")
+    return index_name, response["total"]
+
+
+def finalize_index(client, index_name, max_num_segments=MAX_NUM_SEGMENTS):
+    """
+    Beendet das Laden: Betriebseinstellungen wiederherstellen, Refresh, Force-Merge
+    auf wenige Segmente und warten, bis der Index mindestens gelb ist.
+    """
+    client.indices.put_settings(index=index_name, body={
+        "index": {
+            "refresh_interval": SERVING_REFRESH_INTERVAL,
+            "number_of_replicas": serving_replicas(client),
+        }
+    })
+    client.indices.refresh(index=index_name)
+    client.indices.forcemerge(index=index_name, max_num_segments=max_num_segments, request_timeout=3600)
+    client.cluster.health(index=index_name, wait_for_status="yellow", request_timeout=600)
+
+
+def swap_alias(client, index_name):
+    """
+    Setzt den Alias sport-results atomar auf index_name um. Ein alter, nicht
+    versionierter Index mit dem Namen sport-results wird im selben Schritt entfernt,
+    da Alias und Index nicht denselben Namen haben können.
+    Gibt (Indizes, auf die der Alias vorher gezeigt hat, entfernter alter Index oder None) zurück;
+    die Ausgabe übernimmt der Aufrufer.
+    """
+    actions = []
+    previous = []
+    removed = None
+    if client.indices.exists(index=ALIAS) and not client.indices.exists_alias(name=ALIAS):
+        removed = ALIAS
+        actions.append({"remove_index": {"index": ALIAS}})
+    else:
+        previous = [index for index in aliased_indices(client) if index != index_name]
+        actions.extend({"remove": {"index": index, "alias": ALIAS}} for index in previous)
+    actions.append({"add": {"index": index_name, "alias": ALIAS}})
+    client.indices.update_aliases(body={"actions": actions})
+    return previous, removed
+
+
+def delete_old_versions(client, keep=2):
+    """
+    Löscht alte versionierte Indizes, die nicht am Alias hängen; die neuesten keep bleiben erhalten
+    """
+    current = set(aliased_indices(client))
+    versions = list_versions(client)
+    deleted = []
+    for version in sorted(versions)[:-keep] if keep else sorted(versions):
+        index = versions[version]
+        if index not in current:
+            client.indices.delete(index=index)
+            deleted.append(index)
+    return deleted
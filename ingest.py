@@ -0,0 +1,537 @@
+import csv
+import hashlib
+import logging
+import os
+import re
+import sys
+import unicodedata
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from functools import lru_cache
+from itertools import islice
+
+from disciplines import get_discipline
+
+logger = logging.getLogger("ingest")
+
+DATA_PATH = "data"
+GENDER_FOLDERS = ["men", "women"]
+INDEX_NAME = "sport-results"
+CHUNK_ROWS = 10000   # Maximale Zeilenanzahl pro Arbeitspaket im Parallelbetrieb
+DATE_CACHE_SIZE = 65536
+VENUE_CACHE_SIZE = 16384
+ATHLETE_CACHE_SIZE = 65536
+MARK_CACHE_SIZE = 65536
+POSITION_CACHE_SIZE = 4096
+
+phases = {
+    "f": "Finale",
+    "h": "Vorrunde",
+    "er": "Extra",
+    "sf": "Halbfinale",
+    "sr": "Halbfinale",
+    "pr": "Vorausscheid",
+    "ce": "Kombiniert",
+    "qf": "Viertelfinale",
+    "q": "Qualifikation"
+}
+
+month_map = {
+    'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4,
+    'MAY': 5, 'JUN': 6, 'JUL': 7, 'AUG': 8,
+    'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12
+}
+
+POSITION_PATTERN = re.compile(r'^(\d+)([a-zA-Z]+)(\d+)$')
+
+
+def convert_position(pos_str):
+    """
+    Wandelt die Platzierung (z.B. "1", "3h2", "2.") in das pos-Objekt um
+    """
+    pos = {"raw_pos": None, "numeric_pos": None, "group": None}
+
+    if pos_str == "":
+        return pos
+
+    if "." in pos_str:
+        pos["numeric_pos"] = pos_str.split(".")[0]
+        pos["raw_pos"] = pos_str.split(".")[0]
+        return pos
+
+    if pos_str.isdigit():
+        pos["numeric_pos"] = int(pos_str)
+        pos["raw_pos"] = pos_str
+        return pos
+
+    match = POSITION_PATTERN.match(pos_str)
+    if match:
+        position = match.group(1)
+        phase = match.group(2)
+        group = match.group(3)
+        pos["numeric_pos"] = position
+        pos["raw_pos"] = pos_str
+        pos["group"] = phases.get(phase, phase) + " " + group
+    return pos
+
+
+# Unveränderliche Teilobjekte eines Resultats. Sie kommen aus den Parse-Caches und
+# werden von allen Zeilen mit demselben Rohwert geteilt statt pro Zeile neu angelegt.
+Mark = namedtuple("Mark", ["raw_value", "display_value", "numeric_value", "unit", "format_type"])
+Position = namedtuple("Position", ["raw_pos", "numeric_pos", "group"])
+Venue = namedtuple("Venue", ["venue_raw", "city", "country", "stadium", "extra"])
+
+
+@lru_cache(maxsize=POSITION_CACHE_SIZE)
+def parse_position(pos_str):
+    """
+    Gepufferte Variante von convert_position als Position-Tupel
+    """
+    return Position(**convert_position(pos_str))
+
+
+def convert_mark(mark_str, file_name):
+    """
+    Wandelt die Leistung in das mark-Objekt um (Punkte, Sekunden, Meter, Minuten, Stunden)
+    """
+    return get_discipline(file_name).parse(mark_str)
+
+
+def to_date(date_str):
+    """
+    Wandelt "21 AUG 1986", "AUG 1986" oder "1986" in ein date um
+    """
+    number_of_chars = len(date_str)
+    if number_of_chars == 11:
+        day, month_str, year = date_str.split()
+        month = month_map[month_str.upper()]
+        return date(int(year), month, int(day))
+    if number_of_chars == 8:
+        month_str, year = date_str.split()
+        month = month_map[month_str.upper()]
+        return date(int(year), month, 1)
+    elif number_of_chars == 4:
+        year = date_str
+        return date(int(year), 1, 1)
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date(date_str):
+    """
+    Gepufferte Variante von to_date, gibt (date, "YYYY-MM-DD") zurück.
+    Geburts- und Wettkampfdaten wiederholen sich stark.
+    """
+    parsed = to_date(date_str)
+    return parsed, str(parsed)
+
+
+def calculate_age_at_comp(date_venue, dob):
+    """
+    Gibt (Alter beim Wettkampf, Geburtsdatum, Wettkampfdatum) zurück.
+    Fehlt eines der beiden Daten, sind wie bisher alle drei Werte None.
+    """
+    if dob == "" or date_venue == "":
+        return None, None, None
+    comp_date, comp_str = parse_date(date_venue)
+    dob_date, dob_str = parse_date(dob)
+
+     # Altersberechnung
+    alter = comp_date.year - dob_date.year
+
+    # Korrektur für Geburtstag, der noch nicht stattgefunden hat
+    if (comp_date.month, comp_date.day) < (dob_date.month, dob_date.day):
+        alter -= 1
+
+    return alter, dob_str, comp_str
+
+
+@lru_cache(maxsize=VENUE_CACHE_SIZE)
+def split_venue(venue_str):
+    """
+    Zerlegt den Austragungsort in (Stadt, Land, Stadion, Zusatz). Gepuffert, da
+    dieselben Austragungsorte tausendfach vorkommen. Gibt None zurück, wenn das
+    Format nicht erkannt wird.
+    """
+    number_of_commas = venue_str.count(",")
+
+    if number_of_commas == 0:
+        klammer_start = venue_str.find("(")
+        return venue_str[:klammer_start].strip(), venue_str[klammer_start:].strip("()"), "", ""
+    if number_of_commas == 1:
+        stadium, rest = venue_str.split(",", 1)
+        klammer_start = rest.find("(")
+        return rest[:klammer_start].strip(), rest[klammer_start:].strip("()"), stadium.strip(), ""
+    if number_of_commas == 2:
+        stadium, city, rest = venue_str.split(",", 2)
+        klammer_start = rest.find("(")
+        return city.strip(), rest[klammer_start:].strip("()"), stadium.strip(), rest[:klammer_start].strip()
+    return None
+
+
+def convert_venue(venue_str):
+    """
+    Zerlegt den Austragungsort in Stadion, Stadt, Land (in Klammern) und Zusatz
+    """
+    parts = split_venue(venue_str) if venue_str else None
+    if parts is None:
+        return {"venue_raw": None, "city": None, "country": None, "stadium": None, "extra": None}
+
+    city, country, stadium, extra = parts
+    return {"venue_raw": venue_str, "city": city, "country": country, "stadium": stadium, "extra": extra}
+
+
+@lru_cache(maxsize=VENUE_CACHE_SIZE)
+def parse_venue(venue_str):
+    """
+    Gepufferte Variante von convert_venue als Venue-Tupel
+    """
+    return Venue(**convert_venue(venue_str))
+
+
+@lru_cache(maxsize=MARK_CACHE_SIZE)
+def parse_mark(discipline, mark_str):
+    """
+    Gepufferte Variante von discipline.parse als Mark-Tupel. Leistungen wiederholen
+    sich innerhalb einer Disziplin stark (z.B. "10.05" im 100m).
+    """
+    return Mark(**discipline.parse(mark_str))
+
+
+class ResultRecord:
+    """
+    Kompakte Form eines Resultats während des Ingest. Statt eines verschachtelten
+    Dicts pro Zeile hält der Datensatz nur Slots: Kategorien (Name, Nation, Geschlecht,
+    Disziplin) als internierte Strings, Daten und athlete_id aus den Parse-Caches,
+    Leistung, Platzierung und Austragungsort als geteilte Tupel. Das OpenSearch-Dokument
+    entsteht erst mit source() unmittelbar vor dem Serialisieren.
+    """
+
+    __slots__ = ("age_at_competition", "athlete_id", "competitor", "date", "discipline", "dob", "gender",
+                 "mark", "nat", "pos", "world_rank", "venue", "wind")
+
+    def __init__(self, age_at_competition, athlete_id, competitor, date, discipline, dob, gender,
+                 mark, nat, pos, world_rank, venue, wind):
+        self.age_at_competition = age_at_competition
+        self.athlete_id = athlete_id
+        self.competitor = competitor
+        self.date = date
+        self.discipline = discipline
+        self.dob = dob
+        self.gender = gender
+        self.mark = mark
+        self.nat = nat
+        self.pos = pos
+        self.world_rank = world_rank
+        self.venue = venue
+        self.wind = wind
+
+    def __reduce__(self):
+        # Für die Übergabe aus den Worker-Prozessen; geteilte Tupel werden pro Paket nur einmal gepickelt
+        return ResultRecord, tuple(getattr(self, name) for name in self.__slots__)
+
+    def source(self):
+        """
+        Das OpenSearch-Dokument als verschachteltes Dict
+        """
+        return {
+            "age_at_competition": self.age_at_competition,
+            "athlete_id": self.athlete_id,
+            "competitor": self.competitor,
+            "date": self.date,
+            "discipline": self.discipline,
+            "dob": self.dob,
+            "gender": self.gender,
+            "mark": self.mark._asdict(),
+            "nat": self.nat,
+            "pos": self.pos._asdict(),
+            "world_rank": self.world_rank,
+            "venue": self.venue._asdict(),
+            "wind": self.wind,
+        }
+
+
+_worker_cache_stats = {}
+
+
+def normalize_name(name):
+    """
+    Vergleichsform eines Namens: Kleinbuchstaben ohne Akzente, einfache Leerzeichen
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    return " ".join("".join(c for c in decomposed if not unicodedata.combining(c)).lower().split())
+
+
+@lru_cache(maxsize=ATHLETE_CACHE_SIZE)
+def athlete_id(competitor, dob, nat):
+    """
+    Stabile ID einer Athletin / eines Athleten aus (normalisierter Name, Geburtsdatum, Nation).
+    Schreibweisen mit und ohne Akzente oder in anderer Groß-/Kleinschreibung ergeben dieselbe ID,
+    Namensvettern mit anderem Geburtsdatum oder anderer Nation nicht.
+    """
+    content = "\x1f".join((normalize_name(competitor), dob or "", nat))
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _local_cache_stats():
+    stats = {}
+    for name, cached in (("date", parse_date), ("venue", parse_venue), ("mark", parse_mark),
+                         ("position", parse_position), ("athlete", athlete_id)):
+        info = cached.cache_info()
+        stats[name] = {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+    return stats
+
+
+def cache_stats():
+    """
+    Treffer/Fehlschläge der Parse-Caches, inklusive der Worker-Prozesse im Parallelbetrieb
+    """
+    stats = _local_cache_stats()
+    for worker_stats in _worker_cache_stats.values():
+        for name, counters in worker_stats.items():
+            for counter in ("hits", "misses", "size"):
+                stats[name][counter] += counters[counter]
+    return stats
+
+
+def format_cache_stats(stats):
+    lines = []
+    for name, counters in stats.items():
+        total = counters["hits"] + counters["misses"]
+        rate = counters["hits"] / total * 100 if total else 0.0
+        lines.append(f"Cache {name}: {counters['hits']} Treffer, {counters['misses']} Fehlschläge "
+                     f"({rate:.1f}% Trefferquote), {counters['size']}/{counters['maxsize']} Einträge")
+    return "\n".join(lines)
+
+
+def transform_row(row, gender_folder, file_name, world_rank, discipline=None):
+    """
+    Wandelt eine CSV-Zeile (Mark, Competitor, DOB, Nat, Pos, Venue, Date[, WIND])
+    in einen ResultRecord um; record.source() ist das OpenSearch-Dokument.
+    Die Funktion hat keine Seiteneffekte außer den Parse-Caches.
+    discipline kann vom Aufrufer einmal pro Datei ermittelt und mitgegeben werden.
+    """
+    if discipline is None:
+        discipline = get_discipline(file_name)
+    age, dob, comp_date = calculate_age_at_comp(row[6], row[2])
+    wind = None
+    if len(row) > 7 and row[7] != "":
+        wind = float(row[7])
+
+    return ResultRecord(
+        age,
+        athlete_id(row[1], dob, row[3]) if row[1] else None,
+        sys.intern(row[1]) if row[1] else None,
+        comp_date,
+        discipline.name,
+        dob,
+        sys.intern(gender_folder.capitalize()),
+        parse_mark(discipline, row[0]),
+        sys.intern(row[3]) if row[3] else None,
+        parse_position(row[4]),
+        world_rank,
+        parse_venue(row[5]),
+        wind,
+    )
+
+
+def iter_csv_files(data_path=DATA_PATH):
+    """
+    Liefert (Ordner, Dateiname, Pfad) für alle CSV-Dateien in data/men und data/women
+    """
+    for folder_name in GENDER_FOLDERS:
+        folder_path = os.path.join(data_path, folder_name)
+        if not os.path.isdir(folder_path):
+            continue
+        for file_name in sorted(os.listdir(folder_path)):
+            if file_name.lower().endswith('.csv'):
+                yield folder_name, file_name, os.path.join(folder_path, file_name)
+
+
+def column_order(header):
+    """
+    Virtuelle Spaltenreihenfolge einer Datei: alle Nicht-WIND-Spalten in ihrer
+    Reihenfolge, danach die WIND-Spalten (wie clean-data.py sie umsortiert).
+    None, wenn die Datei bereits so vorliegt.
+    """
+    wind_indices = [i for i, column in enumerate(header) if "WIND" in column.upper()]
+    order = [i for i in range(len(header)) if i not in wind_indices] + wind_indices
+    return None if order == list(range(len(header))) else order
+
+
+def iter_rows(file_path, offset=None, first_row=1):
+    """
+    Liefert (Zeilennummer, Zeile) einer CSV-Datei ohne die Kopfzeile. Steht WIND nicht
+    am Ende, werden die Spalten beim Lesen umsortiert; ein vorheriger Lauf von
+    clean-data.py ist damit nicht nötig. Mit offset wird nach der Kopfzeile direkt an
+    diesen Byte-Offset gesprungen, dessen Zeile die Nummer first_row bekommt.
+    """
+    with open(file_path, "r", encoding="utf-8") as csvfile:
+        csv_reader = csv.reader(csvfile)
+        order = column_order(next(csv_reader, []))
+        if offset is not None:
+            csvfile.seek(offset)
+        if order is None:
+            yield from enumerate(csv_reader, first_row)
+            return
+        for row_num, row in enumerate(csv_reader, first_row):
+            yield row_num, [row[i] if i < len(row) else "" for i in order]
+
+
+def row_key(gender_folder, file_name, row):
+    """
+    Inhaltsbasierter Schlüssel einer Zeile aus (Geschlecht, Disziplin, Zeileninhalt).
+    Hängt weder von der Zeilennummer noch von der Dateireihenfolge ab.
+    """
+    content = "\x1f".join([gender_folder, file_name.replace(".csv", "")] + row)
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class StableIds:
+    """
+    Vergibt pro Datei stabile Dokument-IDs aus den Zeilenschlüsseln. Identische
+    Zeilen innerhalb einer Datei bekommen die Endung -2, -3, ... in Reihenfolge
+    ihres Auftretens.
+    """
+
+    def __init__(self):
+        self.seen = {}
+
+    def __call__(self, key):
+        count = self.seen.get(key, 0) + 1
+        self.seen[key] = count
+        return key if count == 1 else f"{key}-{count}"
+
+
+def _keyed_documents(folder_name, file_name, rows):
+    discipline = get_discipline(file_name)
+    return [
+        (row_key(folder_name, file_name, row), transform_row(row, folder_name, file_name, row_num, discipline))
+        for row_num, row in rows
+    ]
+
+
+def iter_file_documents(folder_name, file_name, file_path):
+    """
+    Liefert (id, ResultRecord) für alle Zeilen einer einzelnen CSV-Datei
+    """
+    stable_id = StableIds()
+    discipline = get_discipline(file_name)
+    for row_num, row in iter_rows(file_path):
+        document = transform_row(row, folder_name, file_name, row_num, discipline)
+        yield stable_id(row_key(folder_name, file_name, row)), document
+
+
+def iter_documents(data_path=DATA_PATH, files=None):
+    """
+    Liefert (id, ResultRecord) für alle Zeilen aller CSV-Dateien (oder nur für files)
+    """
+    if files is None:
+        files = iter_csv_files(data_path)
+    for folder_name, file_name, file_path in files:
+        logger.debug(f"Datei: {folder_name}/{file_name}")
+        yield from iter_file_documents(folder_name, file_name, file_path)
+
+
+def _chunk_offsets(file_path, chunk_rows):
+    """
+    Byte-Offsets, an denen die Datenzeilen 0, chunk_rows, 2 * chunk_rows, ... beginnen.
+    Ein Zeilenumbruch beendet nur dann einen Datensatz, wenn bis dahin eine gerade
+    Anzahl Anführungszeichen stand (Umbrüche in Feldern in Anführungszeichen).
+    """
+    offsets = []
+    rows = -1  # Die Kopfzeile zählt nicht
+    position = quotes = 0
+    with open(file_path, "rb") as f:
+        for line in f:
+            if quotes % 2 == 0:
+                if rows >= 0 and rows % chunk_rows == 0:
+                    offsets.append(position)
+                rows += 1
+            position += len(line)
+            quotes += line.count(b'"')
+    return offsets or [position]
+
+
+def iter_tasks(files, chunk_rows=CHUNK_ROWS):
+    """
+    Teilt CSV-Dateien in Arbeitspakete (Ordner, Dateiname, Pfad, Byte-Offset, Start, Ende) auf.
+    Große Dateien werden in Blöcke zu chunk_rows Zeilen zerlegt; jedes Paket springt an
+    seinen Offset, statt die Datei von vorne zu lesen. Das letzte Paket einer Datei ist
+    nach oben offen (Ende None), damit keine Zeile verloren geht.
+    """
+    for folder_name, file_name, file_path in files:
+        offsets = _chunk_offsets(file_path, chunk_rows)
+        for number, offset in enumerate(offsets):
+            start = number * chunk_rows
+            stop = start + chunk_rows if number + 1 < len(offsets) else None
+            yield folder_name, file_name, file_path, offset, start, stop
+
+
+def process_task(task):
+    """
+    Verarbeitet ein Arbeitspaket im Worker-Prozess. Gibt (PID, Cache-Statistik des Workers,
+    Liste der (Schlüssel, ResultRecord)-Paare) zurück.
+    """
+    folder_name, file_name, file_path, offset, start, stop = task
+    rows = iter_rows(file_path, offset, start + 1)
+    keyed_documents = _keyed_documents(folder_name, file_name, rows if stop is None else islice(rows, stop - start))
+    return os.getpid(), _local_cache_stats(), keyed_documents
+
+
+def iter_documents_parallel(data_path=DATA_PATH, workers=2, chunk_rows=CHUNK_ROWS, files=None):
+    """
+    Wie iter_documents, aber die Zeilen werden in einem Prozess-Pool umgewandelt.
+    Die Ergebnisse werden in Dateireihenfolge zusammengeführt, IDs und Dokumente
+    sind daher identisch mit einem seriellen Lauf. Es sind höchstens 2 * workers
+    Pakete gleichzeitig unterwegs, damit der Speicherverbrauch begrenzt bleibt.
+    """
+    if files is None:
+        files = iter_csv_files(data_path)
+    tasks = iter_tasks(files, chunk_rows)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in islice(tasks, 2 * workers):
+            pending.append((task, executor.submit(process_task, task)))
+
+        stable_id = StableIds()
+        while pending:
+            task, future = pending.popleft()
+            pid, stats, keyed_documents = future.result()
+            _worker_cache_stats[pid] = stats
+            next_task = next(tasks, None)
+            if next_task is not None:
+                pending.append((next_task, executor.submit(process_task, next_task)))
+
+            folder_name, file_name, _, _, start, _ = task
+            if start == 0:
+                logger.debug(f"Datei: {folder_name}/{file_name}")
+                stable_id = StableIds()
+            for key, document in keyed_documents:
+                yield stable_id(key), document
+
+
+def iter_actions(documents, index_name=INDEX_NAME):
+    """
+    Wandelt (id, ResultRecord)-Paare in Bulk-Aktionen für helpers.streaming_bulk um.
+    _source bleibt der Datensatz; das Dokument entsteht erst beim Serialisieren
+    (serializers.dumps_bytes bzw. FastJSONSerializer des Clients).
+    """
+    for doc_id, record in documents:
+        yield {
+            "_index": index_name,
+            "_id": doc_id,
+            "_source": record
+        }
+
+
+def iter_delete_actions(doc_ids, index_name=INDEX_NAME):
+    """
+    Erzeugt Bulk-Löschaktionen für Dokumente, deren Zeilen nicht mehr existieren
+    """
+    for doc_id in doc_ids:
+        yield {
+            "_op_type": "delete",
+            "_index": index_name,
+            "_id": doc_id,
+        }
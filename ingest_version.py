@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+ARTIFACTS_PATH = "artifacts"
+VERSION_FILE = "ingest_version.json"
+
+
+def version_path(artifacts_path=ARTIFACTS_PATH):
+    return os.path.join(artifacts_path, VERSION_FILE)
+
+
+def write_ingest_version(artifacts_path=ARTIFACTS_PATH, **info):
+    """
+    Schreibt nach einem abgeschlossenen Ingest-Lauf einen neuen Versionsstempel.
+    Dienste, die Ergebnisse oder Artefakte im Speicher halten, erkennen daran,
+    dass sich der Index geändert hat. Gibt die neue Version zurück.
+    """
+    os.makedirs(artifacts_path, exist_ok=True)
+    version = str(time.time_ns())
+    stamp = {"version": version, "completed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"), **info}
+    path = version_path(artifacts_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stamp, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp_path, path)
+    return version
+
+
+def read_ingest_version(artifacts_path=ARTIFACTS_PATH):
+    """
+    Liest den Versionsstempel; None, wenn noch kein Ingest-Lauf abgeschlossen wurde
+    """
+    try:
+        with open(version_path(artifacts_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class VersionWatcher:
+    """
+    Prüft höchstens alle check_interval Sekunden, ob ein neuer Versionsstempel
+    geschrieben wurde. Es wird nur die mtime der Datei gelesen, solange sie sich nicht ändert.
+    """
+
+    def __init__(self, artifacts_path=ARTIFACTS_PATH, check_interval=1.0):
+        self.artifacts_path = artifacts_path
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.version = None
+        self._mtime = None
+        self._checked = 0.0
+        self.changed()
+
+    def changed(self):
+        """
+        True, wenn sich die Version seit dem letzten Aufruf geändert hat
+        """
+        with self.lock:
+            now = time.monotonic()
+            if self._checked and now - self._checked < self.check_interval:
+                return False
+            self._checked = now
+            try:
+                mtime = os.stat(version_path(self.artifacts_path)).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime == self._mtime:
+                return False
+            self._mtime = mtime
+            stamp = read_ingest_version(self.artifacts_path)
+            version = stamp["version"] if stamp else None
+            if version == self.version:
+                return False
+            self.version = version
+            return True
@@ -0,0 +1,202 @@
+import heapq
+import os
+import sys
+from collections import defaultdict
+
+from artifacts import FileArtifact, load_artifact
+from disciplines import TIME, get_discipline
+from ingest import normalize_name
+from ingest_version import ARTIFACTS_PATH
+
+LEADERBOARDS_FILE = "leaderboards.json.gz"
+TOP_N = 100
+WIND_LIMIT = 2.0    # m/s, darüber zählt eine Leistung nicht für Bestenlisten
+
+
+def leaderboards_path(artifacts_path=ARTIFACTS_PATH):
+    return os.path.join(artifacts_path, LEADERBOARDS_FILE)
+
+
+def wind_legal(record):
+    """
+    Leistungen ohne Windmessung gelten als regulär
+    """
+    return record.wind is None or record.wind <= WIND_LIMIT
+
+
+SUMMARY_FIELDS = ("id", "athlete_id", "competitor", "nat", "dob", "mark", "display", "date", "venue", "wind",
+                  "world_rank")
+
+
+def summary_values(doc_id, record):
+    """
+    Werte von summary_record als Tupel; so viel bleibt pro Athlet:in vom PB-Datensatz übrig
+    """
+    return (doc_id, record.athlete_id, record.competitor, record.nat, record.dob, record.mark.numeric_value,
+            record.mark.display_value, record.date, record.venue.venue_raw, record.wind, record.world_rank)
+
+
+def summary_record(doc_id, record):
+    """
+    Kompakte Form eines Resultats für die Bestenlisten
+    """
+    return dict(zip(SUMMARY_FIELDS, summary_values(doc_id, record)))
+
+
+class _FileSummary:
+    """
+    Bestenlisten einer CSV-Datei (= Geschlecht und Disziplin) in einem Durchlauf.
+    Top-N und Nationen halten Verweise auf ihre (höchstens TOP_N bzw. eine pro Nation)
+    ResultRecords. Pro Athlet:in bleiben nur die Felder übrig, die das Artefakt braucht:
+    die Werte des PB und pro Saison Leistung und Datum. Der Speicherbedarf wächst damit
+    mit der Zahl der Athlet:innen und Saisons, nicht mit der Zahl der Resultate.
+    """
+
+    def __init__(self, record):
+        self.gender = record.gender
+        self.discipline = record.discipline
+        # Sortierschlüssel: kleiner ist besser, Zeiten aufsteigend, Weiten und Punkte absteigend
+        self.sign = 1 if get_discipline(self.discipline).kind == TIME else -1
+        self.top = []           # Min-Heaps über (-Schlüssel, id, Datensatz) mit höchstens TOP_N Einträgen
+        self.top_legal = []
+        self.nations = {}       # Nation -> (Schlüssel, id, Datensatz)
+        # athlete_id -> [Anzahl, Schlüssel des PB, summary_values des PB, {Saison: (*Schlüssel, Anzeige, Datum)}]
+        self.athletes = {}
+
+    def _push(self, heap, inverted, doc_id, record):
+        if len(heap) < TOP_N:
+            heapq.heappush(heap, (inverted, doc_id, record))
+        elif inverted > heap[0][0]:
+            heapq.heapreplace(heap, (inverted, doc_id, record))
+
+    def observe(self, doc_id, record):
+        value = record.mark.numeric_value
+        if value is None:
+            return
+        rank = record.world_rank
+        key = (self.sign * value, rank if rank is not None else float("inf"))
+        inverted = (-key[0], -key[1])
+
+        self._push(self.top, inverted, doc_id, record)
+        if wind_legal(record):
+            self._push(self.top_legal, inverted, doc_id, record)
+
+        nat = record.nat
+        if nat and (nat not in self.nations or key < self.nations[nat][0]):
+            self.nations[nat] = (key, doc_id, record)
+
+        athlete_id = record.athlete_id
+        if athlete_id is None:
+            return
+        athlete = self.athletes.get(athlete_id)
+        if athlete is None:
+            athlete = self.athletes[athlete_id] = [0, None, None, {}]
+        athlete[0] += 1
+        if athlete[1] is None or key < athlete[1]:
+            athlete[1] = key
+            athlete[2] = summary_values(doc_id, record)
+        season = (record.date or "")[:4]
+        if season:
+            best = athlete[3].get(season)
+            if best is None or key < best[:2]:
+                # Flaches Tupel statt (Schlüssel, ...), die Saison-Strings werden geteilt
+                athlete[3][sys.intern(season)] = (*key, record.mark.display_value, record.date)
+
+    def contribution(self):
+        def ranked(heap):
+            return [summary_record(doc_id, record) for _, doc_id, record in sorted(heap, reverse=True)]
+
+        athletes = {}
+        for athlete_id, (results, _, pb, seasons) in sorted(self.athletes.items()):
+            pb = dict(zip(SUMMARY_FIELDS, pb))
+            athletes[athlete_id] = {
+                "competitor": pb["competitor"], "dob": pb["dob"], "nat": pb["nat"], "results": results,
+                "pb": pb,
+                "sb": {season: {"mark": self.sign * signed_mark, "display": display, "date": best_date}
+                       for season, (signed_mark, _, display, best_date) in sorted(seasons.items())},
+            }
+        return {
+            "gender": self.gender,
+            "discipline": self.discipline,
+            "order": "asc" if self.sign == 1 else "desc",
+            "top": ranked(self.top),
+            "top_legal": ranked(self.top_legal),
+            "nations": {nat: summary_record(doc_id, record)
+                        for nat, (_, doc_id, record) in sorted(self.nations.items(), key=lambda item: item[1][0])},
+            "athletes": athletes,
+        }
+
+
+class LeaderboardBuilder:
+    """
+    Berechnet während des Ingest pro CSV-Datei: Top-N (alle und windregulär),
+    Bestleistung pro Nation und pro Athlet:in Bestleistung (PB) und Saisonbestleistungen (SB)
+    """
+
+    def __init__(self):
+        self.files = {}
+
+    def observe(self, key, doc_id, record):
+        summary = self.files.get(key)
+        if summary is None:
+            summary = self.files[key] = _FileSummary(record)
+        summary.observe(doc_id, record)
+
+    def contributions(self, keys):
+        """
+        (Dateischlüssel, Beitrag)-Paare; die Zusammenfassungen werden dabei freigegeben.
+        Dateien ohne Resultate tragen nichts bei (None).
+        """
+        for key in keys:
+            summary = self.files.pop(key, None)
+            yield key, summary.contribution() if summary is not None else None
+
+
+def update_leaderboards(builder, keys, removed, artifacts_path=ARTIFACTS_PATH, keep=None):
+    artifact = FileArtifact(leaderboards_path(artifacts_path))
+    artifact.update(builder.contributions(keys), removed, keep)
+    artifact.save()
+    return artifact.data
+
+
+class Leaderboards:
+    """
+    Bestenlisten aus dem Artefakt als Schlüssel-Lookups im Speicher
+    """
+
+    def __init__(self, artifact):
+        self.boards = {}
+        self.athletes = defaultdict(list)
+        for contribution in (artifact or {"files": {}})["files"].values():
+            board_key = (contribution["gender"], contribution["discipline"])
+            self.boards[board_key] = contribution
+            for athlete_id, athlete in contribution["athletes"].items():
+                self.athletes[normalize_name(athlete["competitor"])].append((athlete_id, board_key, athlete))
+
+    def disciplines(self):
+        return sorted(self.boards)
+
+    def top(self, gender, discipline, size=TOP_N, legal=False):
+        board = self.boards.get((gender, discipline))
+        if board is None:
+            return None
+        return board["top_legal" if legal else "top"][:size]
+
+    def nation_bests(self, gender, discipline):
+        board = self.boards.get((gender, discipline))
+        return None if board is None else board["nations"]
+
+    def personal_bests(self, competitor, dob=None, nat=None):
+        """
+        PB und SB je Disziplin für alle Athlet:innen mit diesem Namen, optional eingeschränkt auf Geburtsdatum und Nation
+        """
+        result = []
+        for athlete_id, (gender, discipline), athlete in self.athletes.get(normalize_name(competitor), []):
+            if (dob and athlete["dob"] != dob) or (nat and athlete["nat"] != nat):
+                continue
+            result.append({"athlete_id": athlete_id, "gender": gender, "discipline": discipline, **athlete})
+        return result
+
+
+def load_leaderboards(artifacts_path=ARTIFACTS_PATH):
+    return Leaderboards(load_artifact(leaderboards_path(artifacts_path)))
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+MANIFEST_PATH = ".ingest-manifest.json"
+SPILL_IDS = 10000  # So viele IDs werden gesammelt, bevor sie in die Datei der aktuellen CSV-Datei gehen
+
+
+def file_hash(file_path):
+    """
+    SHA-256 des Dateiinhalts
+    """
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def file_key(folder_name, file_name):
+    return f"{folder_name}/{file_name}"
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """
+    Lädt das Manifest des letzten Laufs: {"Ordner/Datei": {"sha256": ..., "ids": [...]}}
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST_PATH, spill=None):
+    """
+    Schreibt das Manifest atomar (temporäre Datei + Umbenennen). Einträge mit "ids": None
+    bekommen ihre IDs aus spill (IdSpill); sie werden Eintrag für Eintrag geladen und
+    geschrieben, sodass nie alle IDs gleichzeitig im Speicher liegen.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("{")
+        for i, (key, entry) in enumerate(manifest.items()):
+            if spill is not None and entry.get("ids") is None:
+                entry = {**entry, "ids": spill.ids(key)}
+            f.write(f"{', ' if i else ''}{json.dumps(key, ensure_ascii=False)}: {json.dumps(entry, ensure_ascii=False)}")
+        f.write("}")
+    os.replace(tmp_path, path)
+
+
+class IdSpill:
+    """
+    Lagert die Dokument-IDs eines Laufs pro CSV-Datei in temporäre Dateien aus. Im Speicher
+    liegen höchstens SPILL_IDS IDs; ids(key) liest die IDs einer einzelnen Datei zurück.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = tempfile.mkdtemp(prefix="ingest-ids-", dir=directory)
+        self.paths = {}
+        self.key = None
+        self.buffer = []
+
+    def add(self, key, doc_id):
+        if key != self.key:
+            self.flush()
+            self.key = key
+        self.buffer.append(doc_id)
+        if len(self.buffer) >= SPILL_IDS:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        path = self.paths.setdefault(self.key, os.path.join(self.directory, f"{len(self.paths)}.ids"))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n".join(self.buffer) + "\n")
+        self.buffer = []
+
+    def ids(self, key):
+        self.flush()
+        path = self.paths.get(key)
+        if path is None:
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def plan_changes(manifest, files, force=False):
+    """
+    Vergleicht die aktuellen CSV-Dateien mit dem Manifest; mit force gilt jede Datei als geändert.
+    Gibt (geänderte Dateien, Hashes der geänderten Dateien, entfernte Dateischlüssel) zurück.
+    """
+    changed = []
+    hashes = {}
+    present = set()
+    for folder_name, file_name, file_path in files:
+        key = file_key(folder_name, file_name)
+        present.add(key)
+        digest = file_hash(file_path)
+        entry = manifest.get(key)
+        if force or entry is None or entry["sha256"] != digest:
+            changed.append((folder_name, file_name, file_path))
+            hashes[key] = digest
+    removed = [key for key in manifest if key not in present]
+    return changed, hashes, removed
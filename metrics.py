@@ -0,0 +1,245 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("ingest")
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(message)s"
+
+# Bucket-Grenzen in Sekunden
+FAST_BUCKETS = (1e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3, 1e-2, 0.1)
+REQUEST_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def setup_logging(level="INFO"):
+    logging.basicConfig(level=getattr(logging, level.upper()), format=LOG_FORMAT)
+    # Die Request-Logs des Clients würden sonst jede Bulk-Anfrage einzeln ausgeben
+    logging.getLogger("opensearch").setLevel(logging.WARNING)
+
+
+class Histogram:
+    """
+    Histogramm mit festen Bucket-Grenzen (kumulativ wie bei Prometheus)
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Näherung eines Quantils über die Bucket-Obergrenzen
+        """
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def as_dict(self):
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else repr(bound)] = cumulative
+        return {"count": self.count, "sum": round(self.sum, 6), "buckets": buckets}
+
+
+class Metrics:
+    """
+    Zähler und Latenz-Histogramme eines Ingest-Laufs. Ausgabe als JSON oder im
+    Prometheus-Textformat (für den node_exporter textfile collector).
+    """
+
+    def __init__(self, prefix="sport_ingest"):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.time()
+
+    def inc(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def histogram(self, name, buckets=REQUEST_BUCKETS):
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(buckets)
+            return self.histograms[name]
+
+    def observe(self, name, value, buckets=REQUEST_BUCKETS):
+        histogram = self.histogram(name, buckets)
+        with self.lock:
+            histogram.observe(value)
+
+    def as_dict(self):
+        return {
+            "elapsed_seconds": round(time.time() - self.started, 3),
+            "counters": dict(sorted(self.counters.items())),
+            "histograms": {name: histogram.as_dict() for name, histogram in sorted(self.histograms.items())},
+        }
+
+    def to_prometheus(self):
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            metric = f"{self.prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, histogram in sorted(self.histograms.items()):
+            metric = f"{self.prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for bound, cumulative in histogram.as_dict()["buckets"].items():
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f"{metric}_sum {histogram.sum}")
+            lines.append(f"{metric}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        _write_atomic(path, json.dumps(self.as_dict(), indent=2) + "\n")
+
+    def write_prometheus(self, path):
+        _write_atomic(path, self.to_prometheus())
+
+    def summary(self):
+        """
+        Kurze Zusammenfassung der Histogramme (Anzahl, Mittelwert, p50/p99) für das Log
+        """
+        lines = []
+        for name, histogram in sorted(self.histograms.items()):
+            mean = histogram.sum / histogram.count if histogram.count else 0.0
+            lines.append(f"{name}: n={histogram.count} mittel={mean * 1000:.3f} ms "
+                         f"p50<={histogram.quantile(0.5) * 1000:g} ms p99<={histogram.quantile(0.99) * 1000:g} ms")
+        return lines
+
+
+def _write_atomic(path, content):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def timed_iter(iterable, metrics, name, buckets=FAST_BUCKETS):
+    """
+    Misst die Zeit jedes next()-Aufrufs eines Iterators als Histogramm name
+    """
+    histogram = metrics.histogram(name, buckets)
+    iterator = iter(iterable)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        histogram.observe(time.perf_counter() - started)
+        yield item
+
+
+class _TimedSerializer:
+    """
+    Misst serializer.dumps. Einzelne Aktionen (Dicts) zählen als "serialize", fertige
+    Request-Bodys (str/bytes, vom Transport durchgereicht) getrennt als "serialize_body",
+    damit die beiden Verteilungen die Quantile nicht gegenseitig verfälschen.
+    """
+
+    def __init__(self, serializer, metrics):
+        self.serializer = serializer
+        self.metrics = metrics
+        self.mimetype = serializer.mimetype
+
+    def dumps(self, data):
+        name = "serialize_body" if isinstance(data, (str, bytes)) else "serialize"
+        started = time.perf_counter()
+        try:
+            return self.serializer.dumps(data)
+        finally:
+            self.metrics.observe(name, time.perf_counter() - started, FAST_BUCKETS)
+
+    def loads(self, s):
+        return self.serializer.loads(s)
+
+
+def instrument_client(client, metrics):
+    """
+    Misst Serialisierung (Serializer des Transports) und Bulk-Roundtrip (client.bulk) eines OpenSearch-Clients
+    """
+    client.transport.serializer = _TimedSerializer(client.transport.serializer, metrics)
+    bulk = client.bulk
+
+    def timed_bulk(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return bulk(*args, **kwargs)
+        finally:
+            metrics.observe("bulk_roundtrip", time.perf_counter() - started)
+            metrics.inc("bulk_requests")
+
+    client.bulk = timed_bulk
+    return client
+
+
+class Progress:
+    """
+    Gibt periodisch eine Fortschrittszeile aus: Zeilen, Zeilen/s, fertige Dateien und
+    die geschätzte Restzeit (anhand der Bytes der bereits fertigen Dateien).
+    """
+
+    def __init__(self, files, interval=5.0):
+        self.interval = interval
+        self.file_sizes = {}
+        for folder_name, file_name, file_path in files:
+            self.file_sizes[(folder_name.capitalize(), file_name.replace(".csv", ""))] = os.path.getsize(file_path)
+        self.total_bytes = sum(self.file_sizes.values())
+        self.done_bytes = 0
+        self.files_done = 0
+        self.rows = 0
+        self.current = None
+        self.started = time.perf_counter()
+        self.last_report = self.started
+
+    def observe(self, record):
+        key = (record.gender, record.discipline)
+        if key != self.current:
+            self._finish_file()
+            self.current = key
+        self.rows += 1
+        if self.interval and self.rows % 1000 == 0:
+            now = time.perf_counter()
+            if now - self.last_report >= self.interval:
+                self.last_report = now
+                self.report()
+
+    def _finish_file(self):
+        if self.current is not None:
+            self.files_done += 1
+            self.done_bytes += self.file_sizes.get(self.current, 0)
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.rows / elapsed if elapsed else 0.0
+        if self.done_bytes:
+            eta = f"{elapsed * (self.total_bytes - self.done_bytes) / self.done_bytes:.0f} s"
+        else:
+            eta = "?"
+        logger.info(f"Fortschritt: {self.rows} Zeilen, {rate:.0f} Zeilen/s, "
+                    f"{self.files_done}/{len(self.file_sizes)} Dateien, Restzeit ~{eta}")
+
+    def finish(self):
+        self._finish_file()
+        self.current = None
+        self.report()
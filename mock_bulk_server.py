@@ -0,0 +1,142 @@
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MOCK_PORT = 9250
+
+
+class MockStats:
+    """
+    Zähler des Mock-Servers (thread-sicher)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.actions = 0
+        self.bytes_received = 0
+
+    def add(self, actions, size):
+        with self.lock:
+            self.requests += 1
+            self.actions += actions
+            self.bytes_received += size
+
+    def as_dict(self):
+        return {"requests": self.requests, "actions": self.actions, "bytes_received": self.bytes_received}
+
+
+REJECTED = {"type": "es_rejected_execution_exception", "reason": "rejected execution (Mock)"}
+
+
+def bulk_items(body, reject_rate=0.0):
+    """
+    Liest die Aktionszeilen eines _bulk-Bodys und erzeugt die passenden Antwort-Items.
+    Die Dokumentzeilen werden nur übersprungen, nicht geparst. Ein Anteil reject_rate
+    der Aktionen wird wie bei voller Write-Queue mit 429 abgelehnt.
+    """
+    items = []
+    lines = iter(body.splitlines())
+    for line in lines:
+        if not line.strip():
+            continue
+        op_type, meta = next(iter(json.loads(line).items()))
+        if op_type != "delete":
+            next(lines, None)
+        if reject_rate and random.random() < reject_rate:
+            items.append({op_type: {"_index": meta.get("_index"), "_id": meta.get("_id"), "status": 429,
+                                    "error": REJECTED}})
+            continue
+        items.append({op_type: {"_index": meta.get("_index"), "_id": meta.get("_id"), "status": 201,
+                                "result": "created" if op_type != "delete" else "deleted"}})
+    return items
+
+
+class MockBulkHandler(BaseHTTPRequestHandler):
+    """
+    Imitiert die für das Ingest nötigen Endpunkte von OpenSearch: GET / und POST [/<index>]/_bulk.
+    latency (Sekunden) wird vor jeder _bulk-Antwort gewartet, reject_rate steuert
+    den Anteil abgelehnter Aktionen.
+    """
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    reject_rate = 0.0
+    stats = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send_json(200, {"name": "mock-bulk", "version": {"distribution": "opensearch", "number": "2.11.0"}})
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        if not self.path.split("?")[0].endswith("/_bulk"):
+            self._send_json(404, {"error": f"Mock unterstützt nur _bulk, nicht {self.path}"})
+            return
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+
+        started = time.perf_counter()
+        items = bulk_items(body, self.reject_rate)
+        if self.latency:
+            time.sleep(self.latency)
+        if self.stats is not None:
+            self.stats.add(len(items), len(body))
+        took = int((time.perf_counter() - started) * 1000)
+        errors = any("error" in next(iter(item.values())) for item in items)
+        self._send_json(200, {"took": took, "errors": errors, "items": items})
+
+    do_PUT = do_POST
+
+
+def start_mock_server(port=0, latency=0.0, reject_rate=0.0, handler=MockBulkHandler):
+    """
+    Startet den Mock-Server in einem Hintergrund-Thread.
+    Gibt (Server, Port, MockStats) zurück; beenden mit server.shutdown().
+    """
+    stats = MockStats()
+    attributes = {"latency": latency, "reject_rate": reject_rate, "stats": stats}
+    handler_class = type("BoundMockBulkHandler", (handler,), attributes)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler_class)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, server.server_address[1], stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokaler Mock des OpenSearch-_bulk-Endpunkts")
+    parser.add_argument("--port", type=int, default=MOCK_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="Künstliche Latenz pro _bulk-Request in Sekunden")
+    parser.add_argument("--reject-rate", type=float, default=0.0,
+                        help="Anteil der Aktionen, die mit 429 es_rejected_execution_exception abgelehnt werden")
+    args = parser.parse_args()
+
+    server, port, stats = start_mock_server(args.port, args.latency, args.reject_rate)
+    print(f"Mock-_bulk-Endpunkt läuft auf http://127.0.0.1:{port} (Strg+C zum Beenden)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(json.dumps(stats.as_dict()))
@@ -0,0 +1,251 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from flask import Flask, Response, jsonify, request, stream_with_context
+from flask_cors import CORS
+from opensearchpy.exceptions import NotFoundError, OpenSearchException
+
+# Die gemeinsamen Module (Client, Abfragen, Versionsstempel) liegen im Hauptverzeichnis
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_PATH)
+
+from athletes import load_athletes  # noqa: E402
+from facets import load_facets  # noqa: E402
+from ingest_version import ARTIFACTS_PATH, VersionWatcher  # noqa: E402
+from leaderboards import TOP_N, load_leaderboards  # noqa: E402
+from opensearch_client import HOST, PORT, create_client  # noqa: E402
+from pagination import CursorError, fetch_page, iter_all_hits  # noqa: E402
+from query_cache import CACHE_SIZE, CACHE_TTL, QueryCache  # noqa: E402
+from search_queries import build_search_query, cache_key, canonical_search_params  # noqa: E402
+from suggestions import KINDS, MAX_SUGGEST_SIZE, SUGGEST_SIZE, load_suggestion_index  # noqa: E402
+
+INDEX_NAME = "sport-results"
+SERVICE_PORT = 5000
+
+
+def search_results(client, index_name, params):
+    """
+    Führt die Suche aus und gibt die Treffer in der Form zurück, die die App erwartet
+    """
+    response = client.search(index=index_name, body=build_search_query(params))
+    hits = response["hits"]
+    return {
+        "total": hits["total"]["value"] if isinstance(hits["total"], dict) else hits["total"],
+        "results": [{"id": hit["_id"], **hit["_source"]} for hit in hits["hits"]],
+    }
+
+
+def load_artifacts(artifacts_path):
+    """
+    Lädt die beim Ingest berechneten Artefakte in den Speicher
+    """
+    return {
+        "suggestions": load_suggestion_index(artifacts_path),
+        "leaderboards": load_leaderboards(artifacts_path),
+        "athletes": load_athletes(artifacts_path),
+        "facets": load_facets(artifacts_path),
+    }
+
+
+def create_app(client=None, index_name=INDEX_NAME, cache_size=CACHE_SIZE, cache_ttl=CACHE_TTL,
+               artifacts_path=os.path.join(ROOT_PATH, ARTIFACTS_PATH)):
+    """
+    Such-API vor OpenSearch. Ergebnisse werden nach normalisierten Parametern
+    zwischengespeichert; schreibt ein Ingest-Lauf einen neuen Versionsstempel,
+    wird der Cache geleert und die Artefakte (Vorschläge, Bestenlisten, Facetten) werden neu geladen.
+    """
+    app = Flask(__name__)
+    CORS(app)
+    client = client or create_client()
+    cache = QueryCache(cache_size, cache_ttl)
+    watcher = VersionWatcher(artifacts_path)
+    app.config.update(client=client, cache=cache, watcher=watcher, **load_artifacts(artifacts_path))
+
+    @app.before_request
+    def invalidate_on_ingest():
+        if watcher.changed():
+            app.logger.info(f"Neue Ingest-Version {watcher.version}, Cache wird geleert")
+            cache.clear()
+            app.config.update(load_artifacts(artifacts_path))
+
+    @app.get("/search")
+    def search():
+        try:
+            params = canonical_search_params(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        started = time.perf_counter()
+        key = cache_key(params)
+        result = cache.get(key)
+        cached = result is not None
+        if not cached:
+            try:
+                result = search_results(client, index_name, params)
+            except OpenSearchException as e:
+                app.logger.error(f"Fehler bei der Suche: {e}")
+                return jsonify({"error": f"OpenSearch-Fehler: {e}"}), 502
+            cache.put(key, result)
+        took = round((time.perf_counter() - started) * 1000, 3)
+        return jsonify({**result, "cached": cached, "took_ms": took, "version": watcher.version})
+
+    @app.get("/search/page")
+    def search_page():
+        """
+        Seitenweise Suche über Point-in-Time und search_after. Die erste Anfrage nimmt
+        die Parameter von /search, Folgeseiten nur noch ?cursor=<next_cursor>.
+        """
+        cursor = request.args.get("cursor")
+        try:
+            params = None if cursor else canonical_search_params(request.args)
+            page = fetch_page(client, index_name, params, cursor)
+        except (ValueError, CursorError) as e:
+            return jsonify({"error": str(e)}), 400
+        except NotFoundError:
+            return jsonify({"error": "Point-in-Time abgelaufen, Suche bitte neu starten"}), 410
+        except OpenSearchException as e:
+            app.logger.error(f"Fehler bei der Suche: {e}")
+            return jsonify({"error": f"OpenSearch-Fehler: {e}"}), 502
+        return jsonify(page)
+
+    @app.get("/export")
+    def export():
+        """
+        Alle Treffer als NDJSON-Stream, z.B. eine komplette Disziplin
+        """
+        try:
+            params = canonical_search_params(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        def generate():
+            for hit in iter_all_hits(client, index_name, params):
+                yield json.dumps({"id": hit["_id"], **hit["_source"]}, ensure_ascii=False) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    @app.get("/suggest")
+    def suggest():
+        kind = request.args.get("field") or None
+        if kind is not None and kind not in KINDS:
+            return jsonify({"error": f"Unbekanntes Feld: {kind}"}), 400
+        try:
+            size = int(request.args.get("size") or SUGGEST_SIZE)
+        except ValueError:
+            return jsonify({"error": "size muss eine Zahl sein"}), 400
+        if not 0 < size <= MAX_SUGGEST_SIZE:
+            return jsonify({"error": f"size muss zwischen 1 und {MAX_SUGGEST_SIZE} liegen"}), 400
+
+        # gender und nat wie bei /search normalisieren ("women" -> "Women", "jam" -> "JAM")
+        filters = canonical_search_params({"gender": request.args.get("gender"), "nat": request.args.get("nat")})
+
+        started = time.perf_counter()
+        suggestions = app.config["suggestions"].suggest(
+            request.args.get("prefix", ""), kind, gender=filters.get("gender"), nat=filters.get("nat"),
+            discipline=request.args.get("discipline") or None, size=size)
+        took = round((time.perf_counter() - started) * 1000, 3)
+        return jsonify({"suggestions": suggestions, "took_ms": took, "version": watcher.version})
+
+    @app.get("/leaderboard")
+    def leaderboard():
+        """
+        Top-N einer Disziplin, mit wind_legal=1 nur windreguläre Leistungen
+        """
+        try:
+            size = int(request.args.get("size") or TOP_N)
+        except ValueError:
+            return jsonify({"error": "size muss eine Zahl sein"}), 400
+        if not 0 < size <= TOP_N:
+            return jsonify({"error": f"size muss zwischen 1 und {TOP_N} liegen"}), 400
+        legal = request.args.get("wind_legal", "").lower() in ("1", "true", "yes")
+        gender = canonical_search_params({"gender": request.args.get("gender")}).get("gender")
+        discipline = request.args.get("discipline")
+        results = app.config["leaderboards"].top(gender, discipline, size, legal)
+        if results is None:
+            return jsonify({"error": f"Keine Bestenliste für {gender} {discipline}"}), 404
+        return jsonify({"gender": gender, "discipline": discipline, "wind_legal": legal, "results": results,
+                        "version": watcher.version})
+
+    @app.get("/leaderboard/nations")
+    def nation_bests():
+        gender = canonical_search_params({"gender": request.args.get("gender")}).get("gender")
+        discipline = request.args.get("discipline")
+        nations = app.config["leaderboards"].nation_bests(gender, discipline)
+        if nations is None:
+            return jsonify({"error": f"Keine Bestenliste für {gender} {discipline}"}), 404
+        return jsonify({"gender": gender, "discipline": discipline, "nations": nations, "version": watcher.version})
+
+    @app.get("/athlete/bests")
+    def athlete_bests():
+        competitor = request.args.get("competitor", "")
+        if not competitor.strip():
+            return jsonify({"error": "competitor fehlt"}), 400
+        nat = canonical_search_params({"nat": request.args.get("nat")}).get("nat")
+        bests = app.config["leaderboards"].personal_bests(competitor, request.args.get("dob") or None, nat)
+        return jsonify({"competitor": competitor, "bests": bests, "version": watcher.version})
+
+    @app.get("/athletes")
+    def find_athletes():
+        """
+        Athletendokumente zu einem Namen, optional eingeschränkt auf Geburtsdatum und Nation
+        """
+        competitor = request.args.get("competitor", "")
+        if not competitor.strip():
+            return jsonify({"error": "competitor fehlt"}), 400
+        athletes = app.config["athletes"].find(competitor, request.args.get("dob") or None,
+                                               request.args.get("nat") or None)
+        return jsonify({"competitor": competitor, "athletes": athletes, "version": watcher.version})
+
+    @app.get("/athlete/<athlete_id>")
+    def athlete(athlete_id):
+        """
+        Athletendokument per athlete_id; alle Resultate liefern /search und /search/page mit athlete_id
+        """
+        document = app.config["athletes"].get(athlete_id)
+        if document is None:
+            return jsonify({"error": f"Unbekannte athlete_id {athlete_id}"}), 404
+        return jsonify({"athlete": document, "version": watcher.version})
+
+    @app.get("/facets")
+    def facets():
+        """
+        Facettenlisten mit Anzahlen für den Filterdialog, optional nach Geschlecht und Disziplin gefiltert
+        """
+        facets = app.config["facets"]
+        gender = canonical_search_params({"gender": request.args.get("gender")}).get("gender")
+        answer = facets.get(gender, request.args.get("discipline") or None)
+        return jsonify({**answer, "index": facets.index, "version": watcher.version})
+
+    @app.get("/cache")
+    def cache_status():
+        return jsonify({**cache.stats(), "version": watcher.version})
+
+    @app.get("/health")
+    def health():
+        return jsonify({"status": "ok", "version": watcher.version})
+
+    return app
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Such-API für die Sportresultate mit Ergebnis-Cache")
+    parser.add_argument("--host", default=HOST, help="OpenSearch-Host")
+    parser.add_argument("--port", type=int, default=PORT, help="OpenSearch-Port")
+    parser.add_argument("--index", default=INDEX_NAME, help="Index oder Alias für die Suche")
+    parser.add_argument("--listen", default="0.0.0.0", help="Adresse, auf der die API lauscht")
+    parser.add_argument("--service-port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE, help="Maximale Anzahl gespeicherter Suchen")
+    parser.add_argument("--cache-ttl", type=float, default=CACHE_TTL, help="Gültigkeit eines Cache-Eintrags in Sekunden")
+    parser.add_argument("--artifacts-dir", default=os.path.join(ROOT_PATH, ARTIFACTS_PATH),
+                        help="Verzeichnis mit dem Versionsstempel des Ingest")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    app = create_app(create_client(args.host, args.port), args.index, args.cache_size, args.cache_ttl,
+                     args.artifacts_dir)
+    app.run(host=args.listen, port=args.service_port, threaded=True)
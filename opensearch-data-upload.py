@@ -1,428 +1,215 @@
-import csv
-import os
-from time import sleep
-from opensearchpy import OpenSearch, helpers
-import re
+import argparse
 import sys
+from itertools import chain
 
-def convert_position(pos_str):
-    
-    if pos_str is "":
-        document_mapping["pos"]["numeric_pos"] = None
-        document_mapping["pos"]["raw_pos"] = None
-        document_mapping["pos"]["group"] = None
-        return
-    
-    if "." in pos_str:
-        document_mapping["pos"]["numeric_pos"] = pos_str.split(".")[0]
-        document_mapping["pos"]["raw_pos"] = pos_str.split(".")[0]
-        document_mapping["pos"]["group"] = None
-        return
-    
-    if pos_str.isdigit():
-        document_mapping["pos"]["numeric_pos"] = int(pos_str)
-        document_mapping["pos"]["raw_pos"] = pos_str
-        document_mapping["pos"]["group"] = None
-        return
-    
-    pattern = r'^(\d+)([a-zA-Z]+)(\d+)$'
-    match = re.match(pattern, pos_str)
-    if match:
-        position = match.group(1)
-        phase = match.group(2)
-        group = match.group(3)
-        if phase in phases:
-            string = phases[phase]
-        document_mapping["pos"]["numeric_pos"] = position
-        document_mapping["pos"]["raw_pos"] = pos_str
-        group_and_phase = string + " " + group
-        document_mapping["pos"]["group"] = group_and_phase
-    
-def convert_mark(mark_str, file_name): 
-    if "h" in mark_str:
-        mark_str = mark_str.replace("h", "0")
-    
-    if mark_str == "":
-        document_mapping["mark"]["raw_value"] = None
-        document_mapping["mark"]["display_value"] = None
-        document_mapping["mark"]["numeric_value"] = None
-        document_mapping["mark"]["format_type"] = None
-        document_mapping["mark"]["unit"] = None
-        return
-    
-    #Punkte
-    if ":" not in mark_str and "." not in mark_str:
-        document_mapping["mark"]["raw_value"] = mark_str
-        document_mapping["mark"]["display_value"] = mark_str
-        document_mapping["mark"]["numeric_value"] = float(mark_str)
-        document_mapping["mark"]["format_type"] = "Punkte"
-        document_mapping["mark"]["unit"] = ""
-        return
+from async_ingest import run_async_ingest
+from athletes import update_athletes
+from bulk_export import EXPORT_BYTES, export_bulk_files
+from bulk_sender import (BULK_SIZE, DEAD_LETTER_PATH, MAX_RETRIES, TARGET_LATENCY, AdaptiveBulkSender,
+                         bulk_index_documents)
+from facets import FacetBuilder, update_facets
+from index_lifecycle import DEFAULT_PROFILE, PROFILES, create_load_index, finalize_index, profile_body, swap_alias
+from ingest import (CHUNK_ROWS, DATA_PATH, INDEX_NAME, cache_stats, format_cache_stats, iter_actions,
+                    iter_csv_files, iter_delete_actions, iter_documents, iter_documents_parallel)
+from ingest_version import ARTIFACTS_PATH, read_ingest_version, write_ingest_version
+from leaderboards import LeaderboardBuilder, update_leaderboards
+from manifest import MANIFEST_PATH, IdSpill, file_key, load_manifest, plan_changes, save_manifest
+from metrics import Metrics, Progress, instrument_client, logger, setup_logging, timed_iter
+from opensearch_client import HOST, PORT, create_async_client, create_client
+from suggestions import SuggestionBuilder, update_suggestions
 
-    #Zeiten unter einer Minute und Weiten
-    if ":" not in mark_str and "." in mark_str:
-        for char in file_name:
-            if char.isdigit():
-                # Sprintzeiten unter einer Minute
-                document_mapping["mark"]["raw_value"] = mark_str
-                document_mapping["mark"]["display_value"] = mark_str
-                document_mapping["mark"]["numeric_value"] = float(mark_str)
-                document_mapping["mark"]["format_type"] = "Sekunden"
-                document_mapping["mark"]["unit"] = "s"
-                return
-            else:
-                #Weiten
-                document_mapping["mark"]["raw_value"] = mark_str
-                document_mapping["mark"]["display_value"] = mark_str
-                document_mapping["mark"]["numeric_value"] = float(mark_str)
-                document_mapping["mark"]["format_type"] = "Meter"
-                document_mapping["mark"]["unit"] = "m"
-                return
-    
-    #Zeiten über einer Minute
-    if ":" in mark_str:
-        number_of_colons = mark_str.count(":")
-        number_of_dots = mark_str.count(".")
-        
-        # 1 doppelpunkt und 1 punkt -> Minuten:Sekunden.Millisekunden
-        if number_of_colons == 1 and number_of_dots == 1:
-            minutes, rest = mark_str.split(":")
-            seconds, milliseconds = rest.split(".")
-            total_seconds = int(minutes) * 60 + int(seconds)
-            total_time = f"{total_seconds}.{milliseconds}"
-            document_mapping["mark"]["raw_value"] = mark_str
-            document_mapping["mark"]["display_value"] = mark_str
-            document_mapping["mark"]["numeric_value"] = float(total_time)
-            document_mapping["mark"]["format_type"] = "Minuten"
-            document_mapping["mark"]["unit"] = "min"
-            return
-        
-        # 1 doppelpunkt und 0 punkte -> Minuten:Sekunden
-        if number_of_colons == 1 and number_of_dots == 0:
-            minutes, seconds = mark_str.split(":")
-            total_seconds = int(minutes) * 60 + int(seconds)
-            document_mapping["mark"]["raw_value"] = mark_str
-            document_mapping["mark"]["display_value"] = mark_str
-            document_mapping["mark"]["numeric_value"] = float(total_seconds)
-            document_mapping["mark"]["format_type"] = "Minuten"
-            document_mapping["mark"]["unit"] = "min"
-            return
-        
-        # 2 doppelpunkte und 0 punkte -> Stunden:Minuten:Sekunden
-        if number_of_colons == 2 and number_of_dots == 0:
-            hours, minutes, seconds = mark_str.split(":")
-            total_seconds = int(hours) * 3600 + int(minutes) * 60 + int(seconds)
-            document_mapping["mark"]["raw_value"] = mark_str
-            document_mapping["mark"]["display_value"] = mark_str
-            document_mapping["mark"]["numeric_value"] = float(total_seconds)
-            document_mapping["mark"]["format_type"] = "Stunden"
-            document_mapping["mark"]["unit"] = "h"
-            return
-        
-        # 1 doppelpunkt und 1 punkte -> Minuten:Sekunden.Millisekunden
-        if number_of_colons == 1 and number_of_dots == 1:
-            minutes, rest = mark_str.split(":")
-            seconds, milliseconds = rest.split(".")
-            total_seconds = int(minutes) * 60 + int(seconds)
-            total_time = f"{total_seconds}.{milliseconds}"
-            document_mapping["mark"]["raw_value"] = mark_str
-            document_mapping["mark"]["display_value"] = mark_str
-            document_mapping["mark"]["numeric_value"] = float(total_time)
-            document_mapping["mark"]["format_type"] = "Stunden"
-            document_mapping["mark"]["unit"] = "h"
-            return
-        
-        # 2 doppelpunkte und 1 punkt -> Stunden:Minuten:Sekunden.Millisekunden
-        if number_of_colons == 2 and number_of_dots == 1:
-            hours, minutes, rest = mark_str.split(":")
-            seconds, milliseconds = rest.split(".")
-            total_seconds = int(hours) * 3600 + int(minutes) * 60 + int(seconds)
-            total_time = f"{total_seconds}.{milliseconds}"
-            document_mapping["mark"]["raw_value"] = mark_str
-            document_mapping["mark"]["display_value"] = mark_str
-            document_mapping["mark"]["numeric_value"] = float(total_time)
-            document_mapping["mark"]["format_type"] = "Stunden"
-            document_mapping["mark"]["unit"] = "h"
-            return
 
-def calculate_age_at_comp(date_venue, dob):
-    from datetime import datetime
-    if dob == "" or date_venue == "":
-        document_mapping["age_at_competition"] = None
-        document_mapping["dob"] = None
-        document_mapping["date"] = None
-        return
-    
-    month_map = {
-        'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4,
-        'MAY': 5, 'JUN': 6, 'JUL': 7, 'AUG': 8,
-        'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12
-    }
-    
-    def to_date(date_str):
-        number_of_chars = len(date_str)
-        if number_of_chars == 11:
-            day, month_str, year = date_str.split()
-            month = month_map[month_str.upper()]
-            return datetime(int(year), month, int(day))
-        if number_of_chars == 8:
-            month_str, year = date_str.split()
-            month = month_map[month_str.upper()]
-            return datetime(int(year), month, 1)
-        elif number_of_chars == 4:
-            year = date_str
-            return datetime(int(year), 1, 1)
-         
-    dob_date = to_date(dob)
-    comp_date = to_date(date_venue)
-    
-    #print(f"Geburtsdatum: {dob_date}, Wettkampdatum: {comp_date}")
-    
-     # Altersberechnung
-    alter = comp_date.year - dob_date.year
-    
-    # Korrektur für Geburtstag, der noch nicht stattgefunden hat
-    if (comp_date.month, comp_date.day) < (dob_date.month, dob_date.day):
-        alter -= 1
-    
-    document_mapping["age_at_competition"] = alter
-    document_mapping["dob"] = str(dob_date.date())
-    document_mapping["date"] = str(comp_date.date())     
+def parse_args():
+    parser = argparse.ArgumentParser(description="Lädt die Sportresultate aus den CSV-Dateien in OpenSearch hoch")
+    parser.add_argument("--data-path", default=DATA_PATH, help="Verzeichnis mit den Ordnern men/ und women/")
+    parser.add_argument("--index", default=INDEX_NAME, help="Name des Ziel-Index")
+    parser.add_argument("--host", default=HOST, help="OpenSearch-Host")
+    parser.add_argument("--port", type=int, default=PORT, help="OpenSearch-Port")
+    parser.add_argument("--bulk-size", type=int, default=BULK_SIZE,
+                        help="Dokumente pro Bulk-Request bei --fixed-batches")
+    parser.add_argument("--fixed-batches", action="store_true",
+                        help="Feste Batches über helpers.streaming_bulk statt des adaptiven Senders")
+    parser.add_argument("--async-senders", type=int, default=0,
+                        help="Asynchroner Modus mit N parallelen _bulk-Requests (AsyncOpenSearch, 0 = aus)")
+    parser.add_argument("--target-latency", type=float, default=TARGET_LATENCY,
+                        help="Angestrebte Dauer eines Bulk-Requests in Sekunden (adaptiver Sender)")
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES,
+                        help="Versuche pro Dokument, bevor es in die Dead-Letter-Datei geht")
+    parser.add_argument("--dead-letter", default=DEAD_LETTER_PATH,
+                        help="Datei für endgültig abgelehnte Aktionen (NDJSON)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Anzahl Prozesse für das Parsen der CSV-Dateien (1 = seriell)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                        help="Zeilen pro Arbeitspaket bei --workers > 1")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Nur geänderte Dateien hochladen und verschwundene Zeilen löschen")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="Pfad zum Datei-Manifest")
+    parser.add_argument("--lifecycle", action="store_true",
+                        help="In einen neuen Index sport-results-v<N> laden und danach den Alias umsetzen")
+    parser.add_argument("--profile", choices=PROFILES, default=DEFAULT_PROFILE,
+                        help="Mapping-Profil des neuen Index bei --lifecycle")
+    parser.add_argument("--export-dir",
+                        help="Statt an OpenSearch zu senden, gzip-komprimierte _bulk-NDJSON-Dateien in dieses Verzeichnis schreiben")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="DEBUG zeigt zusätzlich jede verarbeitete Datei")
+    parser.add_argument("--progress-interval", type=float, default=5.0,
+                        help="Sekunden zwischen zwei Fortschrittszeilen (0 = aus)")
+    parser.add_argument("--metrics-json", help="Zähler und Latenz-Histogramme am Ende als JSON schreiben")
+    parser.add_argument("--metrics-prom", help="Zähler und Latenz-Histogramme am Ende im Prometheus-Textformat schreiben")
+    parser.add_argument("--artifacts-dir", default=ARTIFACTS_PATH,
+                        help="Verzeichnis für den Versionsstempel und weitere Ingest-Artefakte")
+    parser.add_argument("--export-bytes", type=int, default=EXPORT_BYTES,
+                        help="Maximale unkomprimierte Payload-Größe pro Exportdatei in Bytes")
+    args = parser.parse_args()
+    if args.lifecycle and (args.incremental or args.export_dir):
+        parser.error("--lifecycle lädt immer vollständig in einen neuen Index und ist nicht mit "
+                     "--incremental oder --export-dir kombinierbar")
+    return args
 
-def convert_venue(venue_str):
-    # Venue kann Land(in Klammern), Stadt und eventuell Stadion enthalten
-    
-    if venue_str is None or venue_str == "":
-        return
-    
-    number_of_commas = venue_str.count(",")
-    
-    if number_of_commas == 0:
-        klammer_start = venue_str.find("(")
-        
-        vor_klammer = venue_str[:klammer_start].strip()
-        in_klammer = venue_str[klammer_start:].strip("()")
-        document_mapping["venue"]["venue_raw"] = venue_str
-        document_mapping["venue"]["city"] = vor_klammer
-        document_mapping["venue"]["country"] = in_klammer
-        document_mapping["venue"]["extra"] = ""
-        document_mapping["venue"]["stadium"] = ""
-        return 
-    
-    if number_of_commas == 1:
-        stadium, rest = venue_str.split(",", 1)
-        klammer_start = rest.find("(")
-        
-        vor_klammer = rest[:klammer_start].strip()
-        in_klammer = rest[klammer_start:].strip("()")
-        document_mapping["venue"]["venue_raw"] = venue_str
-        document_mapping["venue"]["city"] = vor_klammer
-        document_mapping["venue"]["country"] = in_klammer
-        document_mapping["venue"]["extra"] = ""
-        document_mapping["venue"]["stadium"] = stadium.strip()
-        
-        return
-    elif number_of_commas == 2:
-        stadium, city, rest = venue_str.split(",", 2)
-        klammer_start = rest.find("(")
-        vor_klammer = rest[:klammer_start].strip()
-        in_klammer = rest[klammer_start:].strip("()")
-        document_mapping["venue"]["venue_raw"] = venue_str
-        document_mapping["venue"]["city"] = city.strip()
-        document_mapping["venue"]["country"] = in_klammer
-        document_mapping["venue"]["extra"] = vor_klammer
-        document_mapping["venue"]["stadium"] = stadium.strip()
+
+def write_metrics(args, metrics):
+    for line in metrics.summary():
+        logger.info(line)
+    if args.metrics_json:
+        metrics.write_json(args.metrics_json)
+    if args.metrics_prom:
+        metrics.write_prometheus(args.metrics_prom)
+
+
+def main():
+    args = parse_args()
+    setup_logging(args.log_level)
+    metrics = Metrics()
+
+    # Ohne --incremental wird jede Datei hochgeladen. Das Manifest wird trotzdem gelesen,
+    # damit Dokumente und Artefakte gelöschter Dateien entfernt werden, und danach
+    # geschrieben, damit der nächste inkrementelle Lauf darauf aufbauen kann.
+    manifest = load_manifest(args.manifest)
+    files = list(iter_csv_files(args.data_path))
+    changed, hashes, removed = plan_changes(manifest, files, force=not args.incremental)
+    logger.info(f"{len(changed)} geänderte Dateien, {len(removed)} entfernte Dateien")
+    if args.incremental and not changed and not removed and read_ingest_version(args.artifacts_dir):
+        # Artefakte und Versionsstempel bleiben, sonst verwürfen die Dienste grundlos ihre Caches
+        logger.info("Keine Änderungen seit dem letzten Lauf, Artefakte und Ingest-Version bleiben unverändert")
+        write_metrics(args, metrics)
         return
-        
-def add_rest(competitor_str, nat_str, gender_folder, file_name, wold_rank):   
-    if competitor_str == "":
-        document_mapping["competitor"] = None
-    else:
-        document_mapping["competitor"] = competitor_str
-        
-    if nat_str == "":
-        document_mapping["nat"] = None
-    else:
-        document_mapping["nat"] = nat_str   
-        
-    document_mapping["discipline"] = file_name.replace(".csv","")
-    document_mapping["gender"] = gender_folder.capitalize()  
-    document_mapping["world_rank"] = wold_rank
-  
-    
-def bulk_index_documents(client, index_name, documents):
-    """
-    Indexiert eine Liste von Dokumenten im Bulk
-    """
+    progress = Progress(changed, args.progress_interval)
+
+    # IDs pro Datei auf der Platte, damit der Speicher nicht mit der Zahl der Dokumente wächst
+    new_ids = IdSpill()
+    suggestions = SuggestionBuilder()
+    leaderboards = LeaderboardBuilder()
+    facets = FacetBuilder()
+
+    def tracked(documents):
+        for doc_id, record in documents:
+            progress.observe(record)
+            key = file_key(record.gender.lower(), record.discipline + ".csv")
+            new_ids.add(key, doc_id)
+            suggestions.observe(key, record)
+            leaderboards.observe(key, doc_id, record)
+            facets.observe(key, record)
+            yield doc_id, record
+
+    def stale_ids():
+        # Wird erst nach allen Indexaktionen ausgewertet, new_ids ist dann vollständig.
+        # Ein neuer Index (--lifecycle) enthält nur die gerade geladenen Dokumente.
+        if args.lifecycle:
+            return
+        for folder_name, file_name, _ in changed:
+            key = file_key(folder_name, file_name)
+            fresh = set(new_ids.ids(key))
+            yield from (doc_id for doc_id in manifest.get(key, {}).get("ids", []) if doc_id not in fresh)
+        for key in removed:
+            yield from manifest[key]["ids"]
+
     try:
-        # Vorbereitung der Dokumente für Bulk-Operation
-        bulk_data = []
-        for doc_id, doc_body in documents:
-            action = {
-                "_index": index_name,
-                "_id": doc_id,
-                "_source": doc_body
-            }
-            bulk_data.append(action)
-        
-        # Bulk-Indexierung durchführen
-        response = helpers.bulk(client, bulk_data)
-        print(f"Bulk-Indexierung erfolgreich: {response[0]} Dokumente indexiert")
-        
-        if response[1]:  # Fehler vorhanden
-            print(f"Fehler bei {len(response[1])} Dokumenten:")
-            for error in response[1]:
-                print(f"  - {error}")
-    
-    except Exception as e:
-        print(f"Fehler bei Bulk-Indexierung: {e}")
-    
-phases = {
-    "f": "Finale",
-    "h": "Vorrunde",
-    "er": "Extra",
-    "sf": "Halbfinale",
-    "sr": "Halbfinale",
-    "pr": "Vorausscheid",
-    "ce": "Kombiniert",
-    "qf": "Viertelfinale",
-    "q": "Qualifikation"
-}  
+        client = None if args.export_dir else instrument_client(create_client(args.host, args.port), metrics)
+        if args.lifecycle:
+            args.index = create_load_index(client, profile_body(args.profile))
+            logger.info(f"Lade in neuen Index '{args.index}' (Profil '{args.profile}')")
 
+        if args.workers > 1:
+            documents = iter_documents_parallel(args.data_path, args.workers, args.chunk_rows, files=changed)
+        else:
+            documents = iter_documents(args.data_path, files=changed)
+        documents = timed_iter(documents, metrics, "parse")
+        actions = chain(iter_actions(tracked(documents), args.index), iter_delete_actions(stale_ids(), args.index))
+        if args.export_dir:
+            exported, files = export_bulk_files(actions, args.export_dir, args.export_bytes)
+        elif args.async_senders:
+            success, failed_ids = run_async_ingest(
+                lambda: create_async_client(args.host, args.port, maxsize=args.async_senders),
+                actions, args.async_senders, target_latency=args.target_latency, max_retries=args.max_retries,
+                dead_letter_path=args.dead_letter, metrics=metrics)
+        elif args.fixed_batches:
+            success, failed_ids = bulk_index_documents(client, actions, args.bulk_size)
+        else:
+            sender = AdaptiveBulkSender(client, target_latency=args.target_latency, max_retries=args.max_retries,
+                                        dead_letter_path=args.dead_letter, metrics=metrics)
+            success, failed_ids = sender.send(actions)
+        progress.finish()
+        metrics.inc("rows", progress.rows)
 
-client = OpenSearch(
-    hosts = [{'host': 'localhost', 'port': 9200}],
-    http_compress = True,
-    use_ssl = False,
-    verify_certs = False,
-    ssl_show_warn = False,
-    ssl_assert_hostname = False,
-)
+        if args.lifecycle:
+            if failed_ids:
+                # Der Alias bleibt auf dem alten Index, der neue kann geprüft und von Hand übernommen werden
+                logger.warning(f"Alias nicht umgesetzt, {len(failed_ids)} Dokumente fehlgeschlagen "
+                               f"(manuell: python create-index.py finalize {args.index})")
+            else:
+                finalize_index(client, args.index)
+                previous, removed = swap_alias(client, args.index)
+                if removed:
+                    logger.info(f"Alter Index '{removed}' zugunsten des Alias entfernt")
+                logger.info(f"Alias umgesetzt auf '{args.index}' (vorher: {', '.join(previous) or '-'})")
+    except Exception as e:
+        logger.exception(f"Fehler bei der Verarbeitung: {e}")
+        new_ids.close()
+        sys.exit(1)
 
-document_mapping = {
-    "age_at_competition": int,
-    "competitor": str,
-    "date": str,
-    "discipline": str,
-    "dob": str,
-    "gender": str,
-    "mark": {
-        "raw_value": str,
-        "display_value": str,
-        "numeric_value": float,
-        "unit": str,
-        "format_type": str,
-    },
-    "nat": str,
-    "pos": {
-        "raw_pos": str,
-        "numeric_pos": int,
-        "group": str,
-        },
-    "world_rank": int,
-    "venue":{
-        "venue_raw": str,
-        "city": str,
-        "country": str,
-        "stadium": str,
-        "extra": str,
-    },
-    "wind": float,
-}
+    if args.export_dir:
+        # Das Manifest bleibt unverändert, die Dateien sind noch nicht im Cluster angekommen
+        logger.info(f"Export abgeschlossen: {exported} Aktionen in {len(files)} Dateien unter '{args.export_dir}'")
+        write_metrics(args, metrics)
+        new_ids.close()
+        return
 
-bad_words = ["", "Rank", "Results Score", "Unnamed: 6"]
-good_words = ["Mark","WIND","Competitor","DOB","Nat","Pos","Venue","Date"]
+    # Nur vollständig übertragene Dateien ins Manifest übernehmen, der Rest wird beim nächsten Lauf wiederholt
+    completed = []
+    deleted = []
+    for folder_name, file_name, _ in changed:
+        key = file_key(folder_name, file_name)
+        old_ids = manifest.get(key, {}).get("ids", [])
+        if failed_ids.isdisjoint(new_ids.ids(key)) and failed_ids.isdisjoint(old_ids):
+            # ids None: save_manifest liest sie beim Schreiben aus new_ids
+            manifest[key] = {"sha256": hashes[key], "ids": None}
+            completed.append(key)
+    for key in removed:
+        if failed_ids.isdisjoint(manifest[key]["ids"]):
+            del manifest[key]
+            deleted.append(key)
+    save_manifest(manifest, args.manifest, new_ids)
+    new_ids.close()
+    # Die Artefakte folgen dem Manifest: nur übertragene Dateien ersetzen ihre Beiträge.
+    # Beiträge von Dateien, die es weder auf der Platte noch im Manifest gibt, entfallen.
+    keep = {file_key(folder_name, file_name) for folder_name, file_name, _ in files} | set(manifest)
+    update_suggestions(suggestions, completed, deleted, args.artifacts_dir, keep)
+    boards = update_leaderboards(leaderboards, completed, deleted, args.artifacts_dir, keep)
+    logger.info(f"{update_athletes(args.artifacts_dir, boards)} Athletendokumente geschrieben")
+    del boards
+    update_facets(facets, completed, deleted, args.index, args.artifacts_dir, keep)
+    # Neuer Stempel, damit die Such-API ihren Cache verwirft
+    version = write_ingest_version(args.artifacts_dir, index=args.index, actions_ok=success,
+                                   actions_failed=len(failed_ids))
+    logger.info(f"Ingest-Version {version} geschrieben")
 
-id_number = 1
-index_name = "sport-results"
-bulk_documents = []  # Liste für Bulk-Dokumente
-bulk_size = 1000     # Anzahl Dokumente pro Bulk-Operation
+    metrics.inc("actions_ok", success)
+    metrics.inc("actions_failed", len(failed_ids))
+    logger.info(f"Bulk-Indexierung abgeschlossen: {success} Aktionen erfolgreich, {len(failed_ids)} fehlgeschlagen")
+    for line in format_cache_stats(cache_stats()).splitlines():
+        logger.info(line)
+    write_metrics(args, metrics)
 
-data_path = "data"
-# Durchsuche die Verzeichnisse
-for folder_name in ["men","women"]:
-    folder_path = os.path.join(data_path, folder_name)
-    
-    if os.path.isdir(folder_path):
-        # Durchsuche die CSV-Dateien im Verzeichnis
-        for file_name in os.listdir(folder_path):
-            if file_name.lower().endswith('.csv'):
-                file_path = os.path.join(folder_path, file_name)
-                
-                print(f"\n Datei: {file_name}")
-                print("-" * 40)
-                #Lese die CSV-Datei
-                try:
-                    with open(file_path, "r", encoding="utf-8") as csvfile:
-                        csv_reader = csv.reader(csvfile)
-                        
-                        header = next(csv_reader, None)
-                        if header:
-                            print(f"Ordner: {folder_name} | Spaltenüberschriften: {header}")
-                            for index in header:
-                                if index in bad_words:
-                                    print(f" - {index}")
-                            
-                        for row_num, row in enumerate(csv_reader, 1):
-                            # Erstelle eine Kopie der document_mapping für jedes Dokument
-                            current_document = {
-                                "age_at_competition": None,
-                                "competitor": None,
-                                "date": None,
-                                "discipline": None,
-                                "dob": None,
-                                "gender": None,
-                                "mark": {
-                                    "raw_value": None,
-                                    "display_value": None,
-                                    "numeric_value": None,
-                                    "unit": None,
-                                    "format_type": None,
-                                },
-                                "nat": None,
-                                "pos": {
-                                    "raw_pos": None,
-                                    "numeric_pos": None,
-                                    "group": None,
-                                },
-                                "world_rank": None,
-                                "venue": {
-                                    "venue_raw": None,
-                                    "city": None,
-                                    "country": None,
-                                    "stadium": None,
-                                    "extra": None,
-                                },
-                                "wind": None,
-                            }
-                            
-                            # Temporär document_mapping auf current_document setzen
-                            document_mapping = current_document
-                            print(f"\n Verarbeitung Zeile {row_num}: {row}")
-                            convert_position(row[4])
-                            convert_mark(row[0], file_name)
-                            calculate_age_at_comp(row[6], row[2])
-                            convert_venue(row[5])
-                            if len(row) > 7:
-                                if row[7] != "":
-                                    document_mapping["wind"] = float(row[7])
-                            add_rest(row[1], row[3], folder_name, file_name, row_num)
-                            
-                            # Füge Dokument zur Bulk-Liste hinzu
-                            bulk_documents.append((id_number, document_mapping.copy()))
-                            id_number += 1
-                            
-                            # Wenn Bulk-Größe erreicht, indexiere die Dokumente
-                            if len(bulk_documents) >= bulk_size:
-                                print(f"Indexiere {len(bulk_documents)} Dokumente...")
-                                bulk_index_documents(client, index_name, bulk_documents)
-                                bulk_documents.clear()  # Liste leeren
-                            
-                except Exception as e:
-                    print(f"Fehler beim Lesen der Datei {file_name}: {e}")
-                    sys.exit()
 
-# Indexiere verbleibende Dokumente
-if bulk_documents:
-    print(f"Indexiere verbleibende {len(bulk_documents)} Dokumente...")
-    bulk_index_documents(client, index_name, bulk_documents)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import zlib
+
+from disciplines import DISCIPLINE_KINDS, TIME, discipline_kind
+from search_queries import build_search_query, canonical_search_params
+
+PIT_KEEP_ALIVE = "2m"
+PAGE_SIZE = 100
+EXPORT_PAGE_SIZE = 1000
+# Schlüssel für die Signatur der Cursor. Ohne CURSOR_SECRET gilt ein zufälliger Schlüssel pro
+# Prozess; bei mehreren Service-Prozessen muss die Variable überall gleich gesetzt sein.
+CURSOR_SECRET = os.environ.get("CURSOR_SECRET", "").encode("utf-8") or os.urandom(32)
+SIGNATURE_BYTES = 16
+
+
+class CursorError(ValueError):
+    """
+    Cursor ist ungültig oder der zugehörige Point-in-Time ist abgelaufen
+    """
+
+
+def mark_order(params):
+    """
+    Sortierrichtung der Leistung: Zeiten aufsteigend, Weiten und Punkte absteigend.
+    Ohne Disziplin wird aufsteigend sortiert, "order" überschreibt die Richtung.
+    """
+    if params.get("order") in ("asc", "desc"):
+        return params["order"]
+    discipline = params.get("discipline")
+    if not discipline:
+        return "asc"
+    # Die Parameter sind normalisiert (klein geschrieben), die Tabelle nicht
+    name = next((name for name in DISCIPLINE_KINDS if name.lower() == discipline), discipline)
+    return "asc" if discipline_kind(name) == TIME else "desc"
+
+
+def sort_clause(order):
+    """
+    Eindeutige Sortierung mit Tiebreakern, damit search_after keine Treffer doppelt liefert oder auslässt
+    """
+    return [
+        {"mark.numeric_value": {"order": order, "missing": "_last"}},
+        {"world_rank": {"order": "asc", "missing": "_last"}},
+        {"_id": {"order": "asc"}},
+    ]
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _signature(data, secret):
+    return hmac.new(secret, data, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+
+def encode_cursor(state, secret=CURSOR_SECRET):
+    """
+    Komprimierter Cursor mit HMAC-Signatur: <Daten>.<Signatur>, beides base64url
+    """
+    data = zlib.compress(json.dumps(state, separators=(",", ":")).encode("utf-8"))
+    return f"{_b64encode(data)}.{_b64encode(_signature(data, secret))}"
+
+
+def decode_cursor(cursor, secret=CURSOR_SECRET):
+    """
+    Prüft Signatur und Aufbau des Cursors und normalisiert die enthaltenen Suchparameter
+    erneut (u.a. die Obergrenze für size). Jeder Fehler wird zu CursorError.
+    """
+    try:
+        data, signature = cursor.split(".")
+        data, signature = _b64decode(data), _b64decode(signature)
+    except ValueError:
+        raise CursorError("Ungültiger Cursor")
+    if not hmac.compare_digest(signature, _signature(data, secret)):
+        raise CursorError("Ungültiger Cursor: Signatur stimmt nicht")
+    try:
+        state = json.loads(zlib.decompress(data))
+    except (ValueError, zlib.error) as e:
+        raise CursorError(f"Ungültiger Cursor: {e}")
+    if not isinstance(state, dict) or not isinstance(state.get("pit"), str) \
+            or not isinstance(state.get("after"), list) or not isinstance(state.get("params"), dict):
+        raise CursorError("Ungültiger Cursor")
+    try:
+        params = canonical_search_params(state["params"])
+    except (ValueError, TypeError, AttributeError) as e:
+        raise CursorError(f"Ungültiger Cursor: {e}")
+    return {**state, "params": params}
+
+
+def open_pit(client, index_name, keep_alive=PIT_KEEP_ALIVE):
+    return client.create_pit(index=index_name, keep_alive=keep_alive)["pit_id"]
+
+
+def close_pit(client, pit_id):
+    client.delete_pit(body={"pit_id": [pit_id]})
+
+
+def search_page(client, params, pit_id, search_after=None, size=PAGE_SIZE, keep_alive=PIT_KEEP_ALIVE,
+                track_total_hits=False):
+    """
+    Eine Seite über den Point-in-Time. Gibt (Treffer, aktuelle PIT-ID, Gesamtanzahl oder None) zurück.
+    """
+    body = build_search_query(params)
+    body.update(size=size, sort=sort_clause(mark_order(params)), track_total_hits=track_total_hits,
+                pit={"id": pit_id, "keep_alive": keep_alive})
+    if search_after is not None:
+        body["search_after"] = search_after
+    # Bei einer PIT-Suche steht der Index im PIT, nicht im Pfad
+    response = client.search(body=body)
+    hits = response["hits"]
+    total = hits["total"]["value"] if track_total_hits and isinstance(hits.get("total"), dict) else None
+    return hits["hits"], response.get("pit_id", pit_id), total
+
+
+def fetch_page(client, index_name, params=None, cursor=None, keep_alive=PIT_KEEP_ALIVE):
+    """
+    Erste Seite zu params oder die Folgeseite zu cursor. Der signierte Cursor enthält PIT-ID,
+    die Sortierwerte des letzten Treffers und die Suchparameter; auf der letzten
+    Seite wird der PIT geschlossen und es gibt keinen Cursor mehr.
+    """
+    if cursor is not None:
+        state = decode_cursor(cursor)
+        params, pit_id, search_after = state["params"], state["pit"], state["after"]
+    else:
+        pit_id, search_after = open_pit(client, index_name, keep_alive), None
+    size = params.get("size", PAGE_SIZE)
+
+    hits, pit_id, total = search_page(client, params, pit_id, search_after, size, keep_alive,
+                                      track_total_hits=cursor is None)
+    next_cursor = None
+    if len(hits) == size:
+        next_cursor = encode_cursor({"pit": pit_id, "after": hits[-1]["sort"], "params": params})
+    else:
+        close_pit(client, pit_id)
+    page = {
+        "results": [{"id": hit["_id"], **hit["_source"]} for hit in hits],
+        "next_cursor": next_cursor,
+    }
+    if total is not None:
+        page["total"] = total
+    return page
+
+
+def iter_all_hits(client, index_name, params, page_size=EXPORT_PAGE_SIZE, keep_alive=PIT_KEEP_ALIVE):
+    """
+    Liefert alle Treffer seitenweise über einen Point-in-Time. Der Cluster hält pro
+    Seite nur page_size Treffer, unabhängig von der Gesamtanzahl.
+    """
+    pit_id = open_pit(client, index_name, keep_alive)
+    try:
+        search_after = None
+        while True:
+            hits, pit_id, _ = search_page(client, params, pit_id, search_after, page_size, keep_alive)
+            yield from hits
+            if len(hits) < page_size:
+                return
+            search_after = hits[-1]["sort"]
+    finally:
+        close_pit(client, pit_id)
@@ -0,0 +1,254 @@
+import argparse
+import json
+import re
+import time
+from datetime import date
+
+import numpy as np
+
+from columnar import EPOCH_ORDINAL, MISSING_INT, STORE_PATH, days_to_date, load_store
+from ingest import DATA_PATH, athlete_id
+from pagination import mark_order
+from search_queries import canonical_search_params
+
+# Spalten mit sortiertem Index für Bereichsabfragen
+SORTED_COLUMNS = ["mark", "date", "dob", "age_at_competition"]
+# Textspalten, in denen die Freitextsuche nach ganzen Wörtern sucht (wie query in combinedSearch)
+QUERY_COLUMNS = ["competitor", "discipline", "city", "country", "nat"]
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def _days(iso_date):
+    return date.fromisoformat(iso_date).toordinal() - EPOCH_ORDINAL
+
+
+def _words(text):
+    return WORD_PATTERN.findall(text.lower())
+
+
+class SortedIndex:
+    """
+    Sortierte Kopie einer Spalte plus Permutation; ein Bereich [gte, lte] ist damit
+    zwei Bisektionen statt eines Vergleichs über alle Zeilen.
+    Fehlende Werte (MISSING_INT bzw. NaN) liegen am Rand und werden nie getroffen.
+    """
+
+    def __init__(self, values):
+        self.order = np.argsort(values, kind="stable")
+        self.values = values[self.order]
+        if np.issubdtype(values.dtype, np.integer):
+            self.start = int(np.searchsorted(self.values, MISSING_INT, side="right"))
+        else:
+            self.start = 0
+        # NaN wird von argsort ans Ende sortiert
+        self.stop = len(self.values) - (int(np.isnan(self.values).sum()) if values.dtype.kind == "f" else 0)
+
+    def rows(self, gte=None, lte=None):
+        lo = self.start if gte is None else max(self.start, int(np.searchsorted(self.values, gte, side="left")))
+        hi = self.stop if lte is None else min(self.stop, int(np.searchsorted(self.values, lte, side="right")))
+        return self.order[lo:hi] if lo < hi else self.order[:0]
+
+
+class QueryEngine:
+    """
+    Beantwortet die Filter von combinedSearch lokal über NumPy-Spalten des Spaltenspeichers:
+    Term-Filter als gecachte Bitmaps pro Kategorie, Bereiche über sortierte Indizes,
+    Freitext als Wortsuche in den Kategorien. Ohne Fuzziness und Scoring, Treffer
+    werden wie bei der seitenweisen Suche nach Leistung und Weltranglistenplatz sortiert.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.rows = len(store)
+        # Vollständig in den Speicher laden, statt bei jeder Abfrage über mmap zu lesen
+        self.columns = {name: np.array(column) for name, column in store.columns.items()}
+        self.indexes = {name: SortedIndex(self.columns[name]) for name in SORTED_COLUMNS}
+        self._bitmaps = {}
+        self._word_codes = {}
+        self._athlete_ids = None
+
+    @classmethod
+    def load(cls, data_path=DATA_PATH, store_path=STORE_PATH):
+        return cls(load_store(data_path, store_path))
+
+    def bitmap(self, column, codes):
+        """
+        Boolesche Maske der Zeilen, deren Code in codes liegt (gecacht je Spalte und Codes)
+        """
+        key = (column, tuple(codes))
+        mask = self._bitmaps.get(key)
+        if mask is None:
+            if len(codes) == 1:
+                mask = self.columns[column] == codes[0]
+            else:
+                mask = np.isin(self.columns[column], codes)
+            self._bitmaps[key] = mask
+        return mask
+
+    def term(self, column, value):
+        """
+        Maske für column == value
+        """
+        code = self.store.code(column, value)
+        return self.bitmap(column, [code] if code >= 0 else [])
+
+    def words(self, column, word):
+        """
+        Maske der Zeilen, deren Wert in column das Wort word enthält
+        """
+        word_codes = self._word_codes.get(column)
+        if word_codes is None:
+            word_codes = {}
+            for code, category in enumerate(self.store.categories[column]):
+                for part in set(_words(category)):
+                    word_codes.setdefault(part, []).append(code)
+            self._word_codes[column] = word_codes
+        return self.bitmap(column, word_codes.get(word, []))
+
+    def athlete(self, wanted_id):
+        """
+        Maske der Resultate einer athlete_id. Die IDs werden beim ersten Aufruf einmal
+        pro verschiedener Kombination (Name, Geburtsdatum, Nation) berechnet.
+        """
+        if self._athlete_ids is None:
+            keys = np.stack([self.columns["competitor"].astype(np.int64), self.columns["dob"].astype(np.int64),
+                             self.columns["nat"].astype(np.int64)], axis=1)
+            combinations, inverse = np.unique(keys, axis=0, return_inverse=True)
+            ids = {}
+            for number, (competitor, dob, nat) in enumerate(combinations):
+                if competitor < 0:
+                    continue
+                ids.setdefault(athlete_id(self.store.categories["competitor"][competitor], days_to_date(dob),
+                                          self.store.categories["nat"][nat] if nat >= 0 else ""), []).append(number)
+            self._athlete_ids = (ids, inverse.reshape(-1))
+        ids, inverse = self._athlete_ids
+        return np.isin(inverse, ids.get(wanted_id, []))
+
+    def range(self, column, gte=None, lte=None):
+        mask = np.zeros(self.rows, dtype=bool)
+        mask[self.indexes[column].rows(gte, lte)] = True
+        return mask
+
+    def text(self, query, columns):
+        """
+        Mindestens ein Wort der Anfrage kommt in einer der Spalten vor (ODER wie bei multi_match)
+        """
+        mask = np.zeros(self.rows, dtype=bool)
+        for word in _words(query):
+            for column in columns:
+                mask |= self.words(column, word)
+        return mask
+
+    def mask(self, params):
+        """
+        Maske aller Zeilen, die zu den normalisierten Suchparametern passen
+        """
+        masks = []
+        if "query" in params:
+            columns = {"competitor": ["competitor"], "city": ["city"], "country": ["country"]}.get(
+                params.get("search_field"), QUERY_COLUMNS)
+            masks.append(self.text(params["query"], columns))
+        for name in ("first_name", "last_name"):
+            if name in params:
+                masks.append(self.text(params[name], ["competitor"]))
+        if "gender" in params:
+            masks.append(self.term("gender", params["gender"]))
+        if "nat" in params:
+            masks.append(self.term("nat", params["nat"]))
+        if "athlete_id" in params:
+            masks.append(self.athlete(params["athlete_id"]))
+        if "discipline" in params:
+            masks.append(self.text(params["discipline"], ["discipline"]))
+        if "venue" in params:
+            masks.append(self.text(params["venue"], ["city", "country"]))
+        for name in ("date", "dob"):
+            if name in params:
+                days = _days(params[name])
+                masks.append(self.range(name, days, days))
+        if "min_mark" in params or "max_mark" in params:
+            masks.append(self.range("mark", params.get("min_mark"), params.get("max_mark")))
+        if "min_age" in params or "max_age" in params:
+            masks.append(self.range("age_at_competition", params.get("min_age"), params.get("max_age")))
+
+        if not masks:
+            return np.ones(self.rows, dtype=bool)
+        result = masks[0].copy()
+        for mask in masks[1:]:
+            result &= mask
+        return result
+
+    def top(self, rows, size, order="asc"):
+        """
+        Die size besten Zeilen aus rows: Leistung (fehlende zuletzt), dann Weltranglistenplatz, dann Zeilennummer
+        """
+        marks = self.columns["mark"][rows]
+        key = marks if order == "asc" else -marks
+        if len(rows) > size:
+            # Nur die Kandidaten bis zum size-ten Wert (inklusive Gleichstände) vollständig sortieren
+            kth = np.partition(key, size - 1)[size - 1]
+            candidates = (key <= kth) if not np.isnan(kth) else np.ones(len(rows), dtype=bool)
+            rows, key = rows[candidates], key[candidates]
+        ranking = np.lexsort((rows, self.columns["world_rank"][rows], key))
+        return rows[ranking[:size]]
+
+    def record(self, row):
+        """
+        Eine Zeile als Dokument (Auszug der Felder des OpenSearch-Dokuments)
+        """
+        columns = self.columns
+
+        def category(name):
+            code = columns[name][row]
+            return self.store.categories[name][code] if code >= 0 else None
+
+        def integer(name):
+            value = int(columns[name][row])
+            return None if value == MISSING_INT else value
+
+        mark = float(columns["mark"][row])
+        wind = float(columns["wind"][row])
+        return {
+            "row": int(row),
+            "age_at_competition": integer("age_at_competition"),
+            "competitor": category("competitor"),
+            "date": days_to_date(columns["date"][row]),
+            "discipline": category("discipline"),
+            "dob": days_to_date(columns["dob"][row]),
+            "gender": category("gender"),
+            "mark": {"raw_value": category("mark_raw"), "numeric_value": None if np.isnan(mark) else mark},
+            "nat": category("nat"),
+            "pos": integer("pos"),
+            "world_rank": integer("world_rank"),
+            "venue": {"city": category("city"), "country": category("country")},
+            "wind": None if np.isnan(wind) else round(wind, 2),
+        }
+
+    def search(self, params):
+        """
+        Wie /search: normalisierte Parameter rein, Gesamtanzahl und die besten size Treffer raus
+        """
+        rows = np.flatnonzero(self.mask(params))
+        top = self.top(rows, params.get("size", 100), mark_order(params))
+        return {"total": int(len(rows)), "results": [self.record(row) for row in top]}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Suche über den Spaltenspeicher ohne OpenSearch")
+    parser.add_argument("--data-path", default=DATA_PATH)
+    parser.add_argument("--store", default=STORE_PATH)
+    for name in ("query", "search-field", "first-name", "last-name", "gender", "nat", "discipline", "venue",
+                 "date", "dob", "athlete-id", "min-mark", "max-mark", "min-age", "max-age", "order", "size"):
+        parser.add_argument(f"--{name}")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    started = time.perf_counter()
+    engine = QueryEngine.load(args.data_path, args.store)
+    loaded = time.perf_counter()
+    params = canonical_search_params({name: value for name, value in vars(args).items() if value is not None})
+    result = engine.search(params)
+    finished = time.perf_counter()
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    print(f"Laden {loaded - started:.2f} s, Abfrage {(finished - loaded) * 1000:.1f} ms")
@@ -0,0 +1,438 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from disciplines import TIME, discipline_kind, get_discipline
+from index_lifecycle import ALIAS
+from ingest import DATA_PATH, iter_csv_files, iter_rows, transform_row
+from opensearch_client import HOST, PORT, create_client
+from search_queries import (build_autocomplete_query, build_leaderboard_query, build_search_query,
+                            canonical_search_params)
+
+ROOT_PATH = os.path.dirname(os.path.abspath(__file__))
+# Last und Ergebnisse liegen unabhängig vom Arbeitsverzeichnis neben dem Skript (in .gitignore)
+RESULTS_PATH = os.path.join(ROOT_PATH, "benchmarks")
+WORKLOAD_PATH = os.path.join(RESULTS_PATH, "search-workload.json")
+QUERIES = 2000
+SAMPLE_SIZE = 5000
+# Anteil der Abfragearten; Autocomplete feuert in der App bei jedem Tastendruck.
+# leaderboard misst den Gewinn der Indexsortierung (create-index.py reindex --profile leaderboard)
+MIX = {"autocomplete": 0.55, "search": 0.35, "leaderboard": 0.1}
+# Varianten der combinedSearch-Abfrage: Namenssuche, Filterdialog, Suche nach Austragungsort
+SEARCH_VARIANTS = {"name": 0.6, "filter": 0.3, "venue": 0.1}
+# Suchfeld der Autocomplete-Abfrage (None = alle Felder)
+AUTOCOMPLETE_FIELDS = {"competitor": 0.6, None: 0.2, "city": 0.15, "country": 0.05}
+TYPO_RATE = 0.2
+PERCENTILES = (50, 95, 99)
+PROFILE_TOP = 5
+
+
+def sample_records(data_path, size, rng):
+    """
+    Zieht size zufällige Zeilen aus allen CSV-Dateien (Reservoir-Sampling, ein Durchlauf).
+    Nur die gezogenen Zeilen werden in ResultRecords umgewandelt; häufige Namen,
+    Disziplinen und Nationen kommen so so oft vor wie in den Daten.
+    """
+    reservoir = []
+    seen = 0
+    for folder_name, file_name, file_path in iter_csv_files(data_path):
+        for row_num, row in iter_rows(file_path):
+            seen += 1
+            if len(reservoir) < size:
+                reservoir.append((folder_name, file_name, row_num, row))
+            else:
+                slot = rng.randrange(seen)
+                if slot < size:
+                    reservoir[slot] = (folder_name, file_name, row_num, row)
+    return [transform_row(row, folder_name, file_name, row_num, get_discipline(file_name))
+            for folder_name, file_name, row_num, row in reservoir]
+
+
+def _choice(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _typo(word, rng):
+    """
+    Vertauscht zwei benachbarte Buchstaben oder lässt einen aus, damit fuzziness AUTO arbeiten muss
+    """
+    if len(word) < 4:
+        return word
+    i = rng.randrange(len(word) - 1)
+    if rng.random() < 0.5:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + word[i + 1:]
+
+
+def _name_terms(competitor):
+    """
+    (Vorname, Nachname) aus "Vorname NACHNAME"; Nachnamen stehen in den Daten in Großbuchstaben
+    """
+    words = competitor.split()
+    last = [word for word in words if word.isupper() and len(word) > 1]
+    first = [word for word in words if word not in last]
+    return " ".join(first), " ".join(last) or competitor
+
+
+def search_params(record, rng):
+    """
+    Parameter einer combinedSearch-Abfrage rund um einen gezogenen Datensatz
+    """
+    variant = _choice(rng, SEARCH_VARIANTS)
+    raw = {}
+    if variant == "name":
+        first, last = _name_terms(record.competitor)
+        query = rng.choice([last, last, f"{first} {last}".strip()]).lower()
+        if rng.random() < TYPO_RATE:
+            query = _typo(query, rng)
+        raw["query"] = query
+        if rng.random() < 0.5:
+            raw["search_field"] = "competitor"
+        if rng.random() < 0.3:
+            raw["gender"] = record.gender
+    elif variant == "filter":
+        raw["gender"] = record.gender
+        raw["discipline"] = record.discipline
+        if record.nat and rng.random() < 0.5:
+            raw["nat"] = record.nat
+        mark = record.mark.numeric_value
+        if mark is not None:
+            # "Besser als": bei Zeiten schneller, bei Weiten und Punkten mehr
+            raw["max_mark" if discipline_kind(record.discipline) == TIME else "min_mark"] = mark
+    else:
+        city = record.venue.city or record.venue.venue_raw or ""
+        if rng.random() < 0.5:
+            raw["query"] = city.lower()
+            raw["search_field"] = "city"
+        else:
+            raw["venue"] = city
+        if rng.random() < 0.5:
+            raw["discipline"] = record.discipline
+    return variant, canonical_search_params(raw)
+
+
+def autocomplete_params(record, rng):
+    """
+    Parameter einer Autocomplete-Abfrage: 2 bis 6 getippte Buchstaben eines Werts des Datensatzes
+    """
+    search_field = _choice(rng, AUTOCOMPLETE_FIELDS)
+    text = None
+    if search_field == "city":
+        text = record.venue.city
+    elif search_field == "country":
+        text = record.venue.country
+    if not text:
+        # Ohne Ort im Datensatz wird ein Name getippt
+        search_field = None if search_field in ("city", "country") else search_field
+        first, last = _name_terms(record.competitor)
+        text = rng.choice([last, last, first or last])
+    params = {"prefix": text[:rng.randint(2, 6)].lower(), "search_field": search_field}
+    if rng.random() < 0.5:
+        params["gender"] = record.gender
+    if rng.random() < 0.3:
+        params["discipline"] = record.discipline
+    if record.nat and rng.random() < 0.1:
+        params["nat"] = record.nat
+    return search_field or "all", params
+
+
+def build_workload(records, queries, rng):
+    """
+    Erzeugt queries Abfragen mit fertigem Request-Body. Der Body wird mitgespeichert,
+    damit alle Indexvarianten exakt dieselben Abfragen bekommen.
+    """
+    workload = []
+    for query_id in range(queries):
+        record = rng.choice(records)
+        kind = _choice(rng, MIX)
+        if kind == "search":
+            variant, params = search_params(record, rng)
+            body = build_search_query(params)
+        elif kind == "leaderboard":
+            # Zeiten aufsteigend, Weiten und Punkte absteigend
+            variant = "asc" if discipline_kind(record.discipline) == TIME else "desc"
+            params = {"discipline": record.discipline, "gender": record.gender, "order": variant}
+            body = build_leaderboard_query(**params)
+        else:
+            variant, params = autocomplete_params(record, rng)
+            body = build_autocomplete_query(**params)
+        workload.append({"id": query_id, "kind": kind, "variant": variant, "params": params, "body": body})
+    return workload
+
+
+def load_workload(args):
+    if os.path.exists(args.workload) and not args.regenerate:
+        with open(args.workload, "r", encoding="utf-8") as f:
+            workload = json.load(f)
+        print(f"{len(workload['queries'])} Abfragen aus {args.workload} geladen")
+        return workload
+    rng = random.Random(args.seed)
+    print(f"Ziehe {args.sample_size} Zeilen aus {args.data_path} ...")
+    records = sample_records(args.data_path, args.sample_size, rng)
+    if not records:
+        raise SystemExit(f"Keine Daten in {args.data_path}")
+    workload = {"seed": args.seed, "sample_size": len(records), "queries": build_workload(records, args.queries, rng)}
+    os.makedirs(os.path.dirname(args.workload) or ".", exist_ok=True)
+    with open(args.workload, "w", encoding="utf-8") as f:
+        json.dump(workload, f, ensure_ascii=False)
+    print(f"{len(workload['queries'])} Abfragen in {args.workload} gespeichert")
+    return workload
+
+
+def replay(client, index, queries, qps, concurrency):
+    """
+    Spielt die Abfragen mit concurrency Threads ab. Mit qps > 0 ist jede Abfrage zu einem festen
+    Zeitpunkt fällig (offene Last); die Latenz zählt ab diesem Zeitpunkt, Wartezeit hinter
+    langsamen Abfragen ist also enthalten. Mit qps = 0 so schnell wie möglich.
+    Gibt pro Abfrage (Latenz s, Servicezeit s, took ms oder None, Fehler oder None) zurück.
+    """
+    timings = [None] * len(queries)
+    next_query = iter(range(len(queries)))
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def worker():
+        while True:
+            with lock:
+                i = next(next_query, None)
+            if i is None:
+                return
+            due = start + i / qps if qps else time.perf_counter()
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            sent = time.perf_counter()
+            try:
+                response = client.search(index=index, body=queries[i]["body"])
+                error = None
+            except Exception as e:
+                response, error = {}, type(e).__name__
+            done = time.perf_counter()
+            timings[i] = (done - due, done - sent, response.get("took"), error)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return timings, time.perf_counter() - start
+
+
+def percentile(sorted_values, p):
+    """
+    p-Perzentil (nearest rank) einer sortierten Liste
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def latency_stats(values_ms):
+    values_ms = sorted(values_ms)
+    stats = {f"p{p}": _round(percentile(values_ms, p)) for p in PERCENTILES}
+    stats["max"] = _round(values_ms[-1]) if values_ms else None
+    stats["mean"] = _round(sum(values_ms) / len(values_ms)) if values_ms else None
+    return stats
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def summarize_profile(response, top=PROFILE_TOP):
+    """
+    Verdichtet die profile-Antwort über alle Shards: Zeit in Abfrage, Rewrite und Collector,
+    die größten Posten der Abfrage-Breakdowns (score, build_scorer, next_doc, ...) und die
+    teuersten Knoten des Abfragebaums (inklusive ihrer Kinder)
+    """
+    query_ns = rewrite_ns = collector_ns = 0
+    breakdown = Counter()
+    nodes = Counter()
+    for shard in response.get("profile", {}).get("shards", []):
+        for search in shard.get("searches", []):
+            rewrite_ns += search.get("rewrite_time", 0)
+            collector_ns += sum(collector.get("time_in_nanos", 0) for collector in search.get("collector", []))
+            for root in search.get("query", []):
+                query_ns += root.get("time_in_nanos", 0)
+                for component, nanos in root.get("breakdown", {}).items():
+                    if not component.endswith("_count"):
+                        breakdown[component] += nanos
+                stack = [root]
+                while stack:
+                    node = stack.pop()
+                    nodes[(node.get("type"), node.get("description", "")[:160])] += node.get("time_in_nanos", 0)
+                    stack.extend(node.get("children", []))
+    return {
+        "took_ms": response.get("took"),
+        "query_ms": _round(query_ns / 1e6),
+        "rewrite_ms": _round(rewrite_ns / 1e6),
+        "collector_ms": _round(collector_ns / 1e6),
+        "breakdown_ms": {component: _round(nanos / 1e6) for component, nanos in breakdown.most_common(top)},
+        "nodes": [{"type": node_type, "description": description, "ms": _round(nanos / 1e6)}
+                  for (node_type, description), nanos in nodes.most_common(top)],
+    }
+
+
+def profile_slowest(client, index, queries, timings, count):
+    """
+    Führt die count langsamsten Abfragen (nach Servicezeit) noch einmal mit "profile": true aus
+    """
+    measured = [(timing[1], i) for i, timing in enumerate(timings) if timing[3] is None]
+    slowest = []
+    for service_s, i in sorted(measured, reverse=True)[:count]:
+        query = queries[i]
+        try:
+            profile = summarize_profile(client.search(index=index, body={**query["body"], "profile": True}))
+        except Exception as e:
+            profile = {"error": type(e).__name__}
+        slowest.append({"id": query["id"], "kind": query["kind"], "variant": query["variant"],
+                        "params": query["params"], "service_ms": _round(service_s * 1000), "profile": profile})
+    return slowest
+
+
+def run_variant(client, index, queries, args):
+    if args.warmup:
+        print(f"[{index}] Aufwärmen mit {min(args.warmup, len(queries))} Abfragen ...")
+        replay(client, index, queries[:args.warmup], 0, args.concurrency)
+    print(f"[{index}] {len(queries)} Abfragen, Ziel {args.qps or 'max'} QPS, {args.concurrency} Threads ...")
+    timings, seconds = replay(client, index, queries, args.qps, args.concurrency)
+
+    groups = {"all": [], **{kind: [] for kind in MIX}}
+    took = {"all": [], **{kind: [] for kind in MIX}}
+    errors = Counter()
+    for query, (latency_s, _, took_ms, error) in zip(queries, timings):
+        if error:
+            errors[error] += 1
+            continue
+        for group in ("all", query["kind"]):
+            groups[group].append(latency_s * 1000)
+            if took_ms is not None:
+                took[group].append(took_ms)
+    result = {
+        "queries": len(queries),
+        "errors": dict(errors),
+        "seconds": round(seconds, 2),
+        "qps_target": args.qps,
+        "qps_achieved": round(len(queries) / seconds, 1) if seconds else None,
+        "latency_ms": {group: {"count": len(values), **latency_stats(values)} for group, values in groups.items()},
+        "took_ms": {group: latency_stats(values) for group, values in took.items()},
+    }
+    if args.profile_top:
+        print(f"[{index}] Profiling der {args.profile_top} langsamsten Abfragen ...")
+        result["slowest"] = profile_slowest(client, index, queries, timings, args.profile_top)
+    return result
+
+
+def print_side_by_side(results):
+    """
+    Perzentile aller Varianten nebeneinander; Abweichungen relativ zur ersten Spalte
+    """
+    names = list(results)
+    width = max(14, *(len(name) for name in names)) + 2
+    print("\n" + " " * 24 + "".join(f"{name:>{width}}" for name in names))
+    rows = [("QPS erreicht", lambda r: r["qps_achieved"]), ("Fehler", lambda r: sum(r["errors"].values()))]
+    for group in ["all", *MIX]:
+        for stat in (*(f"p{p}" for p in PERCENTILES), "max"):
+            rows.append((f"{group} {stat} ms", lambda r, g=group, s=stat: r["latency_ms"].get(g, {}).get(s)))
+        rows.append((f"{group} took p99 ms", lambda r, g=group: r["took_ms"].get(g, {}).get("p99")))
+    for label, value in rows:
+        base = value(results[names[0]])
+        cells = []
+        for name in names:
+            current = value(results[name])
+            cell = "-" if current is None else f"{current}"
+            if name != names[0] and current is not None and base:
+                cell += f" ({(current / base - 1) * 100:+.0f}%)"
+            cells.append(f"{cell:>{width}}")
+        print(f"{label:<24}" + "".join(cells))
+
+    for name, result in results.items():
+        for entry in result.get("slowest", [])[:3]:
+            profile = entry["profile"]
+            components = ", ".join(f"{component} {ms}" for component, ms in profile.get("breakdown_ms", {}).items())
+            print(f"\n[{name}] #{entry['id']} {entry['kind']}/{entry['variant']} {entry['service_ms']} ms "
+                  f"{json.dumps(entry['params'], ensure_ascii=False)}")
+            print(f"  Abfrage {profile.get('query_ms')} ms, Rewrite {profile.get('rewrite_ms')} ms, "
+                  f"Collector {profile.get('collector_ms')} ms; {components or profile.get('error')}")
+            for node in profile.get("nodes", [])[:3]:
+                print(f"  {node['ms']:>8} ms  {node['type']}  {node['description']}")
+
+
+def git_commit():
+    with contextlib.suppress(Exception):
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, cwd=ROOT_PATH,
+                                       stderr=subprocess.DEVNULL).strip()
+    return None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Latenz-Benchmark der Such- und Autocomplete-Abfragen der App")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--index", nargs="+", default=[ALIAS],
+                        help="Ein oder mehrere Indizes/Aliase, die mit derselben Last verglichen werden")
+    parser.add_argument("--data-path", default=DATA_PATH)
+    parser.add_argument("--workload", default=WORKLOAD_PATH, help="Gespeicherte Last (wird bei Bedarf erzeugt)")
+    parser.add_argument("--regenerate", action="store_true", help="Last neu erzeugen, auch wenn die Datei existiert")
+    parser.add_argument("--queries", type=int, default=QUERIES)
+    parser.add_argument("--sample-size", type=int, default=SAMPLE_SIZE, help="Gezogene Zeilen als Parameterquelle")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--qps", type=float, default=50.0, help="Ziel-Abfragen pro Sekunde (0 = so schnell wie möglich)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=200, help="Abfragen vor der Messung (nicht gezählt)")
+    parser.add_argument("--profile-top", type=int, default=10,
+                        help="So viele langsamste Abfragen mit profile: true wiederholen (0 = aus)")
+    parser.add_argument("--label", default="search-latest", help="Name der Ergebnisdatei unter benchmarks/")
+    parser.add_argument("--compare", help="Ergebnisdatei eines früheren Laufs; dessen Varianten erscheinen als Spalten")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    workload = load_workload(args)
+    queries = workload["queries"]
+    client = create_client(args.host, args.port, maxsize=args.concurrency, timeout=30)
+
+    results = {}
+    for index in args.index:
+        results[index] = run_variant(client, index, queries, args)
+
+    columns = dict(results)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        label = os.path.splitext(os.path.basename(args.compare))[0]
+        columns = {**{f"{label}:{index}": result for index, result in baseline.items()}, **results}
+    print_side_by_side(columns)
+
+    os.makedirs(RESULTS_PATH, exist_ok=True)
+    output_path = os.path.join(RESULTS_PATH, f"{args.label}.json")
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "workload": args.workload,
+            "seed": workload["seed"],
+            "queries": len(queries),
+            "qps": args.qps,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "host": f"{args.host}:{args.port}",
+        },
+        "results": results,
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True, ensure_ascii=False)
+        f.write("\n")
+    print(f"\nErgebnisse gespeichert in {output_path}")
+
+
+if __name__ == "__main__":
+    main()
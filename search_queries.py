@@ -0,0 +1,246 @@
+import math
+import re
+from datetime import date
+
+from index_lifecycle import LEADERBOARD_SORT
+
+# Felder der Freitextsuche je nach gewähltem Suchfeld (wie SearchFieldType in der App)
+SEARCH_FIELDS = {
+    None: ["competitor^3", "discipline^2", "venue.city", "venue.country", "nat"],
+    "competitor": ["competitor^3"],
+    "country": ["venue.country"],
+    "city": ["venue.city"],
+}
+DEFAULT_SIZE = 100
+MAX_SIZE = 1000
+
+_WHITESPACE = re.compile(r"\s+")
+ATHLETE_ID_PATTERN = re.compile(r"[0-9a-f]{16}")
+
+TEXT_PARAMS = ("query", "first_name", "last_name", "discipline", "venue")
+# Diese Parameter treffen nur analysierte Textfelder, Groß-/Kleinschreibung ist dort egal.
+# query und venue durchsuchen auch keyword-Felder (venue.city, nat) und bleiben unverändert.
+CASE_INSENSITIVE_PARAMS = ("first_name", "last_name", "discipline")
+DATE_PARAMS = ("date", "dob")
+# min_time/max_time und min_distance/max_distance der App filtern dasselbe Feld
+RANGE_ALIASES = {
+    "min_mark": "min_mark", "max_mark": "max_mark",
+    "min_time": "min_mark", "max_time": "max_mark",
+    "min_distance": "min_mark", "max_distance": "max_mark",
+}
+
+
+def _text(value):
+    return _WHITESPACE.sub(" ", value).strip()
+
+
+def canonical_search_params(raw):
+    """
+    Normalisiert die Suchparameter, sodass gleichwertige Anfragen denselben Schlüssel
+    ergeben: Leerzeichen, Groß-/Kleinschreibung wo sie egal ist, ISO-Daten, Zahlen als
+    float, leere Werte entfallen. Ungültige Werte lösen ValueError aus.
+    """
+    params = {}
+    for name in TEXT_PARAMS:
+        value = _text(raw.get(name) or "")
+        if name in CASE_INSENSITIVE_PARAMS:
+            value = value.lower()
+        if value:
+            params[name] = value
+
+    search_field = _text(raw.get("search_field") or "").lower() or None
+    if search_field not in SEARCH_FIELDS:
+        raise ValueError(f"Unbekanntes Suchfeld: {search_field}")
+    # Das Suchfeld spielt nur mit einem Suchbegriff eine Rolle
+    if search_field and "query" in params:
+        params["search_field"] = search_field
+
+    gender = _text(raw.get("gender") or "")
+    if gender:
+        params["gender"] = gender.capitalize()
+    nat = _text(raw.get("nat") or "")
+    if nat:
+        params["nat"] = nat.upper()
+    athlete_id = _text(raw.get("athlete_id") or "").lower()
+    if athlete_id:
+        if not ATHLETE_ID_PATTERN.fullmatch(athlete_id):
+            raise ValueError(f"Ungültige athlete_id: {athlete_id}")
+        params["athlete_id"] = athlete_id
+
+    for name in DATE_PARAMS:
+        value = _text(raw.get(name) or "")
+        if value:
+            try:
+                params[name] = date.fromisoformat(value[:10]).isoformat()
+            except ValueError:
+                raise ValueError(f"Ungültiges Datum für {name}: {value}")
+
+    for name, target in RANGE_ALIASES.items():
+        value = raw.get(name)
+        if value is None or value == "":
+            continue
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Ungültige Zahl für {name}: {value}")
+        if not math.isfinite(number):
+            raise ValueError(f"Ungültige Zahl für {name}: {value}")
+        if target in params and params[target] != number:
+            raise ValueError(f"Widersprüchliche Werte für {target}")
+        params[target] = number
+
+    for name in ("min_age", "max_age"):
+        value = raw.get(name)
+        if value is None or value == "":
+            continue
+        try:
+            params[name] = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Ungültiges Alter für {name}: {value}")
+
+    order = _text(raw.get("order") or "").lower()
+    if order:
+        if order not in ("asc", "desc"):
+            raise ValueError(f"order muss asc oder desc sein, nicht {order}")
+        params["order"] = order
+
+    size = raw.get("size")
+    try:
+        size = DEFAULT_SIZE if size in (None, "") else int(size)
+    except (TypeError, ValueError):
+        raise ValueError(f"Ungültige Größe: {size}")
+    if not 0 < size <= MAX_SIZE:
+        raise ValueError(f"size muss zwischen 1 und {MAX_SIZE} liegen")
+    params["size"] = size
+    return params
+
+
+def cache_key(params):
+    return tuple(sorted(params.items()))
+
+
+def build_search_query(params):
+    """
+    Baut aus normalisierten Parametern dieselbe bool/must-Abfrage wie combinedSearch der App
+    """
+    must = []
+    if "query" in params:
+        must.append({
+            "multi_match": {
+                "query": params["query"],
+                "fields": SEARCH_FIELDS[params.get("search_field")],
+                "type": "best_fields",
+                "fuzziness": "AUTO",
+            }
+        })
+    for name in ("first_name", "last_name"):
+        if name in params:
+            must.append({"match": {"competitor": params[name]}})
+    if "gender" in params:
+        must.append({"term": {"gender": params["gender"]}})
+    if "nat" in params:
+        must.append({"term": {"nat": params["nat"]}})
+    if "discipline" in params:
+        must.append({"match": {"discipline": params["discipline"]}})
+    if "venue" in params:
+        must.append({
+            "multi_match": {
+                "query": params["venue"],
+                "fields": ["venue.city", "venue.venue_raw", "venue.country"],
+            }
+        })
+    for name in DATE_PARAMS:
+        if name in params:
+            must.append({"match": {name: params[name]}})
+    mark_range = {}
+    if "min_mark" in params:
+        mark_range["gte"] = params["min_mark"]
+    if "max_mark" in params:
+        mark_range["lte"] = params["max_mark"]
+    if mark_range:
+        must.append({"range": {"mark.numeric_value": mark_range}})
+    age_range = {}
+    if "min_age" in params:
+        age_range["gte"] = params["min_age"]
+    if "max_age" in params:
+        age_range["lte"] = params["max_age"]
+    if age_range:
+        must.append({"range": {"age_at_competition": age_range}})
+
+    # Alle Resultate einer Athletin / eines Athleten: exakter Filter ohne Scoring
+    filters = [{"term": {"athlete_id": params["athlete_id"]}}] if "athlete_id" in params else []
+
+    return {
+        "query": {"bool": {"must": must or [{"match_all": {}}], "filter": filters}},
+        "size": params.get("size", DEFAULT_SIZE),
+    }
+
+
+# Felder und Gewichte der Autocomplete-Abfrage (wie getAutocompleteSuggestions in der App)
+AUTOCOMPLETE_FIELDS = {
+    "competitor": "competitor",
+    "city": "venue.city.text",
+    "country": "venue.country.text",
+}
+AUTOCOMPLETE_BOOSTS = {"competitor": 3, "discipline": 2, "venue.city.text": 1, "venue.country.text": 1}
+AUTOCOMPLETE_COLLAPSE = {"competitor": "competitor.keyword", "city": "venue.city", "country": "venue.country"}
+AUTOCOMPLETE_SIZE = 10
+AUTOCOMPLETE_EXPANSIONS = 10
+
+
+def build_autocomplete_query(prefix, search_field=None, gender=None, nat=None, discipline=None):
+    """
+    Baut dieselbe match_phrase_prefix-Abfrage wie getAutocompleteSuggestions der App:
+    ein Feld mit slop 3 oder ohne Suchfeld alle Felder gewichtet, Filter per term,
+    ein Treffer pro Vorschlag über collapse
+    """
+    if search_field is not None:
+        must = [{
+            "match_phrase_prefix": {
+                AUTOCOMPLETE_FIELDS[search_field]: {
+                    "query": prefix, "max_expansions": AUTOCOMPLETE_EXPANSIONS, "slop": 3,
+                }
+            }
+        }]
+    else:
+        must = [{
+            "bool": {
+                "should": [
+                    {"match_phrase_prefix": {field: {"query": prefix, "max_expansions": AUTOCOMPLETE_EXPANSIONS,
+                                                     "boost": boost}}}
+                    for field, boost in AUTOCOMPLETE_BOOSTS.items()
+                ],
+                "minimum_should_match": 1,
+            }
+        }]
+    if gender:
+        must.append({"term": {"gender": gender}})
+    if nat:
+        must.append({"term": {"nat": nat}})
+    if discipline:
+        must.append({"term": {"discipline.keyword": discipline}})
+    return {
+        "query": {"bool": {"must": must}},
+        "size": AUTOCOMPLETE_SIZE,
+        "_source": ["competitor", "discipline", "venue.city", "venue.country"],
+        "collapse": {"field": AUTOCOMPLETE_COLLAPSE.get(search_field, "discipline.keyword")},
+    }
+
+
+def build_leaderboard_query(discipline, gender, order="asc", size=DEFAULT_SIZE):
+    """
+    Top-N einer Disziplin und eines Geschlechts nach Leistung. Disziplin und Geschlecht sind
+    nach dem Filter konstant, stehen aber in der Sortierung, damit sie ein Präfix der
+    Indexsortierung des leaderboard-Profils ist; ohne Gesamtanzahl kann dann jedes
+    Segment nach size Treffern abbrechen. Das gilt nur für order="asc" (Zeiten): die
+    Indexsortierung ist aufsteigend, absteigende Bestenlisten (Sprünge, Würfe, Mehrkämpfe)
+    sortieren normal über alle Treffer.
+    """
+    sort = [{field: {"order": field_order, "missing": "_last"}} for field, field_order in LEADERBOARD_SORT]
+    sort[-1]["mark.numeric_value"]["order"] = order
+    return {
+        "query": {"bool": {"filter": [{"term": {"discipline.keyword": discipline}}, {"term": {"gender": gender}}]}},
+        "sort": sort,
+        "size": size,
+        "track_total_hits": False,
+    }
@@ -0,0 +1,56 @@
+import json
+
+from opensearchpy.exceptions import SerializationError
+from opensearchpy.serializer import JSONSerializer
+
+from ingest import ResultRecord
+
+try:
+    import orjson
+except ImportError:
+    # Optional (pip install orjson), ohne orjson serialisiert das json-Modul der Standardbibliothek
+    orjson = None
+
+
+def _default(data):
+    if isinstance(data, ResultRecord):
+        return data.source()
+    raise TypeError(f"Nicht serialisierbar: {type(data).__name__}")
+
+
+def dumps_bytes(data):
+    """
+    Kompaktes JSON als UTF-8-Bytes (identisch zu json.dumps mit ensure_ascii=False und
+    separators=(",", ":")). ResultRecords werden erst hier zum Dokument expandiert.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONSerializer(JSONSerializer):
+    """
+    Serializer für den OpenSearch-Client: orjson, falls installiert, sonst der
+    JSONSerializer von opensearch-py. Versteht zusätzlich ResultRecords als _source.
+    """
+
+    def default(self, data):
+        if isinstance(data, ResultRecord):
+            return data.source()
+        return super().default(data)
+
+    def dumps(self, data):
+        if orjson is None or isinstance(data, (str, bytes)):
+            return super().dumps(data)
+        try:
+            return orjson.dumps(data, default=self.default).decode("utf-8")
+        except TypeError as e:
+            raise SerializationError(data, e)
+
+    def loads(self, s):
+        if orjson is None:
+            return super().loads(s)
+        try:
+            return orjson.loads(s)
+        except ValueError as e:
+            raise SerializationError(s, e)
@@ -0,0 +1,192 @@
+import heapq
+import os
+from bisect import bisect_left
+from collections import defaultdict
+
+from artifacts import FileArtifact, load_artifact
+from ingest import normalize_name
+from ingest_version import ARTIFACTS_PATH
+from query_cache import QueryCache
+
+SUGGESTIONS_FILE = "suggestions.json.gz"
+KINDS = ["competitor", "discipline", "city", "country"]
+# Gewichtung der Arten bei einer Suche über alle Felder (wie die boosts in getAutocompleteSuggestions)
+KIND_BOOST = {"competitor": 3, "discipline": 2, "city": 1, "country": 1}
+SUGGEST_SIZE = 10
+MAX_SUGGEST_SIZE = 50
+TOP_PREFIX_LENGTH = 2     # Für so kurze Präfixe werden die besten Treffer beim Laden vorberechnet
+RESULT_CACHE_SIZE = 4096
+
+
+def suggestions_path(artifacts_path=ARTIFACTS_PATH):
+    return os.path.join(artifacts_path, SUGGESTIONS_FILE)
+
+
+def record_names(record):
+    """
+    Vorschlagbare Namen eines Resultats (ResultRecord) als (Art, Name)
+    """
+    for kind, name in (("competitor", record.competitor), ("discipline", record.discipline),
+                       ("city", record.venue.city), ("country", record.venue.country)):
+        if name:
+            yield kind, name
+
+
+class SuggestionBuilder:
+    """
+    Sammelt während des Ingest pro CSV-Datei die Namen mit Anzahl Resultate und bestem Weltranglistenplatz
+    """
+
+    def __init__(self):
+        self.files = {}
+
+    def observe(self, key, record):
+        contribution = self.files.get(key)
+        if contribution is None:
+            contribution = self.files[key] = {"gender": record.gender, "discipline": record.discipline,
+                                              "counts": defaultdict(lambda: [0, None])}
+        rank = record.world_rank
+        for kind, name in record_names(record):
+            entry = contribution["counts"][(kind, name, record.nat or "")]
+            entry[0] += 1
+            if rank is not None and (entry[1] is None or rank < entry[1]):
+                entry[1] = rank
+
+    def contributions(self, keys):
+        """
+        (Dateischlüssel, Beitrag)-Paare im Format des Artefakts; die Zähler werden dabei freigegeben
+        """
+        for key in keys:
+            contribution = self.files.pop(key, None)
+            if contribution is None:
+                # Datei ohne Zeilen: vorhandene Einträge werden durch einen leeren Beitrag ersetzt
+                yield key, {"gender": None, "discipline": None, "entries": []}
+                continue
+            entries = [[kind, name, nat, count, rank]
+                       for (kind, name, nat), (count, rank) in sorted(contribution["counts"].items())]
+            yield key, {"gender": contribution["gender"], "discipline": contribution["discipline"],
+                        "entries": entries}
+
+
+def update_suggestions(builder, keys, removed, artifacts_path=ARTIFACTS_PATH, keep=None):
+    artifact = FileArtifact(suggestions_path(artifacts_path))
+    artifact.update(builder.contributions(keys), removed, keep)
+    artifact.save()
+
+
+class SuggestionIndex:
+    """
+    Präfixindex über alle Namen im Speicher. Für jedes Wort eines Namens steht der
+    Rest des Namens ab diesem Wort in einem sortierten Array, sodass "bolt" auch
+    "Usain BOLT" findet; ein Präfix entspricht einem Bereich, der per Bisektion gefunden wird.
+    """
+
+    def __init__(self, artifact):
+        self.kinds = []
+        self.names = []
+        self.counts = []
+        self.best_ranks = []
+        self.facets = []      # pro Name: [(gender, discipline, nat, count, best_rank), ...]
+        ids = {}
+        for contribution in (artifact or {"files": {}})["files"].values():
+            gender, discipline = contribution["gender"], contribution["discipline"]
+            for kind, name, nat, count, rank in contribution["entries"]:
+                name_id = ids.get((kind, name))
+                if name_id is None:
+                    name_id = ids[(kind, name)] = len(self.names)
+                    self.kinds.append(kind)
+                    self.names.append(name)
+                    self.counts.append(0)
+                    self.best_ranks.append(None)
+                    self.facets.append([])
+                self.counts[name_id] += count
+                if rank is not None and (self.best_ranks[name_id] is None or rank < self.best_ranks[name_id]):
+                    self.best_ranks[name_id] = rank
+                self.facets[name_id].append((gender, discipline, nat, count, rank))
+
+        self.keys = {}
+        self.key_ids = {}
+        self.top = {}
+        for kind in KINDS:
+            pairs = []
+            for name_id, name in enumerate(self.names):
+                if self.kinds[name_id] != kind:
+                    continue
+                words = normalize_name(name).split(" ")
+                for i in range(len(words)):
+                    pairs.append((" ".join(words[i:]), name_id))
+            pairs.sort()
+            self.keys[kind] = [key for key, _ in pairs]
+            self.key_ids[kind] = [name_id for _, name_id in pairs]
+            self.top[kind] = self._short_prefix_top(pairs)
+        self.cache = QueryCache(RESULT_CACHE_SIZE, ttl=float("inf"))
+
+    def _short_prefix_top(self, pairs):
+        candidates = defaultdict(set)
+        for key, name_id in pairs:
+            for length in range(1, min(TOP_PREFIX_LENGTH, len(key)) + 1):
+                candidates[key[:length]].add(name_id)
+        return {prefix: heapq.nsmallest(MAX_SUGGEST_SIZE, name_ids, key=self._order)
+                for prefix, name_ids in candidates.items()}
+
+    def _order(self, name_id):
+        rank = self.best_ranks[name_id]
+        return -self.counts[name_id], rank if rank is not None else float("inf"), self.names[name_id]
+
+    def _weight(self, name_id, gender, nat, discipline):
+        """
+        (Anzahl, bester Rang) der Resultate, die zu den Filtern passen
+        """
+        if not (gender or nat or discipline):
+            return self.counts[name_id], self.best_ranks[name_id]
+        count = 0
+        best = None
+        for facet_gender, facet_discipline, facet_nat, facet_count, facet_rank in self.facets[name_id]:
+            if ((gender and facet_gender != gender) or (nat and facet_nat != nat)
+                    or (discipline and facet_discipline != discipline)):
+                continue
+            count += facet_count
+            if facet_rank is not None and (best is None or facet_rank < best):
+                best = facet_rank
+        return count, best
+
+    def _candidates(self, kind, prefix, filtered):
+        if not filtered and len(prefix) <= TOP_PREFIX_LENGTH:
+            return self.top[kind].get(prefix, [])
+        keys = self.keys[kind]
+        lo = bisect_left(keys, prefix)
+        hi = bisect_left(keys, prefix + "\uffff", lo)
+        return set(self.key_ids[kind][lo:hi])
+
+    def suggest(self, prefix, kind=None, gender=None, nat=None, discipline=None, size=SUGGEST_SIZE):
+        """
+        Die size besten Namen, deren Anfang oder eines ihrer Wörter mit prefix beginnt.
+        Sortiert nach Anzahl Resultate (bei Suche über alle Arten gewichtet), dann bestem Rang.
+        """
+        prefix = normalize_name(prefix)
+        size = min(size, MAX_SUGGEST_SIZE)
+        if not prefix:
+            return []
+        key = (prefix, kind, gender, nat, discipline, size)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+
+        filtered = bool(gender or nat or discipline)
+        scored = []
+        for current in [kind] if kind else KINDS:
+            boost = 1 if kind else KIND_BOOST[current]
+            for name_id in self._candidates(current, prefix, filtered):
+                count, best = self._weight(name_id, gender, nat, discipline)
+                if count:
+                    scored.append((-count * boost, best if best is not None else float("inf"),
+                                   self.names[name_id], name_id, count))
+        result = [{"text": name, "kind": self.kinds[name_id], "count": count,
+                   "best_rank": None if best == float("inf") else best}
+                  for _, best, name, name_id, count in heapq.nsmallest(size, scored)]
+        self.cache.put(key, result)
+        return result
+
+
+def load_suggestion_index(artifacts_path=ARTIFACTS_PATH):
+    return SuggestionIndex(load_artifact(suggestions_path(artifacts_path)))